@@ -1,6 +1,6 @@
 from flask import Flask, jsonify, request, render_template, send_from_directory
 from flask_socketio import SocketIO
-from classify import start_detection, stop_detection, is_running
+from classify import start_detection, stop_detection, is_running, collect_sources, start_source, stop_source, get_sources_status, get_source_config, get_engine_stats, reconfigure_detection, get_reconfigurations
 import sounddevice as sd
 import json
 import requests
@@ -17,6 +17,9 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import logging
 import psutil
+from settings_store import get_settings_store
+from rtsp_supervisor import RTSP_BACKENDS
+from label_scoring import BUILTIN_PROFILES
 
 # Configuration du logging
 logging.basicConfig(
@@ -46,12 +49,14 @@ socketio = SocketIO(app,
 
 # Définir le chemin absolu du dossier de l'application
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SETTINGS_FILE = os.path.join(BASE_DIR, 'settings.json')
-SETTINGS_BACKUP = os.path.join(BASE_DIR, 'settings.json.backup')
-SETTINGS_TEMP = os.path.join(BASE_DIR, 'settings.json.tmp')
+# Paramètres gardés en mémoire ; les écritures sont atomiques (fichier temporaire + sauvegarde)
+settings_store = get_settings_store()
 
-# Initialiser le détecteur VBAN
-init_vban()
+def notify_settings_changed(change):
+    """Informe les clients web qu'une partie des paramètres a changé"""
+    socketio.emit('settings_changed', {'sections': sorted(change.sections), 'origin': change.origin})
+
+settings_store.subscribe(notify_settings_changed)
 
 @app.before_request
 def before_request():
@@ -102,8 +107,7 @@ class Settings:
     
     def save_settings(self, new_settings):
         with self.lock:
-            with open('settings.json', 'w') as f:
-                json.dump(new_settings, f, indent=4)
+            settings_store.save(new_settings)
 
 def save_settings(new_settings):
     """Sauvegarde les paramètres avec une gestion d'erreurs améliorée"""
@@ -131,11 +135,9 @@ def save_settings(new_settings):
             }
         }
 
-        # Charger les paramètres existants s'ils existent
+        # Partir des paramètres existants (en mémoire)
         current_settings = default_settings.copy()
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                current_settings.update(json.load(f))
+        current_settings.update(settings_store.snapshot())
 
         # Préserver les sources RTSP existantes si elles ne sont pas dans les nouveaux paramètres
         if 'rtsp_sources' not in new_settings:
@@ -144,16 +146,8 @@ def save_settings(new_settings):
         # Mettre à jour avec les nouveaux paramètres
         current_settings.update(new_settings)
 
-        # Sauvegarder dans un fichier temporaire d'abord
-        with open(SETTINGS_TEMP, 'w') as f:
-            json.dump(current_settings, f, indent=4)
-
-        # Faire une sauvegarde de l'ancien fichier si nécessaire
-        if os.path.exists(SETTINGS_FILE):
-            os.replace(SETTINGS_FILE, SETTINGS_BACKUP)
-
-        # Renommer le fichier temporaire
-        os.replace(SETTINGS_TEMP, SETTINGS_FILE)
+        # Écriture atomique avec sauvegarde de l'ancien fichier, puis notification des abonnés
+        settings_store.save(current_settings)
 
         return True, "Paramètres sauvegardés avec succès"
 
@@ -194,9 +188,9 @@ def load_settings():
     }
     
     try:
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
+        if settings_store.exists():
+            # Copie modifiable : les routes complètent puis sauvegardent ces paramètres
+            settings = settings_store.snapshot()
                 
             # Fusionner récursivement les paramètres par défaut avec les paramètres sauvegardés
             def deep_merge(default, saved):
@@ -215,8 +209,7 @@ def load_settings():
         print(f"Erreur lors du chargement des paramètres: {str(e)}")
         
     # En cas d'erreur ou si le fichier n'existe pas, créer avec les paramètres par défaut
-    with open(SETTINGS_FILE, 'w') as f:
-        json.dump(default_settings, f, indent=4)
+    settings_store.save(default_settings)
     
     return default_settings
 
@@ -335,34 +328,16 @@ def start_detection_route():
                 'webhook_url': microphone_settings.get('webhook_url') if microphone_enabled else None,
                 'delay': float(global_settings.get('delay', '1.0')),
                 'audio_source': microphone_settings.get('audio_source') if microphone_enabled else None,
-                'rtsp_url': None
+                'rtsp_url': None,
+                # Toutes les sources actives (microphone, RTSP, VBAN) sont traitées simultanément
+                'sources': collect_sources(detection_settings)
             }
 
-            # Check for RTSP sources first
-            rtsp_sources = detection_settings.get('rtsp_sources', [])
-            for source in rtsp_sources:
-                if source.get('enabled', False):
-                    detection_params['audio_source'] = f"rtsp://{source['url']}"
-                    detection_params['rtsp_url'] = source['url']
-                    logging.info(f"Utilisation de la source RTSP: {source.get('name', 'Unknown')} ({source['url']})")
-                    break
-
-            # If no RTSP source is enabled, check for VBAN sources
-            if not detection_params['audio_source'] and not microphone_enabled:
-                # Vérifier d'abord saved_vban_sources
-                saved_vban_sources = detection_settings.get('saved_vban_sources', [])
-                if saved_vban_sources:
-                    # Utiliser la première source VBAN active
-                    for source in saved_vban_sources:
-                        if source.get('enabled', True):
-                            detection_params['audio_source'] = f"vban://{source['ip']}"
-                            logging.info(f"Utilisation de la source VBAN: {source['name']} ({source['ip']})")
-                            break
-                    else:
-                        if not any(source.get('enabled', True) for source in saved_vban_sources):
-                            logging.info("Aucune source VBAN active n'est activée")
-                else:
-                    logging.info("Aucune source VBAN configurée")
+            for source in detection_params['sources']:
+                logging.info(f"Source de détection {source['type']}: {source['name']} ({source['id']})")
+
+            if not detection_params['sources']:
+                return jsonify({'error': 'Aucune source audio active'}), 400
         except (ValueError, TypeError) as e:
             return jsonify({'error': f'Erreur dans les paramètres : {str(e)}'}), 400
         
@@ -390,6 +365,96 @@ def stop_detection_route():
         print(f"Erreur lors de l'arrêt de la détection: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/detection/sources', methods=['GET'])
+def get_detection_sources():
+    try:
+        return jsonify({
+            'running': is_running(),
+            'sources': get_sources_status(),
+            'engine': get_engine_stats(),
+            'reconfigurations': get_reconfigurations()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detection/reconfigure', methods=['POST'])
+def reconfigure_detection_route():
+    """Applique à chaud des paramètres (ceux du corps, sinon ceux sauvegardés) à la détection en cours"""
+    try:
+        settings = request.get_json(silent=True) or settings_store.get()
+        report = reconfigure_detection(settings)
+        if report is None:
+            return jsonify({'error': 'Aucune détection en cours'}), 400
+        return jsonify({'success': True, 'reconfiguration': report})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detection/profiles', methods=['GET'])
+def get_detection_profiles():
+    """Profils de détection disponibles et leurs paramètres sauvegardés"""
+    try:
+        saved = settings_store.get().get('detection_profiles') or {}
+        profiles = []
+        for name in dict.fromkeys(list(BUILTIN_PROFILES) + list(saved)):
+            profile = dict(BUILTIN_PROFILES.get(name, {}), **saved.get(name, {}))
+            profile['name'] = name
+            profile['enabled'] = name == 'clap' or profile.get('enabled', False)
+            profiles.append(profile)
+        return jsonify({'profiles': profiles})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detection/profiles/<name>', methods=['PUT'])
+def update_detection_profile(name):
+    """Active ou modifie un profil (seuil, délai, webhook) ; appliqué à chaud à la détection en cours"""
+    try:
+        data = request.get_json() or {}
+        if name not in BUILTIN_PROFILES and not data.get('labels'):
+            return jsonify({'error': f'Profil inconnu: {name}'}), 404
+        if name == 'clap':
+            return jsonify({'error': 'Le profil clap se règle dans les paramètres globaux et par source'}), 400
+        profiles = dict(settings_store.get().get('detection_profiles') or {})
+        profile = dict(profiles.get(name, {}))
+        for field in ('enabled', 'threshold', 'delay', 'webhook_url', 'labels', 'negative_labels'):
+            if field in data:
+                profile[field] = data[field]
+        profiles[name] = profile
+        settings_store.update({'detection_profiles': profiles})
+        return jsonify({'success': True, 'profile': dict(profile, name=name)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detection/sources/<path:source_id>/start', methods=['POST'])
+def start_detection_source(source_id):
+    try:
+        if not is_running():
+            return jsonify({'error': 'Aucune détection en cours'}), 400
+
+        # Reprendre la configuration de la session, sinon celle des paramètres
+        source_config = get_source_config(source_id)
+        if source_config is None:
+            source_config = next(
+                (s for s in collect_sources(load_settings(), include_disabled=True) if s['id'] == source_id),
+                None
+            )
+        if source_config is None:
+            return jsonify({'error': 'Source non trouvée'}), 404
+
+        if start_source(source_config):
+            return jsonify({'success': True})
+        return jsonify({'error': 'Impossible de démarrer la source'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detection/sources/<path:source_id>/stop', methods=['POST'])
+def stop_detection_source(source_id):
+    try:
+        if stop_source(source_id):
+            return jsonify({'success': True})
+        return jsonify({'error': 'Source non trouvée'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/webhook/test', methods=['POST'])
 def test_webhook():
     try:
@@ -845,9 +910,12 @@ def add_rtsp_stream():
         name = data.get('name', '')
         webhook_url = data.get('webhook_url', '')
         enabled = data.get('enabled', True)
+        backend = data.get('backend', 'ffmpeg')
         
         if not url:
             return jsonify({'error': 'URL RTSP requise'}), 400
+        if backend not in RTSP_BACKENDS:
+            return jsonify({'error': f'Backend RTSP inconnu: {backend}'}), 400
             
         settings = load_settings()
         if 'rtsp_sources' not in settings:
@@ -861,7 +929,8 @@ def add_rtsp_stream():
             'name': name,
             'url': url,
             'webhook_url': webhook_url,
-            'enabled': enabled
+            'enabled': enabled,
+            'backend': backend
         }
         
         settings['rtsp_sources'].append(new_stream)
@@ -888,6 +957,10 @@ def update_rtsp_stream(stream_id):
                     stream['webhook_url'] = data['webhook_url']
                 if 'enabled' in data:
                     stream['enabled'] = data['enabled']
+                if 'backend' in data:
+                    if data['backend'] not in RTSP_BACKENDS:
+                        return jsonify({'error': f"Backend RTSP inconnu: {data['backend']}"}), 400
+                    stream['backend'] = data['backend']
                 
                 save_settings(settings)
                 return jsonify({'success': True, 'stream': stream})
@@ -1056,6 +1129,9 @@ def handle_test():
     socketio.emit('debug', {'message': 'Test serveur'})
 
 if __name__ == '__main__':
+    # Initialiser le détecteur VBAN (pas à l'import : les workers d'inférence
+    # multi-processus réimportent ce module et ne doivent pas ouvrir le port VBAN)
+    init_vban()
     try:
         # Désactiver le mode debug
         socketio.run(app, host='127.0.0.1', port=16045, debug=False)
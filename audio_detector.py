@@ -1,46 +1,58 @@
 import numpy as np
-import collections
 import threading
-from mediapipe.tasks import python
-from mediapipe.tasks.python import audio
-from mediapipe.tasks.python.components import containers
-from mediapipe.tasks.python.audio import audio_classifier
-import mediapipe as mp
 import time
 import logging
+from circular_buffer import AudioRing
+from inference_engine import InferenceEngine, load_class_names, YAMNET_WINDOW_SIZE, RING_DURATION
+from onset_gate import OnsetGate
+from hop_scheduler import HopScheduler
+from label_scoring import ScoringMatrix, top_k, DEFAULT_PROFILES
+
+DEFAULT_DETECTION_THRESHOLD = 0.3  # Score de clap minimal par défaut
 
 class AudioDetector:
-    def __init__(self, model_path, sample_rate=16000, buffer_duration=1.0):
+    def __init__(self, model_path, sample_rate=16000, buffer_duration=1.0, engine=None):
         self.model_path = model_path
         self.sample_rate = sample_rate
-        self.buffer_size = int(buffer_duration * sample_rate)
+        # Le buffer doit pouvoir contenir au moins une fenêtre YAMNet
+        self.buffer_size = max(int(buffer_duration * sample_rate), YAMNET_WINDOW_SIZE)
         self.sources = {}  # Dict pour stocker les buffers et callbacks par source
         self.source_ids = {}  # Dict pour mapper les noms de source aux IDs numériques
         self.next_source_id = 1  # Commencer à 1 pour éviter les problèmes avec 0
-        self.classifier = None
+        self.engine = engine  # Moteur d'inférence, éventuellement partagé
+        self._owns_engine = engine is None
         self.running = False
         self.lock = threading.Lock()
-        self.last_detection_time = {}  # Dict pour stocker le dernier temps de détection par source
+        self.last_detection_time = {}  # Dernier temps de détection par source puis par profil
         self.last_timestamp_ms = {}  # Dict pour stocker le dernier timestamp par source
         self.start_time_ms = None
-        self.current_source_id = None  # Pour suivre la source actuelle dans le callback
+        self.max_results = 5
+        self.score_threshold = 0.3
+        # Seuil du score de clap et délai minimal entre deux détections, modifiables
+        # à chaud et surchargeables par source (voir update_source)
+        self.detection_threshold = DEFAULT_DETECTION_THRESHOLD
+        self.detection_delay = 1.0
+        # Pas entre deux fenêtres classifiées (échantillons) : fenêtres disjointes par défaut
+        self.window_hop = YAMNET_WINDOW_SIZE
+
+        # Noms des classes (les profils sont résolus en indices par ScoringMatrix)
+        self.class_names = load_class_names()
+        # Options de la porte d'énergie devant le classificateur (None : toutes les fenêtres sont classifiées)
+        self.gate_options = None
+        # Profils évalués sur chaque fenêtre : le clap (ligne 0) puis ceux de set_profiles
+        self._profiles = None
+        self.set_profiles({})
 
     def initialize(self, max_results=5, score_threshold=0.3):
-        """Initialise le classificateur audio"""
+        """Initialise le moteur d'inférence audio"""
         try:
-            base_options = python.BaseOptions(model_asset_path=self.model_path)
-            
-            # Créer un seul classificateur en mode stream
-            options = audio.AudioClassifierOptions(
-                base_options=base_options,
-                running_mode=audio.RunningMode.AUDIO_STREAM,
-                max_results=max_results,
-                score_threshold=score_threshold,
-                result_callback=self._handle_result
-            )
-            self.classifier = audio.AudioClassifier.create_from_options(options)
+            self.max_results = max_results
+            self.score_threshold = score_threshold
+            if self.engine is None:
+                self.engine = InferenceEngine(self.model_path, sample_rate=self.sample_rate)
+            self.engine.start()
             self.running = True
-            logging.info(f"Classificateur audio initialisé avec succès (sample_rate: {self.sample_rate}Hz)")
+            logging.info(f"Moteur d'inférence audio initialisé avec succès (sample_rate: {self.sample_rate}Hz)")
             logging.info(f"Options du classificateur: max_results={max_results}, score_threshold={score_threshold}")
         except Exception as e:
             logging.error(f"Erreur lors de l'initialisation du classificateur: {str(e)}")
@@ -48,24 +60,155 @@ class AudioDetector:
             logging.error(traceback.format_exc())
             raise
         
-    def add_source(self, source_id, detection_callback=None, labels_callback=None):
-        """Ajoute une nouvelle source audio avec ses callbacks"""
+    def set_profiles(self, profiles):
+        """
+        Remplace à chaud les profils de détection évalués en plus du clap.
+
+        Tous les profils sont scorés sur le même vecteur YAMNet de chaque fenêtre,
+        en un seul produit matrice-vecteur : un profil supplémentaire ne coûte
+        pas d'inférence. Le clap garde le seuil, le délai et le callback de la
+        source ; les autres profils ont les leurs.
+
+        Args:
+            profiles (dict): Nom -> {'labels', 'negative_labels', 'threshold', 'delay', 'callback'}
+                ('threshold' et 'delay' à None pour les valeurs par défaut du détecteur ;
+                'callback' reçoit le même événement que le callback de détection de la source)
+
+        Raises:
+            ValueError: Classe YAMNet inconnue dans un profil
+        """
+        profiles = {name: profile for name, profile in profiles.items() if name != 'clap'}
+        scoring = ScoringMatrix(dict(DEFAULT_PROFILES, **profiles), self.class_names)
+        settings = [{'name': 'clap', 'threshold': None, 'delay': None, 'callback': None}]
+        settings += [{'name': name,
+                      'threshold': profile.get('threshold'),
+                      'delay': profile.get('delay'),
+                      'callback': profile.get('callback')} for name, profile in profiles.items()]
+        # Remplacement atomique : une fenêtre en cours garde les profils avec lesquels elle a été scorée
+        self._profiles = (scoring, settings)
+        if profiles:
+            logging.info(f"Profils de détection: clap, {', '.join(profiles)}")
+
+    def set_gate(self, enabled, **options):
+        """
+        Active ou désactive à chaud la porte d'énergie de toutes les sources.
+
+        Avec la porte, seules les fenêtres contenant une attaque plausible (ou
+        qui la suivent de près) sont soumises au moteur d'inférence.
+
+        Args:
+            enabled (bool): Activer la porte
+            **options: Options de OnsetGate (ratio_db, min_level_db, pre_roll, hold)
+        """
+        with self.lock:
+            self.gate_options = dict(options) if enabled else None
+            for source in self.sources.values():
+                source['gate'] = self._create_gate()
+        logging.info(f"Porte d'énergie {'activée' if enabled else 'désactivée'}")
+
+    def _create_gate(self):
+        if self.gate_options is None:
+            return None
+        return OnsetGate(self.sample_rate, **self.gate_options)
+
+    def get_gate_stats(self, source_id):
+        """Compteurs de la porte d'énergie d'une source (None si la porte est désactivée)"""
+        source = self.sources.get(source_id)
+        gate = source.get('gate') if source else None
+        return gate.get_stats() if gate is not None else None
+
+    def configure(self, threshold=None, delay=None, hop=None):
+        """
+        Modifie à chaud le seuil de détection, le délai et le pas des fenêtres par défaut.
+
+        Args:
+            threshold (float): Score de clap minimal (None : inchangé)
+            delay (float): Délai minimal en secondes entre deux détections d'une source (None : inchangé)
+            hop (float): Pas en secondes entre deux fenêtres classifiées d'une source (None : inchangé)
+        """
+        if threshold is not None:
+            self.detection_threshold = float(threshold)
+        if delay is not None:
+            self.detection_delay = float(delay)
+        if hop is not None:
+            window_hop = self._hop_samples(hop)
+            with self.lock:
+                self.window_hop = window_hop
+                for source in self.sources.values():
+                    if source['hop'] is None:
+                        source['scheduler'].set_hop(window_hop)
+
+    def _hop_samples(self, hop):
+        samples = int(round(float(hop) * self.sample_rate))
+        if samples <= 0:
+            raise ValueError("Le pas entre fenêtres doit être positif")
+        return samples
+
+    def get_inference_stats(self, source_id):
+        """Pas des fenêtres, compteurs et débit d'inférence mesuré d'une source (None si inconnue)"""
+        source = self.sources.get(source_id)
+        return source['scheduler'].get_stats() if source else None
+
+    def add_source(self, source_id, detection_callback=None, labels_callback=None, threshold=None, delay=None,
+                   hop=None):
+        """Ajoute une nouvelle source audio avec ses callbacks (seuil, délai et pas : None pour ceux par défaut)"""
+        window_hop = self._hop_samples(hop) if hop is not None else None
         with self.lock:
             # Attribuer un ID numérique à la source
             numeric_id = self.next_source_id
             self.next_source_id += 1
             self.source_ids[source_id] = numeric_id
             
+            # Le moteur fournit le buffer (en mémoire partagée en mode multi-processus)
+            if self.engine is not None:
+                ring = self.engine.create_ring(source_id)
+            else:
+                ring = AudioRing(int(RING_DURATION * self.sample_rate))
             self.sources[source_id] = {
-                'buffer': collections.deque(maxlen=self.buffer_size),
+                'ring': ring,
+                'scheduler': HopScheduler(window_hop or self.window_hop, start=ring.write_count,
+                                          sample_rate=self.sample_rate),
+                'hop': hop,
                 'detection_callback': detection_callback,
                 'labels_callback': labels_callback,
+                'threshold': threshold,
+                'delay': delay,
+                'gate': self._create_gate(),
                 'numeric_id': numeric_id
             }
-            self.last_detection_time[source_id] = 0
+            self.last_detection_time[source_id] = {}  # Profil -> dernière détection
             self.last_timestamp_ms[source_id] = 0
             logging.info(f"Source audio ajoutée: {source_id} (ID interne: {numeric_id})")
 
+    def update_source(self, source_id, **changes):
+        """
+        Modifie à chaud les callbacks, le seuil, le délai ou le pas des fenêtres d'une source.
+
+        Le buffer et les fenêtres en cours de la source sont conservés : l'audio
+        n'est pas interrompu.
+
+        Args:
+            source_id (str): Source à modifier
+            **changes: detection_callback, labels_callback, threshold, delay ou hop (secondes)
+
+        Returns:
+            bool: False si la source est inconnue
+        """
+        unknown = set(changes) - {'detection_callback', 'labels_callback', 'threshold', 'delay', 'hop'}
+        if unknown:
+            raise ValueError(f"Paramètres de source inconnus: {', '.join(sorted(unknown))}")
+        if 'hop' in changes:
+            window_hop = self._hop_samples(changes['hop']) if changes['hop'] is not None else None
+        with self.lock:
+            source = self.sources.get(source_id)
+            if source is None:
+                return False
+            source.update(changes)
+            if 'hop' in changes:
+                source['scheduler'].set_hop(window_hop or self.window_hop)
+        logging.info(f"Source audio reconfigurée: {source_id} ({', '.join(sorted(changes))})")
+        return True
+
     def remove_source(self, source_id):
         """Supprime une source audio"""
         with self.lock:
@@ -75,82 +218,94 @@ class AudioDetector:
                 del self.sources[source_id]
                 del self.last_detection_time[source_id]
                 del self.last_timestamp_ms[source_id]
+                if self.engine:
+                    self.engine.release_source(source_id)
                 logging.info(f"Source audio supprimée: {source_id} (ID interne: {numeric_id})")
 
-    def _handle_result(self, result, timestamp):
-        """Gère les résultats de classification"""
+    def _handle_scores(self, source_id, scores, timestamp):
+        """Gère le vecteur de scores d'une fenêtre classifiée pour une source"""
         try:
-            if not result or not result.classifications or not self.current_source_id:
+            source = self.sources.get(source_id)
+            if source is None:
                 return
-                
-            classification = result.classifications[0]
-            source_id = self.current_source_id
+            
+            # Ne garder que les meilleures catégories au-dessus du seuil
+            top_indices = top_k(scores, self.max_results, self.score_threshold)
             
             # Log pour déboguer les résultats bruts
-            logging.debug(f"Résultats bruts pour source {source_id}:")
-            for category in classification.categories:
-                if category.score > 0.1:  # Abaisser le seuil pour voir plus de résultats
-                    logging.debug(f"  - {category.category_name}: {category.score}")
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"Résultats bruts pour source {source_id}:")
+                for index in top_indices:
+                    if scores[index] > 0.1:  # Abaisser le seuil pour voir plus de résultats
+                        logging.debug(f"  - {self.class_names[index]}: {scores[index]}")
             
-            # Calculer le score pour la détection de clap
-            score_sum = sum(
-                category.score
-                for category in classification.categories
-                if category.category_name in ["Hands", "Clapping", "Cap gun"]
-            )
-            score_sum -= sum(
-                category.score
-                for category in classification.categories
-                if category.category_name == "Finger snapping"
-            )
+            # Scores de tous les profils en un produit matrice-vecteur sur les meilleures catégories
+            scoring, profiles = self._profiles
+            profile_scores = scoring.score(scores, top_indices)
+            score_sum = profile_scores[0]
             
             # Log du score calculé
             if score_sum > 0.1:  # Abaisser le seuil pour le debug
                 logging.debug(f"Score de clap calculé pour source {source_id}: {score_sum}")
             
             # Préparer les labels pour le callback
-            top3_labels = sorted(
-                classification.categories,
-                key=lambda x: x.score,
-                reverse=True
-            )[:3]
             labels_data = [
-                {"label": label.category_name, "score": float(label.score)}
-                for label in top3_labels
-                if label.score > 0.5
+                {"label": self.class_names[index], "score": float(scores[index])}
+                for index in top_indices[:3]
+                if scores[index] > 0.5
             ]
             
             # Log pour déboguer les labels
             logging.debug(f"Labels détectés pour source {source_id}: {labels_data}")
             
             # Envoyer les labels si un callback est défini
-            if self.sources[source_id]['labels_callback'] and labels_data:
+            if source['labels_callback'] and labels_data:
                 try:
-                    self.sources[source_id]['labels_callback'](labels_data)
+                    source['labels_callback'](labels_data)
                 except Exception as e:
                     logging.error(f"Erreur dans le callback des labels pour source {source_id}: {str(e)}")
             
-            # Vérifier si on a détecté un clap
-            current_time = time.time()
-            if score_sum > 0.3 and (current_time - self.last_detection_time.get(source_id, 0)) > 1.0:
-                if self.sources[source_id]['detection_callback']:
-                    try:
-                        self.sources[source_id]['detection_callback']({
-                            'timestamp': current_time,
-                            'score': float(score_sum),
-                            'source_id': source_id
-                        })
-                    except Exception as e:
-                        logging.error(f"Erreur dans le callback de détection pour source {source_id}: {str(e)}")
-                self.last_detection_time[source_id] = current_time
+            # Seuls les profils dont le score est positif peuvent déclencher
+            for row in np.flatnonzero(profile_scores > 0):
+                profile = profiles[row]
+                if row == 0:
+                    # Clap : seuil, délai et callback propres à la source s'ils sont définis
+                    threshold, delay, callback = source['threshold'], source['delay'], source['detection_callback']
+                else:
+                    threshold, delay, callback = profile['threshold'], profile['delay'], profile['callback']
+                if threshold is None:
+                    threshold = self.detection_threshold
+                if delay is None:
+                    delay = self.detection_delay
+                self._trigger(source_id, profile['name'], float(profile_scores[row]), threshold, delay, callback)
                 
         except Exception as e:
             logging.error(f"Erreur dans le traitement du résultat: {str(e)}")
             import traceback
             logging.error(traceback.format_exc())
 
+    def _trigger(self, source_id, profile, score, threshold, delay, callback):
+        """Déclenche une détection si le score dépasse le seuil et que le délai du profil est écoulé"""
+        last_detections = self.last_detection_time.get(source_id)
+        if last_detections is None or score <= threshold:
+            return
+        current_time = time.time()
+        if current_time - last_detections.get(profile, 0) <= delay:
+            return
+        if callback:
+            try:
+                callback({
+                    'timestamp': current_time,
+                    'score': score,
+                    'source_id': source_id,
+                    'profile': profile
+                })
+            except Exception as e:
+                logging.error(f"Erreur dans le callback de détection {profile} pour source {source_id}: {str(e)}")
+        last_detections[profile] = current_time
+
     def process_audio(self, audio_data, source_id):
-        """Traite les données audio pour une source spécifique"""
+        """Traite les données audio (mono, au taux sample_rate) pour une source spécifique"""
         try:
             if source_id not in self.sources:
                 logging.warning(f"Source inconnue: {source_id}")
@@ -164,72 +319,55 @@ class AudioDetector:
                     logging.error("Impossible de démarrer le classificateur")
                     return
 
-            # Rééchantillonnage si nécessaire
-            if len(audio_data) > self.buffer_size:
-                resampled_data = audio_data[::3]
-                audio_data = resampled_data
-            
             # S'assurer que les données sont en float32
             if audio_data.dtype != np.float32:
                 audio_data = audio_data.astype(np.float32)
             
             # Log des statistiques audio
-            if len(audio_data) > 0:
+            if len(audio_data) > 0 and logging.getLogger().isEnabledFor(logging.DEBUG):
                 logging.debug(f"Audio stats (source {source_id}) - min: {np.min(audio_data):.4f}, max: {np.max(audio_data):.4f}, mean: {np.mean(audio_data):.4f}, std: {np.std(audio_data):.4f}")
             
-            # Ajouter les nouvelles données au buffer de la source
-            self.sources[source_id]['buffer'].extend(audio_data)
-            
-            # Traiter avec le classificateur
-            if self.running and self.classifier and self.start_time_ms is not None:
-                block_size = 1600
-                buffer_array = np.array(list(self.sources[source_id]['buffer']))
-                
-                blocks_processed = 0  # Compteur pour le debug
-                while len(buffer_array) >= block_size:
-                    block = buffer_array[:block_size]
-                    buffer_array = buffer_array[block_size:]
-                    blocks_processed += 1
-                    
-                    # Vérifier les statistiques du bloc avant classification
-                    block_max = np.max(np.abs(block))
-                    if block_max > 0.1:  # Seulement log les blocs avec du son significatif
-                        logging.debug(f"Classification d'un bloc audio (source {source_id}) - amplitude max: {block_max:.4f}")
-                    
-                    audio_data_container = containers.AudioData.create_from_array(
-                        block,
-                        self.sample_rate
-                    )
-                    
-                    # Calculer le prochain timestamp
-                    block_duration_ms = int((block_size / self.sample_rate) * 1000)
-                    next_timestamp = max(
-                        self.last_timestamp_ms.get(source_id, 0) + block_duration_ms,
-                        int(time.time() * 1000)
-                    )
-                    self.last_timestamp_ms[source_id] = next_timestamp
-                    
-                    # Définir la source actuelle pour le callback
-                    self.current_source_id = source_id
-                    
-                    # Log avant la classification
-                    if block_max > 0.1:
-                        logging.debug(f"Envoi au classificateur - source: {source_id}, timestamp: {next_timestamp}")
-                    
-                    # Classifier le bloc
-                    try:
-                        self.classifier.classify_async(audio_data_container, next_timestamp)
-                    except Exception as e:
-                        logging.error(f"Erreur lors de la classification: {str(e)}")
-                
-                if blocks_processed > 0:
-                    logging.debug(f"Blocs traités pour {source_id}: {blocks_processed}")
-                
-                # Mettre à jour le buffer avec les données restantes
-                self.sources[source_id]['buffer'].clear()
-                if len(buffer_array) > 0:
-                    self.sources[source_id]['buffer'].extend(buffer_array)
-            
+            # Écrire dans le buffer de la source et soumettre les fenêtres complètes
+            source = self.sources[source_id]
+            ring = source['ring']
+            ring.write(audio_data)
+            gate = source['gate']
+            if gate is not None:
+                gate.process(audio_data, ring.write_count - len(audio_data))
+            scheduler = source['scheduler']
+            if not self.running or not self.engine:
+                scheduler.next_start = ring.write_count
+                return
+
+            # Les échantillons déjà écrasés ne peuvent plus être soumis
+            oldest = ring.write_count - ring.capacity
+            scheduler.catch_up(oldest)
+
+            # Fenêtres glissantes au pas de la source
+            windows_submitted = 0  # Compteur pour le debug
+            while scheduler.due(ring.write_count):
+                start = scheduler.next_start
+                if gate is not None:
+                    # Fenêtre calme ignorée, ou recalée sur l'attaque qu'elle contient
+                    action, start = gate.schedule(start, YAMNET_WINDOW_SIZE, oldest, ring.write_count)
+                    if action == 'wait':
+                        break
+                    if action == 'skip':
+                        scheduler.skip()
+                        continue
+                scheduler.advance(start)
+                windows_submitted += 1
+
+                timestamp_ms = int(time.time() * 1000)
+                self.last_timestamp_ms[source_id] = timestamp_ms
+                submitted = self.engine.submit_ring(source_id, ring, start, timestamp_ms, self._handle_scores)
+                scheduler.record(submitted)
+                if not submitted:
+                    logging.warning(f"File d'inférence pleine, fenêtre abandonnée pour {source_id}")
+
+            if windows_submitted > 0:
+                logging.debug(f"Fenêtres soumises pour {source_id}: {windows_submitted}")
+
         except Exception as e:
             logging.error(f"Erreur dans le traitement audio: {e}")
             import traceback
@@ -237,45 +375,31 @@ class AudioDetector:
 
     def start(self):
         """Démarre la détection"""
-        if not self.classifier:
-            self.initialize()
+        if not self.engine or not self.engine.running:
+            self.initialize(self.max_results, self.score_threshold)
         
         # Réinitialiser les timestamps
         self.start_time_ms = int(time.time() * 1000)
         for source_id in self.sources:
             self.last_timestamp_ms[source_id] = self.start_time_ms
         
-        # Démarrer le task runner de MediaPipe
-        if self.classifier:
-            try:
-                # Créer un conteneur audio vide pour démarrer le stream
-                empty_data = np.zeros(1600, dtype=np.float32)
-                audio_data = containers.AudioData.create_from_array(
-                    empty_data,
-                    self.sample_rate
-                )
-                # Démarrer le stream avec le timestamp initial
-                self.classifier.classify_async(audio_data, self.start_time_ms)
-                self.running = True
-                logging.info("Task runner MediaPipe démarré avec succès")
-            except Exception as e:
-                logging.error(f"Erreur lors du démarrage du task runner: {e}")
-                return False
-        
         self.running = True
         return True
 
+    def get_engine_stats(self):
+        """Retourne les statistiques du moteur d'inférence"""
+        return self.engine.get_stats() if self.engine else {}
+
     def stop(self):
-        """Arrête le classificateur"""
+        """Arrête le moteur d'inférence"""
         self.running = False
-        if self.classifier:
+        if self.engine and self._owns_engine:
             try:
-                self.classifier.close()
-                self.classifier = None
-                logging.info("Classificateur audio arrêté")
+                self.engine.stop()
+                logging.info("Moteur d'inférence audio arrêté")
             except Exception as e:
-                logging.error(f"Erreur lors de l'arrêt du classificateur: {e}")
+                logging.error(f"Erreur lors de l'arrêt du moteur d'inférence: {e}")
                 
     def __del__(self):
-        """Destructeur pour s'assurer que les classificateurs sont bien arrêtés"""
+        """Destructeur pour s'assurer que le moteur d'inférence est bien arrêté"""
         self.stop()
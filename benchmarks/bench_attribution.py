@@ -0,0 +1,117 @@
+"""
+Stress test d'attribution des résultats d'inférence.
+
+N sources (32 par défaut) soumettent en parallèle des fenêtres distinctes au
+InferenceEngine. Chaque résultat reçu par une source est comparé au score de
+référence calculé séquentiellement pour la même fenêtre : toute erreur
+d'attribution entre sources apparaît comme une différence.
+
+Usage :
+    python benchmarks/bench_attribution.py --sources 32 --windows 5 --contexts 4
+    python benchmarks/bench_attribution.py --mode process --contexts 2
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_engine import InferenceEngine, MediaPipeBackend, YAMNET_WINDOW_SIZE, YAMNET_SAMPLE_RATE
+from inference_pool import ProcessInferencePool
+
+
+def make_window(source_index, window_index):
+    """Fenêtre propre à une source : sinusoïde à une fréquence unique plus du bruit"""
+    rng = np.random.default_rng(source_index * 1000 + window_index)
+    t = np.arange(YAMNET_WINDOW_SIZE) / YAMNET_SAMPLE_RATE
+    frequency = 200 + 150 * source_index
+    amplitude = 0.05 + 0.02 * (source_index % 10)
+    window = amplitude * np.sin(2 * np.pi * frequency * t) + 0.01 * rng.standard_normal(YAMNET_WINDOW_SIZE)
+    return window.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yamnet.tflite')
+    parser.add_argument('--sources', type=int, default=32)
+    parser.add_argument('--windows', type=int, default=5, help='Fenêtres par source')
+    parser.add_argument('--contexts', type=int, default=4, help='Contextes (threads) ou workers (processus)')
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--batch', type=int, default=16)
+    args = parser.parse_args()
+
+    windows = {
+        (source, n): make_window(source, n)
+        for source in range(args.sources)
+        for n in range(args.windows)
+    }
+
+    # Référence : une fenêtre à la fois, sans concurrence
+    backend = MediaPipeBackend(args.model)
+    reference = {key: backend.classify_batch(window[np.newaxis])[0] for key, window in windows.items()}
+    backend.close()
+
+    if args.mode == 'process':
+        engine = ProcessInferencePool(args.model, max_batch_size=args.batch, num_workers=args.contexts,
+                                      max_queue_size=args.sources * args.windows)
+        engine.start()
+        engine.wait_until_ready()
+    else:
+        engine = InferenceEngine(args.model, max_batch_size=args.batch, num_contexts=args.contexts,
+                                 max_queue_size=args.sources * args.windows)
+        engine.start()
+
+    received = {}
+    lock = threading.Lock()
+    done = threading.Event()
+    total = len(windows)
+
+    def on_result(source_id, scores, timestamp):
+        with lock:
+            received[(source_id, timestamp)] = scores.copy()
+            if len(received) == total:
+                done.set()
+
+    barrier = threading.Barrier(args.sources)
+
+    def feed(source):
+        barrier.wait()
+        for n in range(args.windows):
+            engine.submit(f"source_{source}", windows[(source, n)], n, on_result)
+            time.sleep(0.001)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=feed, args=(source,)) for source in range(args.sources)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    finished = done.wait(timeout=120)
+    elapsed = time.perf_counter() - start
+    stats = engine.get_stats()
+    engine.stop()
+
+    mismatches = 0
+    for (source, n), expected in reference.items():
+        scores = received.get((f"source_{source}", n))
+        if scores is None or not np.allclose(scores, expected, atol=1e-5):
+            mismatches += 1
+
+    # Les fenêtres de sources différentes doivent donner des scores différents,
+    # sinon une inversion ne serait pas détectable
+    distinct = len({reference[(source, 0)].tobytes() for source in range(args.sources)})
+
+    print(f"Mode: {args.mode}, sources: {args.sources}, fenêtres/source: {args.windows}, contextes: {args.contexts}")
+    print(f"Résultats reçus: {len(received)}/{total} ({'complet' if finished else 'incomplet'})")
+    print(f"Sources avec un profil de scores distinct: {distinct}/{args.sources}")
+    print(f"Erreurs d'attribution: {mismatches}")
+    print(f"Durée: {elapsed:.2f} s, débit: {total / elapsed:.1f} fenêtres/s")
+    print(f"Taille moyenne des lots: {stats['avg_batch_size']:.1f}, latence p99: {stats['latency_p99_ms']:.1f} ms")
+    return 0 if finished and mismatches == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
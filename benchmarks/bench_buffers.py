@@ -0,0 +1,137 @@
+"""
+Microbenchmark des buffers audio par source : deque de floats contre AudioRing.
+
+Reproduit les deux chemins chauds :
+  - AudioDetector.process_audio : blocs de 100 ms, extraction de fenêtres YAMNet ;
+  - VBANDetector._listen_loop : paquets de 256 échantillons, blocs d'une seconde.
+
+Pour chaque variante on mesure le temps par bloc et la mémoire allouée
+transitoirement (pic tracemalloc pendant le bloc), ramenés au débit temps réel
+d'une source.
+
+Usage :
+    python benchmarks/bench_buffers.py --seconds 60
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import collections
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circular_buffer import AudioRing
+from inference_engine import YAMNET_WINDOW_SIZE
+
+SAMPLE_RATE = 16000
+
+
+def detector_deque():
+    """Ancienne version de AudioDetector.process_audio"""
+    buffer = collections.deque(maxlen=SAMPLE_RATE)
+    windows = []
+
+    def feed(block):
+        buffer.extend(block)
+        if len(buffer) >= YAMNET_WINDOW_SIZE:
+            buffer_array = np.array(list(buffer), dtype=np.float32)
+            while len(buffer_array) >= YAMNET_WINDOW_SIZE:
+                windows.append(buffer_array[:YAMNET_WINDOW_SIZE])
+                buffer_array = buffer_array[YAMNET_WINDOW_SIZE:]
+            buffer.clear()
+            if len(buffer_array) > 0:
+                buffer.extend(buffer_array)
+        del windows[:]
+    return feed
+
+
+def detector_ring():
+    """AudioDetector.process_audio avec AudioRing"""
+    ring = AudioRing(4 * SAMPLE_RATE)
+    state = {'next': 0}
+    windows = []
+
+    def feed(block):
+        ring.write(block)
+        while ring.write_count - state['next'] >= YAMNET_WINDOW_SIZE:
+            windows.append(ring.view(state['next'], YAMNET_WINDOW_SIZE))
+            state['next'] += YAMNET_WINDOW_SIZE
+        del windows[:]
+    return feed
+
+
+def vban_deque():
+    """Ancienne version du buffer de VBANDetector._listen_loop"""
+    buffer = collections.deque(maxlen=SAMPLE_RATE)
+
+    def feed(block):
+        buffer.extend(block)
+        if len(buffer) >= SAMPLE_RATE:
+            chunk = np.array(list(buffer)[:SAMPLE_RATE])
+            buffer.clear()
+            return chunk
+    return feed
+
+
+def vban_ring():
+    """Buffer de VBANDetector._listen_loop avec AudioRing"""
+    ring = AudioRing(2 * SAMPLE_RATE)
+
+    def feed(block):
+        ring.write(block)
+        if ring.available() >= SAMPLE_RATE:
+            chunk = ring.peek(SAMPLE_RATE)
+            ring.consume(SAMPLE_RATE)
+            return chunk
+    return feed
+
+
+def run(factory, block_size, seconds):
+    blocks = [np.random.default_rng(i).uniform(-1, 1, block_size).astype(np.float32) for i in range(16)]
+    n_blocks = int(seconds * SAMPLE_RATE / block_size)
+
+    feed = factory()
+    start = time.perf_counter()
+    for i in range(n_blocks):
+        feed(blocks[i % 16])
+    elapsed = time.perf_counter() - start
+
+    feed = factory()
+    tracemalloc.start()
+    allocated = 0
+    for i in range(n_blocks):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        feed(blocks[i % 16])
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {
+        'us_per_block': elapsed / n_blocks * 1e6,
+        'realtime_factor': seconds / elapsed,
+        'bytes_per_second': allocated / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=60.0, help="Durée d'audio simulée par variante")
+    args = parser.parse_args()
+
+    cases = [
+        ("AudioDetector (blocs de 1600)", 1600, detector_deque, detector_ring),
+        ("VBANDetector (paquets de 256)", 256, vban_deque, vban_ring),
+    ]
+    for title, block_size, before, after in cases:
+        print(title)
+        for name, factory in (("deque", before), ("AudioRing", after)):
+            result = run(factory, block_size, args.seconds)
+            print(f"  {name:<10} {result['us_per_block']:9.1f} µs/bloc  "
+                  f"x{result['realtime_factor']:8.0f} temps réel  "
+                  f"{result['bytes_per_second'] / 1024:10.1f} Kio alloués/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+CPU et latence de détection selon le pas des fenêtres glissantes (HopScheduler).
+
+Pour chaque pas, une source reçoit du bruit en temps réel par blocs de 100 ms
+dans un AudioDetector branché sur un vrai InferenceEngine. On mesure le débit
+d'inférence réel de la source (get_inference_stats), le temps CPU du
+processus par seconde d'audio et la latence du moteur. La latence de
+détection (de l'attaque d'un clap de 100 ms à la fin de la première fenêtre
+qui le contient entièrement) est simulée pour des attaques aléatoires.
+
+Usage :
+    python benchmarks/bench_hop_scheduler.py --hops 0.975 0.5 0.2 0.1 --duration 10
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_detector import AudioDetector
+from inference_engine import InferenceEngine, YAMNET_WINDOW_SIZE
+
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 1600
+CLAP_DURATION = 0.1
+
+
+def detection_latency(hop, trials=10000, seed=0):
+    """Latence moyenne et maximale (s) entre une attaque et la fin de la première fenêtre qui contient le clap"""
+    rng = np.random.default_rng(seed)
+    onsets = rng.uniform(10.0, 20.0, trials)
+    window = YAMNET_WINDOW_SIZE / SAMPLE_RATE
+    # Première fenêtre k (début k * hop) qui finit après la fin du clap
+    k = np.ceil((onsets + CLAP_DURATION - window) / hop)
+    latencies = k * hop + window - onsets
+    return float(latencies.mean()), float(latencies.max())
+
+
+def run(model, hop, duration):
+    engine = InferenceEngine(model, sample_rate=SAMPLE_RATE)
+    detector = AudioDetector(model, sample_rate=SAMPLE_RATE, engine=engine)
+    detector.initialize()
+    detector.configure(hop=hop)
+    detector.add_source('bench')
+    detector.start()
+
+    audio = (0.05 * np.random.default_rng(0).standard_normal(int(duration * SAMPLE_RATE))).astype(np.float32)
+    cpu = time.process_time()
+    start = time.monotonic()
+    for index, offset in enumerate(range(0, len(audio), BLOCK_SIZE)):
+        detector.process_audio(audio[offset:offset + BLOCK_SIZE], 'bench')
+        time.sleep(max(0.0, start + (index + 1) * BLOCK_SIZE / SAMPLE_RATE - time.monotonic()))
+    time.sleep(0.5)  # Dernières fenêtres en cours d'inférence
+    cpu = time.process_time() - cpu
+    stats = detector.get_inference_stats('bench')
+    engine_stats = detector.get_engine_stats()
+    detector.stop()
+    return stats, engine_stats, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yamnet.tflite')
+    parser.add_argument('--hops', type=float, nargs='+', default=[0.975, 0.5, 0.2, 0.1])
+    parser.add_argument('--duration', type=float, default=10.0, help="Secondes d'audio par pas")
+    args = parser.parse_args()
+
+    print(f"{'pas':>7s} {'inférences/s':>12s} {'CPU':>10s} {'moteur p50':>11s} {'détection moy/max':>18s}")
+    for hop in args.hops:
+        stats, engine_stats, cpu = run(args.model, hop, args.duration)
+        mean, worst = detection_latency(hop)
+        p50 = engine_stats.get('latency_p50_ms') or 0.0
+        print(f"{1000 * hop:5.0f}ms {stats['inference_rate']:12.2f} {100 * cpu / args.duration:8.1f} % "
+              f"{p50:8.1f} ms {1000 * mean:8.0f}/{1000 * worst:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
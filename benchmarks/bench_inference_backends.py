@@ -0,0 +1,70 @@
+"""
+Latence et CPU de l'inférence YAMNet : MediaPipe AudioClassifier ou interpréteur TFLite direct.
+
+Les mêmes fenêtres (sinusoïdes et bruit) sont classifiées par chaque backend,
+une fenêtre par appel (cas d'une source seule) puis par lots. On mesure le
+temps réel et le temps CPU du processus par fenêtre, et l'écart maximal entre
+les vecteurs de scores des deux backends.
+
+Usage :
+    python benchmarks/bench_inference_backends.py --windows 200 --threads 1 2
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_engine import MediaPipeBackend, TFLiteBackend, YAMNET_WINDOW_SIZE, YAMNET_SAMPLE_RATE
+
+
+def make_windows(count):
+    rng = np.random.default_rng(0)
+    t = np.arange(YAMNET_WINDOW_SIZE) / YAMNET_SAMPLE_RATE
+    windows = 0.02 * rng.standard_normal((count, YAMNET_WINDOW_SIZE))
+    windows += 0.3 * np.sin(2 * np.pi * (200 + 40 * np.arange(count))[:, np.newaxis] * t)
+    return windows.astype(np.float32)
+
+
+def measure(backend, windows, batch_size):
+    """Retourne (ms réel par fenêtre, ms CPU par fenêtre, scores)"""
+    backend.classify_batch(windows[:batch_size])  # Préchauffage
+    scores = np.zeros((len(windows), 521), dtype=np.float32)
+    wall, cpu = time.perf_counter(), time.process_time()
+    for start in range(0, len(windows), batch_size):
+        scores[start:start + batch_size] = backend.classify_batch(windows[start:start + batch_size])
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return 1000 * wall / len(windows), 1000 * cpu / len(windows), scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yamnet.tflite')
+    parser.add_argument('--windows', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=16, help='Taille des lots')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1], help='Threads de l\'interpréteur TFLite')
+    args = parser.parse_args()
+
+    windows = make_windows(args.windows)
+    backends = [("MediaPipe", lambda: MediaPipeBackend(args.model))]
+    backends += [(f"TFLite ({n} thread(s))", lambda n=n: TFLiteBackend(args.model, num_threads=n)) for n in args.threads]
+    backends.append(("TFLite + embeddings", lambda: TFLiteBackend(args.model, embeddings=True)))
+
+    reference = None
+    print(f"{args.windows} fenêtres de {YAMNET_WINDOW_SIZE} échantillons, {os.cpu_count()} CPU")
+    for name, factory in backends:
+        backend = factory()
+        for batch_size in (1, args.batch):
+            wall, cpu, scores = measure(backend, windows, batch_size)
+            if reference is None:
+                reference = scores
+            print(f"  {name:22s} lots de {batch_size:2d}: {wall:6.2f} ms/fenêtre, {cpu:6.2f} ms CPU/fenêtre, "
+                  f"écart max {np.abs(scores - reference).max():.4f}, "
+                  f"même classe {100 * np.mean(scores.argmax(1) == reference.argmax(1)):.0f} %")
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Coût du calcul des scores de détection à partir du vecteur YAMNet (521 scores).
+
+Compare, pour 1 à N profils (clap, chien, sonnette...) :
+- ancien : argsort complet, puis pour chaque profil des sommes Python avec
+  des tests `index in liste` sur les meilleures catégories ;
+- ScoringMatrix : argpartition (top_k) puis un seul produit matrice-vecteur
+  pour tous les profils.
+Les scores obtenus sont comparés entre les deux méthodes.
+
+Usage :
+    python benchmarks/bench_label_scoring.py --windows 20000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_engine import YAMNET_NUM_CLASSES, load_class_names
+from label_scoring import ScoringMatrix, top_k, CLAP_LABELS, NEGATIVE_LABELS
+
+PROFILES = {
+    'clap': {'labels': CLAP_LABELS, 'negative_labels': NEGATIVE_LABELS},
+    'glass': {'labels': ["Glass", "Shatter"]},
+    'smoke_alarm': {'labels': ["Smoke detector, smoke alarm", "Fire alarm"]},
+    'dog': {'labels': ["Dog", "Bark", "Yip"]},
+    'doorbell': {'labels': ["Doorbell", "Ding-dong"]},
+    'baby': {'labels': ["Baby cry, infant cry"]},
+    'siren': {'labels': ["Siren", "Civil defense siren"]},
+    'knock': {'labels': ["Knock"]}
+}
+
+
+def legacy_scores(scores, profile_indices, max_results, threshold):
+    top_indices = np.argsort(scores)[::-1][:max_results]
+    top_indices = top_indices[scores[top_indices] >= threshold]
+    results = []
+    for positive, negative in profile_indices:
+        score = sum(scores[index] for index in top_indices if index in positive)
+        score -= sum(scores[index] for index in top_indices if index in negative)
+        results.append(score)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--windows', type=int, default=20000)
+    parser.add_argument('--max-results', type=int, default=5)
+    args = parser.parse_args()
+
+    class_names = load_class_names()
+    rng = np.random.default_rng(0)
+    windows = (rng.random((args.windows, YAMNET_NUM_CLASSES)) ** 8).astype(np.float32)
+    for count in (1, len(PROFILES)):
+        profiles = dict(list(PROFILES.items())[:count])
+        profile_indices = [([class_names.index(label) for label in profile.get('labels', [])],
+                            [class_names.index(label) for label in profile.get('negative_labels', [])])
+                           for profile in profiles.values()]
+        scoring = ScoringMatrix(profiles, class_names)
+
+        start = time.perf_counter()
+        legacy = [legacy_scores(scores, profile_indices, args.max_results, 0.3) for scores in windows]
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matrix = [scoring.score(scores, top_k(scores, args.max_results, 0.3)) for scores in windows]
+        matrix_time = time.perf_counter() - start
+
+        error = np.abs(np.array(legacy, dtype=np.float32) - np.array(matrix)).max()
+        print(f"{count} profil(s): ancien {1e6 * legacy_time / args.windows:6.2f} µs/fenêtre, "
+              f"ScoringMatrix {1e6 * matrix_time / args.windows:6.2f} µs/fenêtre "
+              f"(x{legacy_time / matrix_time:.1f}), écart max {error:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Frontal log-mel incrémental ('tflite_mel') contre modèle complet ('tflite') sur des fenêtres glissantes.
+
+Une source de N secondes est découpée en fenêtres de 0.975 s au pas demandé,
+lues dans son AudioRing. Le backend 'tflite' recalcule le frontal (STFT, mel,
+log) de chaque fenêtre dans le graphe ; 'tflite_mel' ne calcule que les
+trames de 10 ms nouvelles puis exécute le réseau convolutif seul. On mesure
+le temps médian par fenêtre, les deux backends étant appelés en alternance
+pour subir la même charge machine, la part du frontal numpy et l'écart maximal entre les scores des deux
+backends. Avec un pas qui n'est pas multiple de 10 ms, 'tflite_mel' ramène le
+début des fenêtres sur la trame précédente : les scores diffèrent alors un peu.
+
+Usage :
+    python benchmarks/bench_log_mel_frontend.py --seconds 30 --hops 0.975 0.2 0.1
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circular_buffer import AudioRing
+from inference_engine import TFLiteBackend, LogMelTFLiteBackend, YAMNET_WINDOW_SIZE, YAMNET_SAMPLE_RATE
+from log_mel_frontend import LogMelStream, YAMNET_FRAME_HOP, YAMNET_PATCH_FRAMES
+
+
+def run(full, streaming, ring, starts):
+    """
+    Classifie chaque fenêtre avec les deux backends en alternance (même charge machine).
+
+    Returns:
+        tuple: (temps médian par fenêtre 'tflite', idem 'tflite_mel', écart maximal des scores)
+    """
+    durations = np.zeros((len(starts), 2))
+    difference = 0.0
+    for row, start in enumerate(starts):
+        begin = time.perf_counter()
+        expected = full.classify_batch(ring.view(start, YAMNET_WINDOW_SIZE)[np.newaxis])[0]
+        middle = time.perf_counter()
+        scores = streaming.classify_ring('bench', ring, start)
+        durations[row] = middle - begin, time.perf_counter() - middle
+        difference = max(difference, float(np.abs(scores - expected).max()))
+    full_time, mel_time = np.median(durations, axis=0)
+    return full_time, mel_time, difference
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='yamnet.tflite')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--hops', type=float, nargs='+', default=[0.975, 0.5, 0.2, 0.1])
+    args = parser.parse_args()
+
+    count = int(args.seconds * YAMNET_SAMPLE_RATE)
+    t = np.arange(count) / YAMNET_SAMPLE_RATE
+    audio = (0.05 * np.random.default_rng(0).standard_normal(count) + 0.2 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    ring = AudioRing(count)
+    ring.write(audio)
+
+    full = TFLiteBackend(args.model)
+    full.classify_batch(audio[np.newaxis, :YAMNET_WINDOW_SIZE])  # Préchauffage
+    print(f"{'pas':>7s} {'fenêtres':>9s} {'tflite':>12s} {'tflite_mel':>12s} {'dont frontal':>13s} {'gain':>7s} {'écart max':>10s}")
+    for hop in args.hops:
+        starts = list(range(0, count - YAMNET_WINDOW_SIZE + 1, int(round(hop * YAMNET_SAMPLE_RATE))))
+        streaming = LogMelTFLiteBackend(args.model)
+        streaming.classify_batch(audio[np.newaxis, :YAMNET_WINDOW_SIZE])
+        full_time, mel_time, difference = run(full, streaming, ring, starts)
+
+        # Part du frontal : mêmes trames recalculées sur un LogMelStream neuf
+        stream = LogMelStream(streaming.frontend)
+        frontend_time = time.perf_counter()
+        for start in starts:
+            start_frame = start // YAMNET_FRAME_HOP
+            stream.update(ring, start_frame, start_frame + YAMNET_PATCH_FRAMES)
+        frontend_time = (time.perf_counter() - frontend_time) / len(starts)
+
+        print(f"{1000 * hop:5.0f}ms {len(starts):9d} {1000 * full_time:9.2f} ms {1000 * mel_time:9.2f} ms "
+              f"{1000 * frontend_time:10.3f} ms {100 * (1 - mel_time / full_time):6.1f}% "
+              f"{difference:10.2e}")
+        streaming.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Fenêtres évitées et rappel de la porte d'énergie (OnsetGate) sur un corpus étiqueté.
+
+Chaque scène est injectée par blocs de 100 ms dans un AudioDetector dont le
+moteur d'inférence enregistre seulement les fenêtres soumises. On compte la
+part des fenêtres ignorées par la porte et le rappel : un événement étiqueté
+est retrouvé si son attaque tombe dans une fenêtre classifiée, avec au moins
+pre_roll secondes d'audio avant elle dans la fenêtre (ou le début de la scène).
+
+Sans --corpus, un corpus synthétique est généré : bruits de fond de niveaux
+et de couleurs différents (blanc, rose, ronflement 50 Hz, parole simulée) et
+claps plus ou moins forts à des instants aléatoires. Avec --corpus, un CSV
+`chemin_wav,attaque_1;attaque_2;...` (secondes) décrit des fichiers WAV mono
+16 kHz 16 bits.
+
+Usage :
+    python benchmarks/bench_onset_gate.py --scenes 20 --duration 60 --spacing 5
+    python benchmarks/bench_onset_gate.py --corpus corpus.csv --ratio-db 8
+"""
+import os
+import sys
+import csv
+import time
+import wave
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_detector import AudioDetector
+from circular_buffer import AudioRing
+from inference_engine import YAMNET_WINDOW_SIZE
+
+SAMPLE_RATE = 16000
+BLOCK_SIZE = 1600
+
+
+class RecordingEngine:
+    """Moteur d'inférence factice : garde le début des fenêtres soumises"""
+    running = True
+
+    def __init__(self):
+        self.starts = []
+
+    def start(self):
+        pass
+
+    def create_ring(self, source_id):
+        return AudioRing(4 * SAMPLE_RATE)
+
+    def submit_ring(self, source_id, ring, start, timestamp_ms, callback):
+        self.starts.append(start)
+        return True
+
+
+def synthetic_scene(rng, duration, spacing):
+    """Scène synthétique : (audio float32, positions des attaques)"""
+    count = int(duration * SAMPLE_RATE)
+    level = 10 ** rng.uniform(-3.5, -1.5)
+    kind = rng.choice(['white', 'pink', 'hum', 'speech'])
+    noise = rng.standard_normal(count)
+    if kind == 'pink':
+        spectrum = np.fft.rfft(noise) / np.sqrt(np.arange(1, count // 2 + 2))
+        noise = np.fft.irfft(spectrum, count)
+    elif kind == 'hum':
+        t = np.arange(count) / SAMPLE_RATE
+        noise = np.sin(2 * np.pi * 50 * t) + 0.3 * np.sin(2 * np.pi * 150 * t) + 0.05 * noise
+    elif kind == 'speech':
+        # Bruit modulé par des syllabes de 4 à 6 Hz
+        envelope = np.abs(np.sin(np.pi * np.cumsum(rng.uniform(4, 6, count)) / SAMPLE_RATE))
+        noise = np.convolve(noise, np.ones(8) / 8, mode='same') * envelope * 3
+    audio = (level * noise / (np.std(noise) or 1.0)).astype(np.float32)
+
+    onsets = []
+    position = int(rng.uniform(1.0, 3.0) * SAMPLE_RATE)
+    while position < count - SAMPLE_RATE:
+        length = int(rng.uniform(0.02, 0.06) * SAMPLE_RATE)
+        burst = rng.standard_normal(length) * np.exp(-np.arange(length) / (length / 5))
+        audio[position:position + length] += (10 ** rng.uniform(-1.5, -0.3) * burst).astype(np.float32)
+        onsets.append(position)
+        position += int(rng.uniform(0.3, 1.7) * spacing * SAMPLE_RATE)
+    return audio, onsets
+
+
+def load_corpus(path):
+    """Scènes d'un CSV `chemin_wav,attaque_1;attaque_2;...`"""
+    scenes = []
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#'):
+                continue
+            with wave.open(os.path.join(base, row[0]), 'rb') as w:
+                if w.getframerate() != SAMPLE_RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+                    raise ValueError(f"{row[0]}: WAV mono 16 kHz 16 bits attendu")
+                audio = np.frombuffer(w.readframes(w.getnframes()), np.int16).astype(np.float32) / 32768
+            onsets = [int(float(value) * SAMPLE_RATE) for value in row[1].split(';') if value.strip()] if len(row) > 1 else []
+            scenes.append((audio, onsets))
+    return scenes
+
+
+def run_scene(audio, onsets, options):
+    """Fenêtres soumises, fenêtres totales et événements retrouvés pour une scène"""
+    engine = RecordingEngine()
+    detector = AudioDetector('yamnet.tflite', sample_rate=SAMPLE_RATE, engine=engine)
+    detector.set_gate(True, **options)
+    detector.add_source('scene')
+    detector.start()
+    start = time.process_time()
+    for offset in range(0, len(audio), BLOCK_SIZE):
+        detector.process_audio(audio[offset:offset + BLOCK_SIZE], 'scene')
+    cpu = time.process_time() - start
+
+    pre_roll = detector.sources['scene']['gate'].pre_roll
+    starts = np.array(engine.starts, dtype=np.int64)
+    found = 0
+    for onset in onsets:
+        needed = min(pre_roll, onset)
+        if np.any((starts <= onset - needed) & (onset < starts + YAMNET_WINDOW_SIZE)):
+            found += 1
+    return len(starts), len(audio) // YAMNET_WINDOW_SIZE, found, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='CSV de fichiers WAV étiquetés (corpus synthétique sinon)')
+    parser.add_argument('--scenes', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60.0, help='Durée des scènes synthétiques (s)')
+    parser.add_argument('--spacing', type=float, default=5.0, help='Écart moyen entre deux claps synthétiques (s)')
+    parser.add_argument('--ratio-db', type=float, default=None)
+    parser.add_argument('--hold', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        scenes = load_corpus(args.corpus)
+    else:
+        rng = np.random.default_rng(args.seed)
+        scenes = [synthetic_scene(rng, args.duration, args.spacing) for _ in range(args.scenes)]
+    options = {key: value for key, value in (('ratio_db', args.ratio_db), ('hold', args.hold)) if value is not None}
+
+    classified = total = found = events = 0
+    cpu = 0.0
+    for audio, onsets in scenes:
+        scene_classified, scene_total, scene_found, scene_cpu = run_scene(audio, onsets, options)
+        classified += scene_classified
+        total += scene_total
+        found += scene_found
+        events += len(onsets)
+        cpu += scene_cpu
+    seconds = sum(len(audio) for audio, _ in scenes) / SAMPLE_RATE
+
+    print(f"{len(scenes)} scène(s), {seconds:.0f} s d'audio, {events} événement(s) étiqueté(s)")
+    print(f"  fenêtres classifiées : {classified}/{total} ({100 * (1 - classified / max(total, 1)):.1f} % évitées)")
+    print(f"  rappel               : {found}/{events} ({100 * found / max(events, 1):.1f} %)")
+    print(f"  coût de la boucle    : {1000 * cpu / seconds:.3f} ms CPU par seconde d'audio")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Coût CPU du rééchantillonnage par flux, à partir de paquets VBAN.
+
+Compare l'ancien rééchantillonnage FFT par paquet (scipy.signal.resample) au
+StreamingResampler polyphase, pour des entrées à 44.1 kHz et 48 kHz. Le
+résultat est exprimé en pourcentage d'un cœur par flux temps réel.
+
+Usage :
+    python benchmarks/bench_resampler.py --seconds 30 --packet 256
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import scipy.signal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resampler import StreamingResampler, TARGET_SAMPLE_RATE
+
+
+def fft_per_packet(src_rate):
+    """Ancienne version de VBANDetector._listen_loop"""
+    def process(packet):
+        target_length = int(len(packet) * TARGET_SAMPLE_RATE / src_rate)
+        return scipy.signal.resample(packet, target_length)
+    return process
+
+
+def streaming(src_rate):
+    return StreamingResampler(src_rate, TARGET_SAMPLE_RATE).process
+
+
+def measure(factory, src_rate, packet, seconds):
+    signal = np.random.default_rng(0).uniform(-1, 1, int(src_rate * seconds)).astype(np.float32)
+    process = factory(src_rate)
+    produced = 0
+    start = time.process_time()
+    for offset in range(0, len(signal) - packet + 1, packet):
+        produced += len(process(signal[offset:offset + packet]))
+    cpu = time.process_time() - start
+    return 100.0 * cpu / seconds, produced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30.0, help="Durée d'audio par flux")
+    parser.add_argument('--packet', type=int, default=256, help='Échantillons par paquet')
+    args = parser.parse_args()
+
+    for src_rate in (44100, 48000):
+        print(f"{src_rate} Hz -> {TARGET_SAMPLE_RATE} Hz, paquets de {args.packet} échantillons")
+        for name, factory in (("FFT par paquet", fft_per_packet), ("polyphase", streaming)):
+            cpu, produced = measure(factory, src_rate, args.packet, args.seconds)
+            print(f"  {name:<15} {cpu:6.2f} % d'un cœur par flux, {produced} échantillons produits")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Coût de lecture de la sortie PCM de ffmpeg pour N flux RTSP simultanés.
+
+Chaque flux est un processus qui écrit du PCM float32 mono 16 kHz en temps
+réel par blocs de 100 ms : ffmpeg (-re sur une source lavfi) s'il est
+installé, sinon un remplaçant Python. Le consommateur écrit chaque bloc dans
+un AudioRing, comme AudioDetector.process_audio. Deux lecteurs sont comparés :
+- ancien : stdout.read() (un nouvel objet bytes par bloc), np.frombuffer puis
+  reshape(-1, 1) ;
+- RtspSupervisor : readinto dans un anneau de blocs préalloué et vues.
+On mesure le temps CPU du processus lecteur par flux, puis, sur un flux seul
+sous tracemalloc, la mémoire allouée transitoirement par bloc.
+
+Usage :
+    python benchmarks/bench_rtsp_ingest.py --streams 50 --duration 10
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+import subprocess
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circular_buffer import AudioRing
+from rtsp_supervisor import RtspSupervisor, RTSP_BLOCK_DURATION
+
+SAMPLE_RATE = 16000
+
+STAND_IN = """
+import sys, time
+duration = float(sys.argv[1])
+block = b'\\x00\\x00\\x00\\x3f' * 1600
+start = time.monotonic()
+for n in range(int(duration * 10)):
+    sys.stdout.buffer.write(block)
+    sys.stdout.buffer.flush()
+    time.sleep(max(0.0, start + (n + 1) * 0.1 - time.monotonic()))
+"""
+
+
+def producer_command(duration):
+    """Commande d'un flux temps réel de `duration` secondes"""
+    if shutil.which('ffmpeg'):
+        return lambda url, sample_rate: [
+            'ffmpeg', '-loglevel', 'error', '-re', '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+            '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', '1', '-ar', str(sample_rate), 'pipe:'
+        ]
+    return lambda url, sample_rate: [sys.executable, '-c', STAND_IN, str(duration)]
+
+
+def legacy_reader(command, ring, done):
+    """Ancienne boucle de lecture RTSP (stdout.read), suivie de l'écriture dans le buffer"""
+    process = subprocess.Popen(command('stand-in', SAMPLE_RATE), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    buffer_size = int(SAMPLE_RATE * RTSP_BLOCK_DURATION)
+    while True:
+        in_bytes = process.stdout.read(buffer_size * 4)
+        if not in_bytes:
+            break
+        audio_chunk = np.frombuffer(in_bytes, np.float32).reshape(-1, 1)
+        ring.write(audio_chunk[:, 0])
+    process.wait()
+    done.release()
+
+
+def run_legacy(command, streams, duration):
+    rings = [AudioRing(4 * SAMPLE_RATE) for _ in range(streams)]
+    done = threading.Semaphore(0)
+    start = time.process_time()
+    for ring in rings:
+        threading.Thread(target=legacy_reader, args=(command, ring, done), daemon=True).start()
+    for _ in range(streams):
+        done.acquire()
+    return time.process_time() - start, sum(ring.write_count for ring in rings)
+
+
+def run_supervised(command, streams, duration):
+    rings = [AudioRing(4 * SAMPLE_RATE) for _ in range(streams)]
+    supervisor = RtspSupervisor()
+    start = time.process_time()
+    for index, ring in enumerate(rings):
+        # Pas de relance pendant la mesure : le flux s'arrête à la fin du processus
+        supervisor.add_stream(f"stream_{index}", 'stand-in', SAMPLE_RATE, ring.write,
+                              command=command, backoff_initial=3600.0)
+    deadline = time.time() + duration + 30
+    while time.time() < deadline and any(stream.state != 'backoff' for stream in supervisor.streams.values()):
+        time.sleep(0.1)
+    cpu = time.process_time() - start
+    supervisor.stop()
+    return cpu, sum(ring.write_count for ring in rings)
+
+
+def transient_allocations(command, supervised):
+    """Mémoire allouée au pic entre deux blocs d'un flux seul (octets par bloc, médiane)"""
+    ring = AudioRing(4 * SAMPLE_RATE)
+    deltas = []
+    state = {'current': None}
+
+    def consume(block):
+        current, peak = tracemalloc.get_traced_memory()
+        if state['current'] is not None:
+            deltas.append(peak - state['current'])
+        ring.write(block)
+        tracemalloc.reset_peak()
+        state['current'] = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    if supervised:
+        supervisor = RtspSupervisor()
+        stream = supervisor.add_stream('alloc', 'stand-in', SAMPLE_RATE, consume, command=command,
+                                       backoff_initial=3600.0)
+        while stream.state != 'backoff':
+            time.sleep(0.05)
+        supervisor.stop()
+    else:
+        process = subprocess.Popen(command('stand-in', SAMPLE_RATE), stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        while True:
+            in_bytes = process.stdout.read(int(SAMPLE_RATE * RTSP_BLOCK_DURATION) * 4)
+            if not in_bytes:
+                break
+            consume(np.frombuffer(in_bytes, np.float32).reshape(-1, 1)[:, 0])
+        process.wait()
+    tracemalloc.stop()
+    return int(np.median(deltas)) if deltas else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0, help='Durée de chaque flux (s)')
+    args = parser.parse_args()
+
+    command = producer_command(args.duration)
+    print(f"{args.streams} flux de {args.duration:.0f} s ({'ffmpeg' if shutil.which('ffmpeg') else 'remplaçant Python'})")
+    for name, run, supervised in (("read + frombuffer", run_legacy, False), ("readinto (RtspSupervisor)", run_supervised, True)):
+        cpu, samples = run(command, args.streams, args.duration)
+        expected = args.streams * int(args.duration * 10) * int(SAMPLE_RATE * RTSP_BLOCK_DURATION)
+        allocated = transient_allocations(producer_command(2.0), supervised)
+        print(f"  {name:26s}: {1000 * cpu / (args.streams * args.duration):6.3f} ms CPU par seconde de flux, "
+              f"{allocated:5d} octets alloués par bloc, {samples}/{expected} échantillons")
+
+
+if __name__ == '__main__':
+    main()
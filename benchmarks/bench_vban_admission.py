@@ -0,0 +1,100 @@
+"""
+Coût par paquet de l'admission des flux VBAN selon le nombre de sources configurées.
+
+Pour 1 à 500 sources sauvegardées dans les paramètres, on mesure le temps de
+décision « ce flux est-il activé ? » pour un paquet :
+- ancien chemin : lecture du cache de paramètres (verrou + date) puis parcours
+  linéaire de saved_vban_sources (pire cas : le flux est le dernier de la liste) ;
+- index d'admission : une recherche dans un frozenset (ip, nom), l'index étant
+  recompilé par abonnement au SettingsStore et relu une fois par lot de paquets.
+
+Usage :
+    python benchmarks/bench_vban_admission.py --sources 1 10 100 500 --packets 200000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vban_detector_new import VBANDetector
+from settings_store import SettingsStore
+
+BATCH_SIZE = 64  # Taille de lot de VBANReceiver
+
+
+def make_settings(count):
+    return {'saved_vban_sources': [
+        {'ip': f"10.0.{index // 256}.{index % 256}", 'stream_name': f"Stream{index}", 'enabled': True}
+        for index in range(count)
+    ]}
+
+
+class LegacySettingsCache:
+    """Ancien VBANDetector._load_settings : cache de 5 s protégé par un verrou"""
+
+    def __init__(self, settings):
+        self.lock = threading.Lock()
+        self.settings = settings
+        self.loaded = time.time()
+
+    def load(self):
+        current_time = time.time()
+        with self.lock:
+            if self.settings is not None and current_time - self.loaded < 5:
+                return self.settings
+        return self.settings
+
+
+def legacy_admit(cache, ip, name):
+    settings = cache.load()
+    if settings and 'saved_vban_sources' in settings:
+        for saved_source in settings['saved_vban_sources']:
+            if (saved_source['ip'] == ip and
+                saved_source['stream_name'] == name and
+                saved_source.get('enabled', False)):
+                return True
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', type=int, nargs='+', default=[1, 10, 100, 500])
+    parser.add_argument('--packets', type=int, default=200000)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    for count in args.sources:
+        settings = make_settings(count)
+        cache = LegacySettingsCache(settings)
+        store = SettingsStore(os.path.join(directory.name, 'settings.json'))
+        detector = VBANDetector(port=0, settings_store=store)
+        detector.start_listening()
+        store.save(settings)
+        last = settings['saved_vban_sources'][-1]
+        ip, name = last['ip'], last['stream_name']
+        key = (ip, name)
+
+        start = time.perf_counter()
+        for _ in range(args.packets):
+            legacy_admit(cache, ip, name)
+        legacy = (time.perf_counter() - start) / args.packets
+
+        start = time.perf_counter()
+        for batch_start in range(0, args.packets, BATCH_SIZE):
+            admission = detector._admission
+            for _ in range(min(BATCH_SIZE, args.packets - batch_start)):
+                admission is not None and key in admission
+        indexed = (time.perf_counter() - start) / args.packets
+        detector.cleanup()
+
+        print(f"{count:4d} sources : parcours {1e9 * legacy:8.0f} ns/paquet, "
+              f"index {1e9 * indexed:5.0f} ns/paquet")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark du décodage des charges utiles VBAN.
+
+Pour chaque format VBAN pris en charge (u8, int16, int24 compacté, int32,
+float32, float64), un paquet 8 canaux aussi long que le permet la limite VBAN
+(1436 octets, 256 trames au plus) est décodé en mono float32 :
+- chemin naïf : frombuffer, conversion float32, normalisation puis
+  reshape/mean (le 24 bits est recomposé octet par octet) ;
+- decode_packet : une réduction NumPy sur une vue du paquet.
+Les deux résultats sont comparés puis le temps par paquet est affiché.
+
+Usage :
+    python benchmarks/bench_vban_decode.py --channels 8 --iterations 20000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vban_receiver import VBAN_HEADER_SIZE, VBAN_DATA_TYPES, VBAN_DATA_TYPE_NAMES, decode_packet
+
+VBAN_MAX_PAYLOAD = 1436 - VBAN_HEADER_SIZE
+
+
+def make_packet(data_type, frames, channels):
+    """Paquet VBAN (en-tête compris) rempli de bruit dans le format demandé"""
+    signal = np.random.default_rng(data_type).uniform(-0.9, 0.9, (frames, channels))
+    if data_type == 0:
+        raw = np.round(signal * 128 + 128).astype('u1').tobytes()
+    elif data_type == 1:
+        raw = np.round(signal * 32767).astype('<i2').tobytes()
+    elif data_type == 2:
+        wide = np.round(signal * (2 ** 23 - 1)).astype('<i4').reshape(-1)
+        raw = wide.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    elif data_type == 3:
+        raw = np.round(signal * (2 ** 31 - 1)).astype('<i4').tobytes()
+    else:
+        raw = signal.astype('<f4' if data_type == 4 else '<f8').tobytes()
+    return np.frombuffer(b'VBAN' + bytes(VBAN_HEADER_SIZE - 4) + raw, dtype=np.uint8)
+
+
+def naive_decode(packet, data_type, channels):
+    """Décodage en plusieurs passes, avec tableaux intermédiaires"""
+    payload = packet[VBAN_HEADER_SIZE:].tobytes()
+    if data_type == 2:
+        raw = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        audio = values.astype(np.float32) / 8388608.0
+    else:
+        dtype, zero, scale, _ = VBAN_DATA_TYPES[data_type]
+        audio = (np.frombuffer(payload, dtype=dtype).astype(np.float32) - zero) * scale
+    return audio.reshape(-1, channels).mean(axis=1)
+
+
+def measure(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--channels', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{args.channels} canaux, {args.iterations} paquets par mesure")
+    for data_type, (_, _, _, width) in VBAN_DATA_TYPES.items():
+        frames = min(256, VBAN_MAX_PAYLOAD // (width * args.channels))
+        packet = make_packet(data_type, frames, args.channels)
+
+        error = np.abs(decode_packet(packet, data_type, args.channels)
+                       - naive_decode(packet, data_type, args.channels)).max()
+        naive = measure(lambda: naive_decode(packet, data_type, args.channels), args.iterations)
+        fused = measure(lambda: decode_packet(packet, data_type, args.channels), args.iterations)
+        print(f"  {VBAN_DATA_TYPE_NAMES[data_type]:8s} {frames:3d} trames : naïf {1e6 * naive:5.2f} µs, "
+              f"decode_packet {1e6 * fused:5.2f} µs ({naive / fused:4.1f}x), écart max {error:.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Test de charge UDP local de la réception VBAN.
+
+Un processus émetteur envoie des paquets VBAN (256 échantillons stéréo int16,
+comme un flux 48 kHz) à débit croissant vers 127.0.0.1. Le thread récepteur
+reproduit soit l'ancienne boucle (recvfrom par paquet, tranche data[28:],
+en-tête lu octet par octet), soit VBANReceiver (recvfrom_into par lots dans des
+buffers préalloués, en-têtes lus via un dtype structuré). Pour chaque débit on
+compte les paquets perdus et le temps CPU du récepteur par paquet ; le débit
+maximal sans perte est affiché.
+
+Usage :
+    python benchmarks/bench_vban_udp.py --rates 2000 5000 10000 20000 40000
+"""
+import os
+import sys
+import time
+import socket
+import struct
+import argparse
+import threading
+import multiprocessing
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vban_receiver import VBANReceiver, VBAN_DATATYPE_MASK, decode_packet
+from vban_detector_new import VBANDetector
+
+SAMPLES = 256
+CHANNELS = 2
+
+
+def make_packet(frame):
+    header = b'VBAN' + struct.pack('<BBBB16sI', 3, SAMPLES - 1, CHANNELS - 1, 1, b'Bench', frame)
+    payload = (np.arange(SAMPLES * CHANNELS) % 1000).astype('<i2').tobytes()
+    return header + payload
+
+
+def send(port, rate, duration):
+    """Envoie rate paquets/s pendant duration secondes, par rafales d'une milliseconde"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packet = bytearray(make_packet(0))
+    per_tick = max(1, rate // 1000)
+    total = int(rate * duration)
+    sent = 0
+    start = time.perf_counter()
+    while sent < total:
+        for _ in range(min(per_tick, total - sent)):
+            struct.pack_into('<I', packet, 24, sent)
+            sock.sendto(packet, ('127.0.0.1', port))
+            sent += 1
+        delay = start + sent / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    sock.close()
+
+
+def legacy_loop(sock, state):
+    """Ancienne boucle de VBANDetector._listen_loop (réception et décodage)"""
+    detector = VBANDetector()
+    start = time.thread_time()
+    while state['running']:
+        try:
+            data, addr = sock.recvfrom(2048)
+        except socket.timeout:
+            continue
+        if len(data) < 28 or data[0:4] != b'VBAN':
+            continue
+        sr_index = data[4] & 0x1F
+        channels = data[6] + 1
+        name = detector.clean_vban_name(data[8:28])
+        source = type('VBANSource', (), {'name': name, 'ip': addr[0], 'port': addr[1],
+                                         'channels': channels, 'sample_rate': sr_index})
+        audio_bytes = data[28:]
+        num_samples = len(audio_bytes) // 2
+        # Décodage mesuré, résultat ignoré
+        (np.frombuffer(audio_bytes[:num_samples * 2], dtype=np.int16).astype(np.float32) / 32768.0
+         ).reshape(-1, source.channels).mean(axis=1)
+        state['received'] += 1
+    state['cpu'] = time.thread_time() - start
+
+
+def batched_loop(sock, state):
+    """Réception par lots avec VBANReceiver"""
+    receiver = VBANReceiver(sock)
+    start = time.thread_time()
+    while state['running']:
+        try:
+            count = receiver.receive()
+        except socket.timeout:
+            continue
+        valid = receiver.valid_audio()
+        headers = receiver.headers()
+        channel_counts = headers['nbc'] + 1
+        data_types = headers['bit'] & VBAN_DATATYPE_MASK
+        for index in np.flatnonzero(valid):
+            decode_packet(receiver.packet(index), int(data_types[index]), int(channel_counts[index]))
+        state['received'] += count
+    state['cpu'] = time.thread_time() - start
+
+
+def run(loop, rate, duration, rcvbuf):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(0.05)
+    state = {'running': True, 'received': 0, 'cpu': 0.0}
+    thread = threading.Thread(target=loop, args=(sock, state))
+    thread.start()
+
+    sender = multiprocessing.Process(target=send, args=(sock.getsockname()[1], rate, duration))
+    sender.start()
+    sender.join()
+    # Laisser le récepteur vider le socket
+    previous = -1
+    while previous != state['received']:
+        previous = state['received']
+        time.sleep(0.2)
+    state['running'] = False
+    thread.join()
+    sock.close()
+    return state['received'], int(rate * duration), state['cpu']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=int, nargs='+', default=[2000, 5000, 10000, 20000, 40000],
+                        help='Débits testés (paquets/s)')
+    parser.add_argument('--duration', type=float, default=2.0, help='Durée de chaque palier (s)')
+    parser.add_argument('--rcvbuf', type=int, default=0, help='SO_RCVBUF du socket (0 : valeur système)')
+    args = parser.parse_args()
+
+    for name, loop in (("recvfrom par paquet", legacy_loop), ("VBANReceiver", batched_loop)):
+        print(name)
+        best = 0
+        for rate in args.rates:
+            received, sent, cpu = run(loop, rate, args.duration, args.rcvbuf)
+            lost = sent - received
+            print(f"  {rate:6d} paquets/s : {received}/{sent} reçus, {100.0 * lost / sent:5.1f} % perdus, "
+                  f"{1e6 * cpu / max(received, 1):5.1f} µs CPU/paquet")
+            if lost == 0:
+                best = rate
+        print(f"  Débit maximal sans perte : {best} paquets/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import numpy as np
+import logging
 import threading
 
 class CircularAudioBuffer:
@@ -91,13 +92,13 @@ class CircularAudioBuffer:
                 n_samples = self.buffer_size
                 
             if self.filled == 0:
-                return np.zeros((n_samples, self.channels))
+                return np.zeros((n_samples, self.channels), dtype=np.float32)
                 
             # On ne peut pas lire plus que ce qu'on a écrit
             n_samples = min(n_samples, self.filled)
             
             # Création du buffer de sortie
-            result = np.zeros((n_samples, self.channels))
+            result = np.zeros((n_samples, self.channels), dtype=np.float32)
             
             # Calcul de la position de début de lecture
             start_pos = (self.write_pos - n_samples) % self.buffer_size
@@ -113,6 +114,15 @@ class CircularAudioBuffer:
             
             return result
                 
+    def get_buffer(self):
+        """
+        Retourne tout le contenu du buffer, du plus ancien au plus récent.
+        
+        Returns:
+            numpy.ndarray: Copie des échantillons remplis, de forme (filled, channels)
+        """
+        return self.read(self.filled)
+                
     def clear(self):
         """Vide le buffer."""
         with self.lock:
@@ -129,3 +139,134 @@ class CircularAudioBuffer:
         """
         with self.lock:
             return self.filled / self.buffer_size
+
+
+
+class AudioRing:
+    """
+    File circulaire float32 préallouée pour un flux audio mono (un écrivain, un lecteur).
+
+    Les échantillons sont repérés par leur position absolue dans le flux. Le
+    stockage est en miroir (2 x capacity) : chaque échantillon est écrit deux
+    fois, ce qui rend toute fenêtre de taille <= capacity contiguë. Les fenêtres
+    sont donc extraites sous forme de vues, sans copie ni allocation.
+    """
+
+    def __init__(self, capacity, storage=None, counter=None):
+        """
+        Initialise la file.
+
+        Args:
+            capacity (int): Nombre d'échantillons conservés
+            storage (numpy.ndarray, optional): Stockage float32 de 2 x capacity échantillons
+            counter (numpy.ndarray, optional): Compteur d'écriture int64 à un élément
+        """
+        self.capacity = int(capacity)
+        self.storage = storage if storage is not None else np.zeros(2 * self.capacity, dtype=np.float32)
+        self._counter = counter if counter is not None else np.zeros(1, dtype=np.int64)
+        self.read_count = 0  # Position du prochain échantillon à consommer
+
+    @property
+    def write_count(self):
+        """Nombre total d'échantillons écrits depuis la création"""
+        return int(self._counter[0])
+
+    def write(self, data):
+        """
+        Ajoute des échantillons à la fin du flux.
+
+        Args:
+            data (numpy.ndarray): Échantillons mono
+        """
+        n = len(data)
+        if n == 0:
+            return
+        if n > self.capacity:
+            self._counter[0] += n - self.capacity
+            data = data[-self.capacity:]
+            n = self.capacity
+        pos = self.write_count % self.capacity
+        self.storage[pos:pos + n] = data
+        first = min(n, self.capacity - pos)
+        self.storage[pos + self.capacity:pos + self.capacity + first] = data[:first]
+        if n > first:
+            self.storage[:n - first] = data[first:]
+        # Publier les échantillons après les avoir écrits
+        self._counter[0] += n
+
+    def view(self, start, length):
+        """
+        Retourne une vue contiguë sur les échantillons [start, start + length).
+
+        La vue reste valide tant que l'écrivain n'a pas dépassé start + capacity.
+        """
+        pos = start % self.capacity
+        return self.storage[pos:pos + length]
+
+    def view_latest(self, n_samples):
+        """
+        Vue contiguë sur les n_samples derniers échantillons écrits, sans copie.
+
+        La vue n'est valide que jusqu'à ce que l'écrivain la recouvre.
+        """
+        end = self.write_count
+        n_samples = min(n_samples, self.capacity, end)
+        return self.view(end - n_samples, n_samples)
+
+    def read_into(self, out):
+        """
+        Copie les derniers échantillons dans un tableau fourni par l'appelant (lecteur uniquement).
+
+        Si la file contient moins de len(out) échantillons, les données sont
+        alignées à droite et le début de out est mis à zéro. La copie est
+        recommencée si l'écrivain a écrasé les échantillons pendant qu'elle
+        était faite.
+
+        Args:
+            out (numpy.ndarray): Tableau float32 de len(out) <= capacity échantillons
+
+        Returns:
+            int: Nombre d'échantillons copiés
+        """
+        while True:
+            end = self.write_count
+            latest = self.view_latest(len(out))
+            n_samples = len(latest)
+            offset = len(out) - n_samples
+            out[:offset] = 0
+            out[offset:] = latest
+            if self.is_available(end - n_samples, n_samples):
+                self.read_count = end
+                return n_samples
+
+    def get_buffer(self):
+        """Copie des échantillons conservés, du plus ancien au plus récent"""
+        out = np.empty((min(self.write_count, self.capacity),) + self.storage.shape[1:], dtype=self.storage.dtype)
+        self.read_into(out)
+        return out
+
+    def is_available(self, start, length):
+        """Indique si la fenêtre est entièrement écrite et pas encore écrasée"""
+        write_count = self.write_count
+        return start + length <= write_count and write_count - start <= self.capacity
+
+    def available(self):
+        """Nombre d'échantillons écrits et pas encore consommés"""
+        write_count = self.write_count
+        # Les échantillons écrasés avant d'être lus sont perdus
+        if write_count - self.read_count > self.capacity:
+            self.read_count = write_count - self.capacity
+        return write_count - self.read_count
+
+    def peek(self, n_samples):
+        """Vue sur les n_samples plus anciens échantillons non consommés"""
+        self.available()
+        return self.view(self.read_count, n_samples)
+
+    def consume(self, n_samples):
+        """Marque n_samples échantillons comme consommés"""
+        self.read_count = min(self.read_count + n_samples, self.write_count)
+
+    def clear(self):
+        """Consomme tous les échantillons en attente"""
+        self.read_count = self.write_count
@@ -1,26 +1,20 @@
 import time
 import requests
-import ffmpeg
 import logging
-import numpy as np
-import sounddevice as sd
-from mediapipe.tasks import python
-from mediapipe.tasks.python.components import containers
-from mediapipe.tasks.python import audio
 from flask_socketio import SocketIO
-import json
 import warnings
 import wave
-import os
-import pyaudio
 import collections
-import cv2
 import sys
-from events import send_clap_event, send_labels
 import threading
-from vban_manager import get_vban_detector  # Import the get_vban_detector function
-import warnings
-from audio_detector import AudioDetector
+from audio_detector import AudioDetector, DEFAULT_DETECTION_THRESHOLD
+from hop_scheduler import hop_from_overlap
+from label_scoring import BUILTIN_PROFILES
+from inference_engine import InferenceEngine
+from inference_pool import ProcessInferencePool
+from ingest_workers import create_ingest_worker
+from settings_store import get_settings_store
+from vban_detector_new import vban_source_enabled, vban_stream_name
 
 # Configuration du logging en DEBUG
 logging.basicConfig(
@@ -41,69 +35,59 @@ model = "yamnet.tflite"
 output_file = "recorded_audio.wav"
 current_audio_source = None
 _socketio = None  # Renamed to _socketio to avoid conflict with parameter
+detector = None  # AudioDetector partagé par toutes les sources de la session
+ingest_workers = {}  # Workers d'acquisition par source_id
+_source_configs = {}  # Configuration des sources de la session par source_id
+_profiles_settings = None  # Section 'detection_profiles' appliquée à la session
+_gate_settings = None  # Options de la porte d'énergie appliquées à la session
+_default_webhook_url = None
+_default_hop = None  # Pas des fenêtres (s) déduit de overlapping_factor au démarrage
+_workers_lock = threading.Lock()
+_reconfigure_lock = threading.Lock()  # Une reconfiguration à chaud à la fois
+_reconfigurations = collections.deque(maxlen=20)  # Rapports des dernières reconfigurations
 
 def reload_settings():
-    """Recharge les paramètres depuis le fichier settings.json"""
-    try:
-        with open('settings.json', 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logging.error(f"Erreur lors du rechargement des paramètres: {e}")
-        return None
+    """Paramètres courants, lus depuis le store en mémoire (sans accès disque)"""
+    return get_settings_store().get()
 
-# Charger les paramètres depuis settings.json
-try:
-    with open('settings.json', 'r') as f:
-        settings = json.load(f)
-        
+def _apply_settings(settings):
+    """Met à jour les paramètres de module à partir des paramètres courants"""
+    global AUDIO_SOURCE, THRESHOLD, DELAY, CHUNK_DURATION, BUFFER_DURATION, fluxes
     # Récupérer la source audio depuis la section microphone
-    microphone_settings = settings.get('microphone', {})
-    if microphone_settings is None:
-        microphone_settings = {}
+    microphone_settings = settings.get('microphone') or {}
     AUDIO_SOURCE = microphone_settings.get('audio_source')
-    
-    # Ne pas lever d'erreur si audio_source n'est pas défini, on le gérera au moment de start_detection
-    if not AUDIO_SOURCE:
-        logging.warning("Aucune source audio n'est définie dans settings.json")
-        
+
     # Récupérer les paramètres globaux avec des valeurs par défaut
-    global_settings = settings.get('global', {})
-    if global_settings is None:
-        global_settings = {}
-        
-    THRESHOLD = float(global_settings.get('threshold', 0.5))
-    DELAY = float(global_settings.get('delay', 2))
-    CHUNK_DURATION = float(global_settings.get('chunk_duration', 0.5))
-    BUFFER_DURATION = float(global_settings.get('buffer_duration', 1.0))
-    
-except FileNotFoundError:
+    global_settings = settings.get('global') or {}
+    try:
+        THRESHOLD = float(global_settings.get('threshold', 0.5))
+        DELAY = float(global_settings.get('delay', 2))
+        CHUNK_DURATION = float(global_settings.get('chunk_duration', 0.5))
+        BUFFER_DURATION = float(global_settings.get('buffer_duration', 1.0))
+    except (TypeError, ValueError) as e:
+        logging.error(f"Paramètres globaux invalides: {e}")
+
+    # Flux RTSP et leurs webhooks associés
+    fluxes = settings.get('rtsp_streams', {})
+
+def _on_settings_changed(change):
+    _apply_settings(change.settings)
+
+AUDIO_SOURCE = None
+THRESHOLD = 0.5
+DELAY = 2.0
+CHUNK_DURATION = 0.5
+BUFFER_DURATION = 1.0
+fluxes = {}
+
+# Charger les paramètres une fois, puis suivre leurs modifications
+if not get_settings_store().exists():
     logging.warning("Le fichier settings.json n'existe pas, utilisation des valeurs par défaut")
-    AUDIO_SOURCE = None
-    THRESHOLD = 0.5
-    DELAY = 2.0
-    CHUNK_DURATION = 0.5
-    BUFFER_DURATION = 1.0
-except json.JSONDecodeError:
-    logging.error("Le fichier settings.json est mal formaté")
-    raise
-except Exception as e:
-    logging.error(f"Erreur lors du chargement des paramètres: {str(e)}")
-    raise
-
-# Charger les flux RTSP et leurs webhooks associés
-try:
-    with open("settings.json") as f:
-        settings_data = json.load(f)
-        fluxes = settings_data.get('rtsp_streams', {})
-except FileNotFoundError:
-    logging.warning("Le fichier settings.json n'existe pas, aucun flux RTSP ne sera chargé")
-    fluxes = {}
-except json.JSONDecodeError:
-    logging.error("Le fichier settings.json est mal formaté")
-    fluxes = {}
-except Exception as e:
-    logging.error(f"Erreur lors du chargement des flux RTSP: {str(e)}")
-    fluxes = {}
+_apply_settings(get_settings_store().get())
+# Ne pas lever d'erreur si audio_source n'est pas défini, on le gérera au moment de start_detection
+if not AUDIO_SOURCE:
+    logging.warning("Aucune source audio n'est définie dans settings.json")
+get_settings_store().subscribe(_on_settings_changed, sections=('microphone', 'global', 'rtsp_streams'))
 
 def save_audio_to_wav(audio_data, sample_rate, filename):
     if not audio_data.size:
@@ -119,41 +103,99 @@ def save_audio_to_wav(audio_data, sample_rate, filename):
     except Exception as e:
         logging.error(f"Failed to save audio to {filename}: {e}")
 
-def read_audio_from_rtsp(rtsp_url, buffer_size):
-    """Lit un flux RTSP audio en continu sans buffer fichier"""
-    try:
-        # Configuration du processus ffmpeg pour lire le flux RTSP
-        process = (
-            ffmpeg
-            .input(rtsp_url)
-            .output('pipe:', 
-                   format='f32le',  # Format PCM 32-bit float
-                   acodec='pcm_f32le', 
-                   ac=1,  # Mono
-                   ar='16000',
-                   buffer_size='64k'  # Réduire la taille du buffer
-            )
-            .run_async(pipe_stdout=True, pipe_stderr=True)
-        )
+def _microphone_sources(microphone_settings, include_disabled):
+    """
+    Sources de détection d'un périphérique : une par canal listé dans 'channels'
+    (chacun avec son nom, son webhook, son seuil et son délai), sinon une seule.
+    """
+    device_index = int(microphone_settings.get('device_index', 0) or 0)
+    name = microphone_settings.get('audio_source') or f"Microphone {device_index}"
+    base = {
+        'type': 'microphone',
+        'device_index': device_index,
+        'sample_rate': microphone_settings.get('sample_rate'),
+        'webhook_url': microphone_settings.get('webhook_url'),
+        'threshold': microphone_settings.get('threshold'),
+        'delay': microphone_settings.get('delay'),
+        'hop': microphone_settings.get('hop'),
+        'enabled': microphone_settings.get('enabled', False)
+    }
+    channels = microphone_settings.get('channels')
+    if not isinstance(channels, list):
+        return [dict(base, id=f"mic_{device_index}", name=name, channel=0)]
 
-        while True:
-            # Lecture des données audio par blocs
-            in_bytes = process.stdout.read(buffer_size * 4)  # 4 bytes par sample float32
-            if not in_bytes:
-                break
-                
-            # Conversion en numpy array
-            audio_chunk = np.frombuffer(in_bytes, np.float32)
-            
-            if len(audio_chunk) > 0:
-                yield audio_chunk.reshape(-1, 1)
-            
-    except Exception as e:
-        logging.error(f"Erreur lors de la lecture RTSP: {e}")
-        yield None
-    finally:
-        if process:
-            process.kill()
+    sources = []
+    for channel_settings in channels:
+        channel = int(channel_settings.get('channel', 0))
+        if not (include_disabled or channel_settings.get('enabled', True)):
+            continue
+        source = dict(base, id=f"mic_{device_index}_{channel}", channel=channel,
+                      name=channel_settings.get('name') or f"{name} - canal {channel + 1}")
+        for key in ('webhook_url', 'threshold', 'delay', 'hop'):
+            if channel_settings.get(key) is not None:
+                source[key] = channel_settings[key]
+        source['enabled'] = base['enabled'] and channel_settings.get('enabled', True)
+        sources.append(source)
+    return sources
+
+def collect_sources(settings, include_disabled=False):
+    """
+    Construit la liste des sources de détection à partir des paramètres.
+
+    Args:
+        settings (dict): Paramètres (format settings.json ou paramètres de détection)
+        include_disabled (bool): Inclure aussi les sources désactivées
+
+    Returns:
+        list: Configurations des sources (id, type, name, webhook_url, ...)
+    """
+    sources = []
+    if not settings:
+        return sources
+
+    # Microphones : 'microphone' puis les périphériques supplémentaires de 'microphones'
+    devices = [settings.get('microphone')] + list(settings.get('microphones') or [])
+    for microphone_settings in devices:
+        if isinstance(microphone_settings, dict) and (include_disabled or microphone_settings.get('enabled', False)):
+            sources.extend(_microphone_sources(microphone_settings, include_disabled))
+
+    # Flux RTSP
+    for source in settings.get('rtsp_sources') or []:
+        if not source.get('url') or not (include_disabled or source.get('enabled', False)):
+            continue
+        sources.append({
+            'id': f"rtsp_{source['url']}",
+            'type': 'rtsp',
+            'name': source.get('name') or source['url'],
+            'url': source['url'],
+            'backend': source.get('backend') or 'ffmpeg',
+            'webhook_url': source.get('webhook_url'),
+            'threshold': source.get('threshold'),
+            'delay': source.get('delay'),
+            'hop': source.get('hop'),
+            'enabled': source.get('enabled', False)
+        })
+
+    # Sources VBAN sauvegardées
+    for source in settings.get('saved_vban_sources') or []:
+        if not source.get('ip') or not (include_disabled or vban_source_enabled(source)):
+            continue
+        stream_name = vban_stream_name(source)
+        sources.append({
+            'id': f"vban_{source['ip']}_{stream_name}",
+            'type': 'vban',
+            'name': source.get('name') or stream_name,
+            'ip': source['ip'],
+            'port': source.get('port', 6980),
+            'stream_name': stream_name,
+            'webhook_url': source.get('webhook_url'),
+            'threshold': source.get('threshold'),
+            'delay': source.get('delay'),
+            'hop': source.get('hop'),
+            'enabled': vban_source_enabled(source)
+        })
+
+    return sources
 
 def start_detection(
     model,
@@ -163,8 +205,9 @@ def start_detection(
     socketio: SocketIO,
     webhook_url: str,
     delay: float,
-    audio_source: str,
+    audio_source: str = None,
     rtsp_url: str = None,
+    sources: list = None,
 ):
     global detection_running, classifier, record, current_audio_source, _socketio
     
@@ -172,18 +215,13 @@ def start_detection(
         if detection_running:
             return False
 
-        # Recharger les paramètres pour avoir les dernières modifications
-        settings = reload_settings()
-        if settings:
-            microphone_settings = settings.get('microphone', {})
-            if isinstance(microphone_settings, dict) and microphone_settings.get('enabled', False):
-                # Utiliser les paramètres du microphone les plus récents
-                audio_source = microphone_settings.get('audio_source')
-                logging.info(f"Utilisation du microphone: {audio_source}")
+        # Sans liste explicite, utiliser toutes les sources actives des paramètres
+        if sources is None:
+            sources = collect_sources(reload_settings())
 
-        detection_running = True
-        current_audio_source = audio_source
-        _socketio = socketio  # Store the socketio instance globally
+        if not sources:
+            logging.error("Aucune source audio n'est configurée ou active")
+            return False
 
         if (overlapping_factor <= 0) or (overlapping_factor >= 1.0):
             raise ValueError("Overlapping factor must be between 0 and 1.")
@@ -191,6 +229,10 @@ def start_detection(
         if (score_threshold < 0) or (score_threshold > 1.0):
             raise ValueError("Score threshold must be between (inclusive) 0 et 1.")
 
+        detection_running = True
+        current_audio_source = audio_source or ", ".join(source['id'] for source in sources)
+        _socketio = socketio  # Store the socketio instance globally
+
         # Démarrer la détection dans un thread séparé
         detection_thread = threading.Thread(target=run_detection, args=(
             model,
@@ -200,8 +242,7 @@ def start_detection(
             socketio,
             webhook_url,
             delay,
-            audio_source,
-            rtsp_url
+            sources
         ))
         detection_thread.daemon = True
         detection_thread.start()
@@ -213,165 +254,428 @@ def start_detection(
         detection_running = False
         return False
 
-def run_detection(model, max_results, score_threshold, overlapping_factor, socketio, webhook_url, delay, audio_source, rtsp_url):
-    """Fonction qui exécute la détection dans un thread séparé"""
-    try:
-        # Initialiser le détecteur audio
-        detector = AudioDetector(model, sample_rate=16000, buffer_duration=1.0)
-        detector.initialize()
-        
-        def create_detection_callback(source_name, webhook_url=None):
-            def handle_detection(detection_data):
-                try:
-                    logging.info(f"CLAP détecté sur {source_name} avec score {detection_data['score']}")
-                    if socketio:
-                        socketio.emit('clap', {
-                            'source_id': source_name,
-                            'timestamp': detection_data['timestamp'],
-                            'score': detection_data['score']
-                        })
-                    
-                    # Utiliser le webhook_url passé au callback
-                    if webhook_url:
-                        logging.info(f"Envoi webhook pour {source_name} vers {webhook_url}")
-                        requests.post(webhook_url)
-                except Exception as e:
-                    logging.error(f"Erreur lors de l'envoi de l'événement clap pour {source_name}: {str(e)}")
-            return handle_detection
-        
-        def create_labels_callback(source_name):
-            def handle_labels(labels):
-                logging.debug(f"Labels détectés sur {source_name}: {labels}")
-                if socketio:
-                    socketio.emit("labels", {"source": source_name, "detected": labels})
-            return handle_labels
-        
-        # Vérifier si une source audio est configurée
-        if not audio_source:
-            logging.error("Aucune source audio n'est configurée ou active")
-            return
-            
-        # Initialiser la source audio en fonction du paramètre audio_source
-        if audio_source.startswith("rtsp"):
-            if not rtsp_url:
-                raise ValueError("RTSP URL must be provided for RTSP audio source.")
-                
-            source_id = f"rtsp_{rtsp_url}"
-            
-            # Récupérer le webhook_url depuis les paramètres RTSP
-            settings = reload_settings()
-            rtsp_webhook_url = None
-            if settings and 'rtsp_sources' in settings:
-                for source in settings['rtsp_sources']:
-                    if source.get('url') == rtsp_url and source.get('enabled', True):
-                        rtsp_webhook_url = source.get('webhook_url')
-                        break
-            
-            # Utiliser le webhook spécifique à la source RTSP s'il existe, sinon utiliser celui par défaut
-            webhook_url_to_use = rtsp_webhook_url or webhook_url
-            
-            detector.add_source(
-                source_id=source_id,
-                detection_callback=create_detection_callback(source_id, webhook_url_to_use),
-                labels_callback=create_labels_callback(source_id)
-            )
-            
-            # Démarrer la détection
-            detector.start()
-            logging.info(f"Détection démarrée pour la source RTSP {source_id}")
-            
-            rtsp_reader = read_audio_from_rtsp(rtsp_url, int(16000 * 0.1))  # Buffer de 100ms
-            while detection_running:
-                audio_data = next(rtsp_reader)
-                detector.process_audio(audio_data, source_id)
-                
-        elif audio_source.startswith("vban://"):
-            vban_ip = audio_source.replace("vban://", "")
-            source_id = f"vban_{vban_ip}"
-            
-            # Récupérer le webhook_url depuis les paramètres VBAN
-            settings = reload_settings()
-            vban_webhook_url = None
-            if settings and 'saved_vban_sources' in settings:
-                for source in settings['saved_vban_sources']:
-                    if source.get('ip') == vban_ip and source.get('enabled', True):
-                        vban_webhook_url = source.get('webhook_url')
-                        break
-            
-            # Utiliser le webhook spécifique à la source VBAN s'il existe, sinon utiliser celui par défaut
-            webhook_url_to_use = vban_webhook_url or webhook_url
-            
-            detector.add_source(
-                source_id=source_id,
-                detection_callback=create_detection_callback(source_id, webhook_url_to_use),
-                labels_callback=create_labels_callback(source_id)
-            )
-            
-            # Démarrer la détection
-            detector.start()
-            logging.info(f"Détection démarrée pour la source VBAN {source_id} avec webhook {webhook_url_to_use}")
-            
-            vban_detector = get_vban_detector()
-            
-            def audio_callback(audio_data, timestamp):
-                if not detection_running:
-                    return
-                    
-                active_sources = vban_detector.get_active_sources()
-                if vban_ip not in active_sources:
-                    return
-                    
-                detector.process_audio(audio_data, source_id)
-            
-            vban_detector.set_audio_callback(audio_callback)
-            
-            # Maintenir le thread en vie tant que la détection est active
-            while detection_running:
-                time.sleep(0.1)  # Éviter de surcharger le CPU
-                
-                # Vérifier périodiquement si la source est toujours active
-                active_sources = vban_detector.get_active_sources()
-                if vban_ip not in active_sources:
-                    logging.warning(f"Source VBAN {vban_ip} non trouvée")
-                    time.sleep(1)  # Attendre un peu plus longtemps avant la prochaine vérification
-                    
-        else:  # Microphone
-            # Récupérer l'index du périphérique depuis les paramètres
-            settings = reload_settings()
-            device_index = int(settings.get('microphone', {}).get('device_index', 0))
-            source_id = f"mic_{device_index}"
-            
-            # Récupérer le webhook_url depuis les paramètres du microphone
-            microphone_webhook_url = settings.get('microphone', {}).get('webhook_url')
-            webhook_url_to_use = microphone_webhook_url or webhook_url
+def create_detection_callback(source_name, webhook_url=None):
+    def handle_detection(detection_data):
+        try:
+            logging.info(f"CLAP détecté sur {source_name} avec score {detection_data['score']}")
+            if _socketio:
+                _socketio.emit('clap', {
+                    'source_id': source_name,
+                    'timestamp': detection_data['timestamp'],
+                    'score': detection_data['score']
+                })
             
+            # Utiliser le webhook_url passé au callback
+            if webhook_url:
+                logging.info(f"Envoi webhook pour {source_name} vers {webhook_url}")
+                requests.post(webhook_url)
+        except Exception as e:
+            logging.error(f"Erreur lors de l'envoi de l'événement clap pour {source_name}: {str(e)}")
+    return handle_detection
+
+def create_profile_callback(profile_name, webhook_url=None):
+    """Callback d'un profil de détection (bris de verre, alarme, ...) commun à toutes les sources"""
+    def handle_detection(detection_data):
+        try:
+            source_name = detection_data['source_id']
+            logging.info(f"{profile_name} détecté sur {source_name} avec score {detection_data['score']}")
+            if _socketio:
+                _socketio.emit('sound_event', {
+                    'profile': profile_name,
+                    'source_id': source_name,
+                    'timestamp': detection_data['timestamp'],
+                    'score': detection_data['score']
+                })
+            if webhook_url:
+                logging.info(f"Envoi webhook {profile_name} pour {source_name} vers {webhook_url}")
+                requests.post(webhook_url, json={
+                    'event': profile_name,
+                    'source_id': source_name,
+                    'score': detection_data['score'],
+                    'timestamp': detection_data['timestamp']
+                })
+        except Exception as e:
+            logging.error(f"Erreur lors de l'envoi de l'événement {profile_name}: {str(e)}")
+    return handle_detection
+
+def collect_profiles(settings):
+    """
+    Construit les profils de détection activés (hors clap) à partir des paramètres.
+
+    La section 'detection_profiles' associe un nom de profil à {'enabled',
+    'threshold', 'delay', 'webhook_url'} ; 'labels' et 'negative_labels'
+    permettent de définir un profil absent de BUILTIN_PROFILES.
+
+    Args:
+        settings (dict): Paramètres (format settings.json)
+
+    Returns:
+        dict: Profils au format de AudioDetector.set_profiles
+    """
+    profiles = {}
+    for name, profile_settings in ((settings or {}).get('detection_profiles') or {}).items():
+        if name == 'clap' or not isinstance(profile_settings, dict) or not profile_settings.get('enabled', False):
+            continue
+        builtin = BUILTIN_PROFILES.get(name, {})
+        labels = profile_settings.get('labels') or builtin.get('labels')
+        if not labels:
+            logging.error(f"Profil de détection {name} ignoré : aucune classe YAMNet")
+            continue
+        profiles[name] = {
+            'labels': labels,
+            'negative_labels': profile_settings.get('negative_labels') or builtin.get('negative_labels'),
+            'threshold': _optional_float(profile_settings.get('threshold')),
+            'delay': _optional_float(profile_settings.get('delay')),
+            'callback': create_profile_callback(name, profile_settings.get('webhook_url'))
+        }
+    return profiles
+
+def create_labels_callback(source_name):
+    def handle_labels(labels):
+        logging.debug(f"Labels détectés sur {source_name}: {labels}")
+        if _socketio:
+            _socketio.emit("labels", {"source": source_name, "detected": labels})
+    return handle_labels
+
+def start_source(source_config):
+    """
+    Démarre l'acquisition d'une source dans la session de détection en cours.
+
+    Args:
+        source_config (dict): Configuration de la source (voir collect_sources)
+
+    Returns:
+        bool: True si la source a été démarrée
+    """
+    source_id = source_config['id']
+    with _workers_lock:
+        if not detection_running or detector is None:
+            logging.warning(f"Aucune détection en cours, impossible de démarrer {source_id}")
+            return False
+
+        worker = ingest_workers.get(source_id)
+        if worker and worker.is_alive():
+            return False
+
+        if source_id not in detector.sources:
+            # Utiliser le webhook spécifique à la source s'il existe, sinon celui par défaut
+            webhook_url_to_use = source_config.get('webhook_url') or _default_webhook_url
             detector.add_source(
                 source_id=source_id,
                 detection_callback=create_detection_callback(source_id, webhook_url_to_use),
-                labels_callback=create_labels_callback(source_id)
+                labels_callback=create_labels_callback(source_id),
+                threshold=_optional_float(source_config.get('threshold')),
+                delay=_optional_float(source_config.get('delay')),
+                hop=_optional_float(source_config.get('hop'))
             )
-            
-            # Démarrer la détection
-            detector.start()
-            logging.info(f"Détection démarrée pour la source microphone {source_id}")
-            
-            with sd.InputStream(
-                device=device_index,
-                channels=1,
-                samplerate=16000,
-                blocksize=int(16000 * 0.1),  # Buffer de 100ms
-                callback=lambda indata, frames, time, status: detector.process_audio(indata[:, 0], source_id)
-            ):
-                logging.info("Stream audio démarré pour le microphone")
-                while detection_running:
-                    time.sleep(0.1)
-                    
-        detector.stop()
+
+        worker = create_ingest_worker(source_config, detector)
+        ingest_workers[source_id] = worker
+        _source_configs[source_id] = source_config
+        worker.start()
+        logging.info(f"Détection démarrée pour la source {source_config['type']} {source_id}")
+        return True
+
+def stop_source(source_id):
+    """
+    Arrête l'acquisition d'une source sans interrompre les autres.
+
+    Returns:
+        bool: True si la source était active
+    """
+    with _workers_lock:
+        worker = ingest_workers.pop(source_id, None)
+        _source_configs.pop(source_id, None)
+        if worker is None:
+            return False
+        worker.stop()
+        if detector is not None:
+            # Libérer le buffer de la source seulement quand plus aucun thread n'y écrit,
+            # sauf si la source a été redémarrée entre-temps
+            def release(current=detector):
+                if source_id not in ingest_workers:
+                    current.remove_source(source_id)
+            worker.when_stopped(release)
+        logging.info(f"Détection arrêtée pour la source {source_id}")
+        return True
+
+def _optional_float(value):
+    """Convertit un paramètre optionnel (chaîne, nombre ou vide) en float ou None"""
+    if value is None or value == '':
+        return None
+    return float(value)
+
+def _update_source(source_id, previous, config):
+    """
+    Applique à une source en cours les différences de configuration.
+
+    Returns:
+        str: 'unchanged', 'updated' (sans interruption) ou 'restarted'
+    """
+    if config == previous:
+        return 'unchanged'
+
+    worker = ingest_workers.get(source_id)
+    if worker is None or not worker.update_config(config):
+        # Paramètre d'acquisition modifié (URL, périphérique, ...) : rouvrir le flux
+        stop_source(source_id)
+        start_source(config)
+        return 'restarted'
+
+    changes = {}
+    if config.get('webhook_url') != previous.get('webhook_url'):
+        webhook_url_to_use = config.get('webhook_url') or _default_webhook_url
+        changes['detection_callback'] = create_detection_callback(source_id, webhook_url_to_use)
+    if config.get('threshold') != previous.get('threshold'):
+        changes['threshold'] = _optional_float(config.get('threshold'))
+    if config.get('delay') != previous.get('delay'):
+        changes['delay'] = _optional_float(config.get('delay'))
+    if config.get('hop') != previous.get('hop'):
+        changes['hop'] = _optional_float(config.get('hop'))
+    if changes:
+        detector.update_source(source_id, **changes)
+    _source_configs[source_id] = config
+    return 'updated'
+
+def _clap_threshold(global_settings):
+    """
+    Seuil du score de clap : 'clap_threshold' s'il est défini, sinon DEFAULT_DETECTION_THRESHOLD.
+
+    'threshold' (curseur « Précision », 0.1 dans le settings.json fourni) n'a
+    jamais réglé le seuil du clap : l'appliquer triplerait la sensibilité des
+    installations existantes.
+    """
+    threshold = _optional_float(global_settings.get('clap_threshold'))
+    return threshold if threshold is not None else DEFAULT_DETECTION_THRESHOLD
+
+def _window_hop(global_settings):
+    """Pas des fenêtres en secondes : 'inference_hop' s'il est défini, sinon celui de overlapping_factor"""
+    hop = _optional_float(global_settings.get('inference_hop'))
+    return hop if hop is not None else _default_hop
+
+def _apply_onset_gate(global_settings):
+    """
+    Active la porte d'énergie si 'onset_gate' est vrai dans les paramètres globaux.
+
+    Les fenêtres calmes ne sont alors plus classifiées. La porte n'est recréée
+    (compteurs remis à zéro) que si ses options changent.
+    """
+    global _gate_settings
+    options = {}
+    if global_settings.get('onset_gate'):
+        for key, option in (('onset_gate_ratio_db', 'ratio_db'), ('onset_gate_hold', 'hold')):
+            if global_settings.get(key) is not None:
+                options[option] = float(global_settings[key])
+    gate_settings = options if global_settings.get('onset_gate') else None
+    if gate_settings != _gate_settings:
+        detector.set_gate(gate_settings is not None, **options)
+        _gate_settings = gate_settings
+
+def reconfigure_detection(settings):
+    """
+    Applique à chaud de nouveaux paramètres à la détection en cours.
+
+    Seules les sources dont la configuration a changé sont touchées : une source
+    ajoutée est démarrée, une source retirée ou désactivée est arrêtée, un
+    changement de webhook, de seuil ou de délai est appliqué sans interrompre
+    l'audio ; seul un changement d'URL, de périphérique ou de flux VBAN
+    redémarre l'acquisition de la source concernée.
+
+    Args:
+        settings (dict): Paramètres (format settings.json)
+
+    Returns:
+        dict: Rapport (actions par source, durées en millisecondes), None si aucune détection n'est en cours
+    """
+    global _profiles_settings
+    if not detection_running or detector is None:
+        return None
+
+    with _reconfigure_lock:
+        start = time.perf_counter()
+        actions = []
+
+        def log_action(source_id, action, action_start):
+            actions.append({
+                'source_id': source_id,
+                'action': action,
+                'duration_ms': round((time.perf_counter() - action_start) * 1000, 3)
+            })
+
+        # Seuil et délai par défaut
+        global_settings = settings.get('global') or {}
+        try:
+            detector.configure(threshold=_clap_threshold(global_settings),
+                               delay=_optional_float(global_settings.get('delay')),
+                               hop=_window_hop(global_settings))
+        except (TypeError, ValueError) as e:
+            logging.error(f"Paramètres globaux invalides, seuil, délai et pas inchangés: {e}")
+        try:
+            _apply_onset_gate(global_settings)
+        except (TypeError, ValueError) as e:
+            logging.error(f"Options de la porte d'énergie invalides, porte inchangée: {e}")
+
+        # Profils de détection : remplacés ensemble, sans toucher aux sources
+        if settings.get('detection_profiles') != _profiles_settings:
+            action_start = time.perf_counter()
+            try:
+                detector.set_profiles(collect_profiles(settings))
+                _profiles_settings = settings.get('detection_profiles')
+                log_action('profiles', 'updated', action_start)
+            except (TypeError, ValueError) as e:
+                logging.error(f"Profils de détection invalides, profils inchangés: {e}")
+
+        desired = {config['id']: config for config in collect_sources(settings)}
+        current = dict(_source_configs)
+        unchanged = 0
+
+        for source_id in current.keys() - desired.keys():
+            action_start = time.perf_counter()
+            stop_source(source_id)
+            log_action(source_id, 'removed', action_start)
+
+        for source_id, config in desired.items():
+            action_start = time.perf_counter()
+            try:
+                if source_id not in current:
+                    action = 'added' if start_source(config) else 'failed'
+                else:
+                    action = _update_source(source_id, current[source_id], config)
+            except Exception as e:
+                logging.error(f"Reconfiguration impossible pour la source {source_id}: {e}")
+                action = 'failed'
+            if action == 'unchanged':
+                unchanged += 1
+            else:
+                log_action(source_id, action, action_start)
+
+        report = {
+            'timestamp': time.time(),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            'unchanged': unchanged,
+            'actions': actions
+        }
+        _reconfigurations.append(report)
+        logging.info(f"Reconfiguration à chaud en {report['duration_ms']:.1f} ms: "
+                     f"{len(actions)} source(s) modifiée(s), {unchanged} inchangée(s)")
+        return report
+
+def get_reconfigurations():
+    """Rapports des dernières reconfigurations à chaud"""
+    return list(_reconfigurations)
+
+def _on_detection_settings_changed(change):
+    """Répercute les paramètres sauvegardés sur la détection en cours"""
+    reconfigure_detection(change.settings)
+
+def get_sources_status():
+    """Retourne l'état de chaque source de la session de détection"""
+    with _workers_lock:
+        statuses = [worker.get_status() for worker in ingest_workers.values()]
+    if detector is not None:
+        # Porte d'énergie et fenêtres glissantes (pas, débit d'inférence), par source
+        for status in statuses:
+            gate = detector.get_gate_stats(status['id'])
+            if gate is not None:
+                status['gate'] = gate
+            inference = detector.get_inference_stats(status['id'])
+            if inference is not None:
+                status['inference'] = inference
+    return statuses
+
+def get_engine_stats():
+    """Retourne les statistiques du moteur d'inférence de la session en cours"""
+    return detector.get_engine_stats() if detector is not None else {}
+
+def get_source_config(source_id):
+    """Retourne la configuration d'une source de la session en cours"""
+    return _source_configs.get(source_id)
+
+def run_detection(model, max_results, score_threshold, overlapping_factor, socketio, webhook_url, delay, sources):
+    """Fonction qui exécute la détection dans un thread séparé"""
+    global detector, _default_webhook_url, _default_hop, _profiles_settings, _gate_settings
+    try:
+        # Contextes d'inférence : les sources sont réparties entre eux et classifiées en parallèle
+        global_settings = reload_settings().get('global') or {}
+        # 'tflite' : interpréteur direct (scores bruts, threads configurables) au lieu de MediaPipe
+        # 'tflite_mel' : réseau convolutif seul, trames log-mel calculées une fois par source et réutilisées
+        backend = global_settings.get('inference_backend') or 'mediapipe'
+        num_threads = int(global_settings.get('inference_threads', 1))
+        if global_settings.get('inference_mode') == 'process':
+            # Workers multi-processus alimentés par des buffers en mémoire partagée
+            engine = ProcessInferencePool(model, sample_rate=16000,
+                                          num_workers=int(global_settings.get('inference_workers', 2)),
+                                          backend=backend, num_threads=num_threads)
+        else:
+            engine = InferenceEngine(model, sample_rate=16000,
+                                     num_contexts=int(global_settings.get('inference_contexts', 1)),
+                                     backend=backend, num_threads=num_threads)
+
+        # Initialiser le détecteur audio partagé par toutes les sources
+        detector = AudioDetector(model, sample_rate=16000, buffer_duration=1.0, engine=engine)
+        detector.initialize()
+        # Fenêtres glissantes : pas déduit du recouvrement, ou 'inference_hop' en secondes
+        _default_hop = hop_from_overlap(overlapping_factor) / detector.sample_rate
+        try:
+            detector.configure(threshold=_clap_threshold(global_settings), delay=delay, hop=_window_hop(global_settings))
+        except (TypeError, ValueError) as e:
+            logging.error(f"Seuil ou pas des fenêtres invalide, valeurs par défaut utilisées: {e}")
+            detector.configure(threshold=DEFAULT_DETECTION_THRESHOLD, delay=delay, hop=_default_hop)
+        logging.info(f"Fenêtres classifiées toutes les {1000 * detector.window_hop / detector.sample_rate:.0f} ms")
+        _default_webhook_url = webhook_url
+        # Profils évalués sur la même inférence que le clap (bris de verre, alarme, chien, sonnette)
+        settings = reload_settings()
+        try:
+            detector.set_profiles(collect_profiles(settings))
+            _profiles_settings = settings.get('detection_profiles')
+        except (TypeError, ValueError) as e:
+            logging.error(f"Profils de détection invalides, seul le clap est détecté: {e}")
+        # Porte d'énergie : les fenêtres sans attaque ne sont pas classifiées
+        try:
+            _apply_onset_gate(global_settings)
+        except (TypeError, ValueError) as e:
+            logging.error(f"Options de la porte d'énergie invalides, porte désactivée: {e}")
+
+        # Démarrer la détection
+        detector.start()
+
+        # Un worker d'acquisition par source
+        for source_config in sources:
+            try:
+                start_source(source_config)
+            except Exception as e:
+                logging.error(f"Impossible de démarrer la source {source_config.get('id')}: {e}")
+
+        # Les paramètres sauvegardés pendant la détection sont appliqués à chaud
+        get_settings_store().subscribe(
+            _on_detection_settings_changed,
+            sections=('global', 'microphone', 'microphones', 'rtsp_sources', 'saved_vban_sources',
+                      'detection_profiles')
+        )
+
+        # Maintenir le thread en vie tant que la détection est active
+        while detection_running:
+            time.sleep(0.1)
+
         return True
         
     except Exception as e:
         logging.error(f"Erreur dans run_detection: {str(e)}")
         return False
+    finally:
+        get_settings_store().unsubscribe(_on_detection_settings_changed)
+        with _workers_lock:
+            for worker in ingest_workers.values():
+                worker.stop()
+            ingest_workers.clear()
+            _source_configs.clear()
+            _profiles_settings = None
+            _gate_settings = None
+        if detector is not None:
+            detector.stop()
+            if detector.engine is not None:
+                detector.engine.stop()
+            detector = None
 
 def stop_detection():
     """Arrête la détection"""
@@ -416,8 +720,6 @@ if __name__ == "__main__":
             socketio=socketio,
             webhook_url="http://example.com/webhook",
             delay=2.0,
-            audio_source=audio_source,
-            rtsp_url=rtsp_url,
         )
     except KeyboardInterrupt:
         logging.info("Detection stopped by user.")
@@ -0,0 +1,122 @@
+import time
+import collections
+from inference_engine import YAMNET_WINDOW_SIZE
+
+RATE_PERIOD = 10.0  # Secondes sur lesquelles le débit d'inférence est mesuré
+
+
+def hop_from_overlap(overlapping_factor, window_size=YAMNET_WINDOW_SIZE):
+    """
+    Pas (en échantillons) entre deux fenêtres qui se recouvrent de overlapping_factor.
+
+    Args:
+        overlapping_factor (float): Recouvrement entre fenêtres successives, dans [0, 1[
+        window_size (int): Taille des fenêtres
+
+    Returns:
+        int: Pas en échantillons (au moins 1)
+    """
+    if not 0 <= overlapping_factor < 1:
+        raise ValueError("Le recouvrement doit être dans [0, 1[")
+    return max(1, int(round(window_size * (1 - overlapping_factor))))
+
+
+class HopScheduler:
+    """
+    Planificateur de fenêtres glissantes à pas fixe pour une source.
+
+    Les fenêtres de window_size échantillons commencent exactement tous les hop
+    échantillons du flux (positions absolues, comme AudioRing.write_count). Le
+    planificateur compte les fenêtres soumises, abandonnées (file d'inférence
+    pleine), ignorées (porte d'énergie) ou perdues (écrasées avant d'être
+    soumises), et mesure le débit d'inférence réel de la source.
+    """
+
+    def __init__(self, hop=YAMNET_WINDOW_SIZE, window_size=YAMNET_WINDOW_SIZE, start=0, sample_rate=16000):
+        """
+        Args:
+            hop (int): Pas entre deux fenêtres (échantillons)
+            window_size (int): Taille des fenêtres (échantillons)
+            start (int): Position absolue de la première fenêtre
+            sample_rate (int): Taux d'échantillonnage (pour les statistiques)
+        """
+        self.window_size = window_size
+        self.sample_rate = sample_rate
+        self.hop = None
+        self.set_hop(hop)
+        self.next_start = start
+        self._submit_times = collections.deque()
+        self._created = time.monotonic()
+
+        # Statistiques
+        self.windows_submitted = 0
+        self.windows_dropped = 0
+        self.windows_skipped = 0
+        self.windows_lost = 0
+
+    def set_hop(self, hop):
+        """Change le pas ; la prochaine fenêtre prévue est conservée"""
+        hop = int(hop)
+        if hop <= 0:
+            raise ValueError("Le pas entre fenêtres doit être positif")
+        self.hop = hop
+
+    def due(self, end):
+        """Vrai si la prochaine fenêtre est complète dans les échantillons écrits jusqu'à end"""
+        return end - self.next_start >= self.window_size
+
+    def catch_up(self, oldest):
+        """Saute les fenêtres dont le début n'est plus disponible (écrasé dans l'anneau)"""
+        if self.next_start < oldest:
+            self.windows_lost += -(-(oldest - self.next_start) // self.hop)
+            self.next_start = oldest
+
+    def advance(self, start=None):
+        """
+        Passe à la fenêtre suivante.
+
+        Args:
+            start (int, optional): Début réel de la fenêtre traitée, s'il a été recalé
+
+        Returns:
+            int: Début de la fenêtre traitée
+        """
+        start = self.next_start if start is None else start
+        self.next_start = start + self.hop
+        return start
+
+    def skip(self):
+        """Ignore la prochaine fenêtre"""
+        self.next_start += self.hop
+        self.windows_skipped += 1
+
+    def record(self, submitted=True):
+        """Compte une fenêtre soumise au moteur d'inférence, ou abandonnée s'il était plein"""
+        if not submitted:
+            self.windows_dropped += 1
+            return
+        self.windows_submitted += 1
+        now = time.monotonic()
+        self._submit_times.append(now)
+        while self._submit_times[0] < now - RATE_PERIOD:
+            self._submit_times.popleft()
+
+    def inference_rate(self):
+        """Fenêtres soumises par seconde sur les RATE_PERIOD dernières secondes"""
+        now = time.monotonic()
+        while self._submit_times and self._submit_times[0] < now - RATE_PERIOD:
+            self._submit_times.popleft()
+        return len(self._submit_times) / max(min(RATE_PERIOD, now - self._created), 1e-3)
+
+    def get_stats(self):
+        """Pas, recouvrement, compteurs de fenêtres et débit d'inférence mesuré"""
+        return {
+            'hop_ms': round(1000 * self.hop / self.sample_rate, 1),
+            'overlap': round(max(0.0, 1 - self.hop / self.window_size), 3),
+            'target_rate': round(self.sample_rate / self.hop, 2),
+            'inference_rate': round(self.inference_rate(), 2),
+            'windows_submitted': self.windows_submitted,
+            'windows_dropped': self.windows_dropped,
+            'windows_skipped': self.windows_skipped,
+            'windows_lost': self.windows_lost
+        }
@@ -0,0 +1,653 @@
+import csv
+import time
+import queue
+import logging
+import threading
+import collections
+import numpy as np
+from mediapipe.tasks import python
+from mediapipe.tasks.python import audio
+from mediapipe.tasks.python.components import containers
+from circular_buffer import AudioRing
+from log_mel_frontend import LogMelFrontend, LogMelStream, split_yamnet_model, YAMNET_FRAME_HOP, YAMNET_PATCH_FRAMES
+
+try:
+    # Backend optionnel : interpréteur TFLite direct (tflite_runtime, ou TensorFlow complet)
+    from tflite_runtime.interpreter import Interpreter as TFLiteInterpreter
+except ImportError:
+    try:
+        from tensorflow.lite import Interpreter as TFLiteInterpreter
+    except ImportError:
+        TFLiteInterpreter = None
+
+YAMNET_SAMPLE_RATE = 16000
+YAMNET_WINDOW_SIZE = 15600  # 0.975 s à 16 kHz, taille d'entrée de yamnet.tflite
+YAMNET_NUM_CLASSES = 521
+YAMNET_EMBEDDING_SIZE = 1024
+YAMNET_EMBEDDING_TENSOR = 'layer28/reduce_mean'  # Moyenne des activations avant la couche de scores (tenseur 115)
+RING_DURATION = 4.0  # Secondes d'audio conservées par source dans son AudioRing
+
+
+def load_class_names(class_map_path="yamnet_class_map.csv"):
+    """
+    Charge les noms des classes YAMNet dans l'ordre des indices du modèle.
+
+    Args:
+        class_map_path (str): Chemin du fichier yamnet_class_map.csv
+
+    Returns:
+        list: Noms des classes, indexés comme le vecteur de scores
+    """
+    with open(class_map_path, newline='') as f:
+        reader = csv.DictReader(f)
+        rows = sorted(reader, key=lambda row: int(row['index']))
+    return [row['display_name'] for row in rows]
+
+
+def copy_window(ring, start, out):
+    """
+    Copie la fenêtre [start, start + YAMNET_WINDOW_SIZE) d'un AudioRing dans out.
+
+    Returns:
+        bool: False si la fenêtre n'est plus disponible, ou si l'écrivain l'a
+        recouverte pendant la copie (fenêtre déchirée)
+    """
+    if not ring.is_available(start, YAMNET_WINDOW_SIZE):
+        return False
+    out[:] = ring.view(start, YAMNET_WINDOW_SIZE)
+    return ring.is_available(start, YAMNET_WINDOW_SIZE)
+
+
+class MediaPipeBackend:
+    """
+    Backend d'inférence basé sur le AudioClassifier MediaPipe en mode AUDIO_CLIPS.
+    Un lot de fenêtres est concaténé en un seul clip : MediaPipe le découpe en
+    fenêtres de 0.975 s et retourne un résultat par fenêtre, en un seul appel.
+    """
+
+    def __init__(self, model_path, sample_rate=YAMNET_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        base_options = python.BaseOptions(model_asset_path=model_path)
+        options = audio.AudioClassifierOptions(
+            base_options=base_options,
+            running_mode=audio.RunningMode.AUDIO_CLIPS,
+            max_results=-1  # Toutes les classes pour reconstruire le vecteur de scores
+        )
+        self.classifier = audio.AudioClassifier.create_from_options(options)
+
+    def classify_batch(self, batch):
+        """
+        Classifie un lot de fenêtres.
+
+        Args:
+            batch (numpy.ndarray): Fenêtres audio float32 de forme (n, YAMNET_WINDOW_SIZE)
+
+        Returns:
+            numpy.ndarray: Scores de forme (n, YAMNET_NUM_CLASSES)
+        """
+        clip = containers.AudioData.create_from_array(batch.reshape(-1), self.sample_rate)
+        results = self.classifier.classify(clip)
+        scores = np.zeros((len(batch), YAMNET_NUM_CLASSES), dtype=np.float32)
+        for row, result in enumerate(results[:len(batch)]):
+            for category in result.classifications[0].categories:
+                scores[row, category.index] = category.score
+        return scores
+
+    def close(self):
+        if self.classifier:
+            self.classifier.close()
+            self.classifier = None
+
+
+class TFLiteBackend:
+    """
+    Backend d'inférence appelant directement l'interpréteur TFLite de yamnet.tflite.
+
+    Le modèle est chargé une fois ; chaque fenêtre est copiée dans le tenseur
+    d'entrée en place puis le vecteur brut de 521 scores est lu en sortie, sans
+    graphe MediaPipe ni objets catégorie. Avec embeddings=True, les embeddings
+    (1024 valeurs par fenêtre) sont conservés dans self.embeddings pour le
+    dernier lot ; l'interpréteur garde alors tous ses tenseurs intermédiaires.
+    """
+
+    def __init__(self, model_path, sample_rate=YAMNET_SAMPLE_RATE, num_threads=1, embeddings=False):
+        """
+        Args:
+            model_path (str): Chemin du modèle yamnet.tflite
+            sample_rate (int): Taux des fenêtres (YAMNet attend 16 kHz)
+            num_threads (int): Nombre de threads de l'interpréteur
+            embeddings (bool): Lire aussi les embeddings de chaque fenêtre
+        """
+        if TFLiteInterpreter is None:
+            raise RuntimeError("Le backend 'tflite' nécessite tflite_runtime ou tensorflow")
+        if sample_rate != YAMNET_SAMPLE_RATE:
+            raise ValueError(f"YAMNet attend des fenêtres à {YAMNET_SAMPLE_RATE} Hz")
+        self.sample_rate = sample_rate
+        self.num_threads = num_threads
+        self.interpreter = TFLiteInterpreter(model_path=model_path, num_threads=num_threads,
+                                             experimental_preserve_all_tensors=embeddings)
+        self.interpreter.allocate_tensors()
+        # Accesseurs des tampons internes : les vues ne doivent pas survivre à invoke()
+        self._input = self.interpreter.tensor(self.interpreter.get_input_details()[0]['index'])
+        self._output = self.interpreter.tensor(self.interpreter.get_output_details()[0]['index'])
+        self._embedding = None
+        self.embeddings = None
+        if embeddings:
+            detail = next(detail for detail in self.interpreter.get_tensor_details()
+                          if YAMNET_EMBEDDING_TENSOR in detail['name'] and detail['shape'][-1] == YAMNET_EMBEDDING_SIZE)
+            self._embedding = self.interpreter.tensor(detail['index'])
+            # Modèle quantifié : embeddings int8 à déquantifier (scale 0 si le tenseur est float32)
+            self._embedding_scale, self._embedding_zero_point = detail['quantization']
+            self.embeddings = np.zeros((0, YAMNET_EMBEDDING_SIZE), dtype=np.float32)
+
+    def classify_batch(self, batch):
+        """
+        Classifie un lot de fenêtres.
+
+        Args:
+            batch (numpy.ndarray): Fenêtres audio float32 de forme (n, YAMNET_WINDOW_SIZE)
+
+        Returns:
+            numpy.ndarray: Scores de forme (n, YAMNET_NUM_CLASSES)
+        """
+        scores = np.empty((len(batch), YAMNET_NUM_CLASSES), dtype=np.float32)
+        if self._embedding is not None and len(self.embeddings) < len(batch):
+            self.embeddings = np.zeros((len(batch), YAMNET_EMBEDDING_SIZE), dtype=np.float32)
+        for row, window in enumerate(batch):
+            self._input()[:] = window
+            self.interpreter.invoke()
+            scores[row] = self._output()[0]
+            if self._embedding is not None:
+                embedding = self.embeddings[row]
+                np.subtract(self._embedding().reshape(-1), self._embedding_zero_point, out=embedding, dtype=np.float32)
+                if self._embedding_scale:
+                    embedding *= self._embedding_scale
+        return scores
+
+    def classify(self, window):
+        """
+        Classifie une fenêtre.
+
+        Returns:
+            tuple: (scores (YAMNET_NUM_CLASSES,), embeddings (YAMNET_EMBEDDING_SIZE,) ou None)
+        """
+        scores = self.classify_batch(window[np.newaxis, :YAMNET_WINDOW_SIZE])[0]
+        embeddings = self.embeddings[0].copy() if self._embedding is not None else None
+        return scores, embeddings
+
+    def close(self):
+        self._input = self._output = self._embedding = None
+        self.interpreter = None
+
+
+class LogMelTFLiteBackend:
+    """
+    Interpréteur TFLite du seul réseau convolutif de YAMNet, alimenté par un frontal log-mel incrémental.
+
+    Le frontal de yamnet.tflite est retiré du graphe (split_yamnet_model) et
+    recalculé en numpy à l'identique. Pour les fenêtres lues dans l'AudioRing
+    d'une source (classify_ring), les trames de 10 ms sont calculées une seule
+    fois dans le LogMelStream de la source : deux fenêtres qui se recouvrent de
+    80 % partagent 80 % de leurs trames. Le début des fenêtres est ramené sur la
+    trame de 10 ms qui le précède.
+    """
+
+    streaming = True
+
+    def __init__(self, model_path, sample_rate=YAMNET_SAMPLE_RATE, num_threads=1):
+        """
+        Args:
+            model_path (str): Chemin du modèle yamnet.tflite
+            sample_rate (int): Taux des fenêtres (YAMNet attend 16 kHz)
+            num_threads (int): Nombre de threads de l'interpréteur
+        """
+        if TFLiteInterpreter is None:
+            raise RuntimeError("Le backend 'tflite_mel' nécessite tflite_runtime ou tensorflow")
+        if sample_rate != YAMNET_SAMPLE_RATE:
+            raise ValueError(f"YAMNet attend des fenêtres à {YAMNET_SAMPLE_RATE} Hz")
+        self.sample_rate = sample_rate
+        self.num_threads = num_threads
+        with open(model_path, 'rb') as f:
+            backbone, constants = split_yamnet_model(f.read())
+        self.frontend = LogMelFrontend(**constants)
+        self.interpreter = TFLiteInterpreter(model_content=backbone, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.tensor(self.interpreter.get_input_details()[0]['index'])
+        self._output = self.interpreter.tensor(self.interpreter.get_output_details()[0]['index'])
+        self.streams = {}  # Clé de la source -> LogMelStream
+
+    def _classify_patch(self, patch):
+        self._input()[0] = patch
+        self.interpreter.invoke()
+        return self._output()[0].copy()
+
+    def classify_batch(self, batch):
+        """
+        Classifie un lot de fenêtres audio (frontal complet pour chaque fenêtre).
+
+        Args:
+            batch (numpy.ndarray): Fenêtres audio float32 de forme (n, YAMNET_WINDOW_SIZE)
+
+        Returns:
+            numpy.ndarray: Scores de forme (n, YAMNET_NUM_CLASSES)
+        """
+        scores = np.empty((len(batch), YAMNET_NUM_CLASSES), dtype=np.float32)
+        for row, window in enumerate(batch):
+            scores[row] = self._classify_patch(self.frontend.compute(window, YAMNET_PATCH_FRAMES))
+        return scores
+
+    def classify_ring(self, key, ring, start):
+        """
+        Classifie la fenêtre commençant à start dans l'AudioRing d'une source.
+
+        Args:
+            key: Identifiant de la source (un LogMelStream par clé)
+            ring (AudioRing): Buffer de la source
+            start (int): Position absolue du premier échantillon de la fenêtre
+
+        Returns:
+            numpy.ndarray: Scores (YAMNET_NUM_CLASSES,), None si l'audio n'est plus disponible
+        """
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = LogMelStream(self.frontend)
+        start_frame = start // YAMNET_FRAME_HOP
+        if not stream.update(ring, start_frame, start_frame + YAMNET_PATCH_FRAMES):
+            return None
+        return self._classify_patch(stream.patch(start_frame))
+
+    def release_source(self, key):
+        """Oublie les trames mises en cache pour une source"""
+        self.streams.pop(key, None)
+
+    def get_frontend_stats(self):
+        """Trames log-mel calculées et réutilisées depuis le cache, toutes sources confondues"""
+        streams = list(self.streams.values())
+        return {
+            'frames_computed': sum(stream.frames_computed for stream in streams),
+            'frames_reused': sum(stream.frames_reused for stream in streams)
+        }
+
+    def close(self):
+        self._input = self._output = None
+        self.interpreter = None
+        self.streams = {}
+
+
+INFERENCE_BACKENDS = {
+    'mediapipe': MediaPipeBackend,
+    'tflite': TFLiteBackend,
+    'tflite_mel': LogMelTFLiteBackend
+}
+
+
+def create_backend(name, model_path, sample_rate=YAMNET_SAMPLE_RATE, num_threads=1):
+    """
+    Crée un backend d'inférence à partir de son nom.
+
+    Args:
+        name (str): 'mediapipe', 'tflite' ou 'tflite_mel'
+        model_path (str): Chemin du modèle yamnet.tflite
+        sample_rate (int): Taux d'échantillonnage des fenêtres
+        num_threads (int): Threads de l'interpréteur (backends TFLite uniquement)
+
+    Returns:
+        MediaPipeBackend, TFLiteBackend ou LogMelTFLiteBackend
+    """
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"Backend d'inférence inconnu: {name}")
+    if name == 'mediapipe':
+        return MediaPipeBackend(model_path, sample_rate)
+    return INFERENCE_BACKENDS[name](model_path, sample_rate, num_threads=num_threads)
+
+
+class InferenceRequest:
+    __slots__ = ('source_id', 'window', 'timestamp', 'callback', 'submitted_at', 'ring', 'start')
+
+    def __init__(self, source_id, window, timestamp, callback, ring=None, start=0):
+        self.source_id = source_id
+        self.window = window
+        self.timestamp = timestamp
+        self.callback = callback
+        self.submitted_at = time.perf_counter()
+        self.ring = ring  # Fenêtre lue dans l'AudioRing de la source au moment du lot
+        self.start = start
+
+
+class InferenceContext:
+    """
+    Contexte d'inférence : un backend, sa file de fenêtres et son thread.
+    Chaque source est rattachée à un seul contexte, ce qui garantit l'attribution
+    des résultats et permet de classifier des sources différentes en parallèle.
+    """
+
+    def __init__(self, engine, index, backend):
+        self.engine = engine
+        self.index = index
+        self.backend = backend
+        self.queue = queue.Queue(maxsize=engine.max_queue_size)
+        self.batch_buffer = np.zeros((engine.max_batch_size, YAMNET_WINDOW_SIZE), dtype=np.float32)
+        self.sources = set()
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name=f"inference-context-{self.index}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        if self.backend:
+            try:
+                self.backend.close()
+            except Exception as e:
+                logging.error(f"Erreur lors de la fermeture du backend d'inférence: {e}")
+            self.backend = None
+
+    def pending(self):
+        """Nombre de fenêtres en attente dans ce contexte"""
+        return self.queue.qsize()
+
+    def _collect_batch(self):
+        """Attend une première fenêtre puis complète le lot avec celles déjà prêtes"""
+        try:
+            first = self.queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.engine.max_wait
+        while len(batch) < self.engine.max_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self._process_batch(batch)
+            except Exception as e:
+                logging.error(f"Erreur lors de l'inférence d'un lot de {len(batch)} fenêtres: {e}")
+
+    def _process_batch(self, batch):
+        if getattr(self.backend, 'streaming', False):
+            self._process_streaming(batch)
+            return
+        valid = []
+        for request in batch:
+            if request.ring is None:
+                self.batch_buffer[len(valid)] = request.window[:YAMNET_WINDOW_SIZE]
+            elif not copy_window(request.ring, request.start, self.batch_buffer[len(valid)]):
+                # Fenêtre écrasée avant ou pendant sa lecture : le contexte est trop en retard
+                self.engine._count_dropped()
+                continue
+            valid.append(request)
+        if not valid:
+            return
+        batch = valid
+        size = len(batch)
+
+        scores = self.backend.classify_batch(self.batch_buffer[:size])
+
+        for row, request in enumerate(batch):
+            try:
+                request.callback(request.source_id, scores[row], request.timestamp)
+            except Exception as e:
+                logging.error(f"Erreur dans le callback d'inférence pour {request.source_id}: {e}")
+
+        self.engine._record_batch(batch)
+
+    def _process_streaming(self, batch):
+        """Classifie les fenêtres une à une à partir des trames log-mel en cache de chaque source"""
+        valid = []
+        for request in batch:
+            if request.ring is None:
+                scores = self.backend.classify_batch(request.window[np.newaxis, :YAMNET_WINDOW_SIZE])[0]
+            elif request.ring.is_available(request.start, YAMNET_WINDOW_SIZE):
+                scores = self.backend.classify_ring(request.source_id, request.ring, request.start)
+            else:
+                scores = None
+            if scores is None:
+                # Fenêtre écrasée avant d'être lue : le contexte est trop en retard
+                self.engine._count_dropped()
+                continue
+            try:
+                request.callback(request.source_id, scores, request.timestamp)
+            except Exception as e:
+                logging.error(f"Erreur dans le callback d'inférence pour {request.source_id}: {e}")
+            valid.append(request)
+        if valid:
+            self.engine._record_batch(valid)
+
+
+class InferenceEngine:
+    """
+    Moteur d'inférence YAMNet partagé entre toutes les sources.
+    Les sources soumettent des fenêtres prêtes ; chaque contexte d'inférence les
+    regroupe en lots, les score en un seul appel à son backend puis renvoie chaque
+    ligne de résultat au callback de la source qui l'a soumise.
+    Avec plusieurs contextes, les sources sont réparties entre eux et classifiées
+    en parallèle, chaque source restant attachée au même contexte.
+    """
+
+    def __init__(self, model_path, sample_rate=YAMNET_SAMPLE_RATE, max_batch_size=16,
+                 max_wait=0.01, max_queue_size=256, num_contexts=1, backend_factory=None,
+                 backend='mediapipe', num_threads=1):
+        """
+        Initialise le moteur d'inférence.
+
+        Args:
+            model_path (str): Chemin du modèle yamnet.tflite
+            sample_rate (int): Taux d'échantillonnage des fenêtres
+            max_batch_size (int): Nombre maximum de fenêtres par appel au backend
+            max_wait (float): Attente maximale (s) pour compléter un lot
+            max_queue_size (int): Nombre maximum de fenêtres en attente par contexte
+            num_contexts (int): Nombre de contextes d'inférence (un backend chacun)
+            backend_factory (callable, optional): Crée un backend (remplace backend et num_threads)
+            backend (str): Backend créé par défaut, 'mediapipe', 'tflite' ou 'tflite_mel'
+            num_threads (int): Threads de l'interpréteur par contexte (backends TFLite)
+        """
+        self.model_path = model_path
+        self.sample_rate = sample_rate
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.num_contexts = max(1, int(num_contexts))
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Backend d'inférence inconnu: {backend}")
+        self.backend = backend
+        self.num_threads = max(1, int(num_threads))
+        self.backend_factory = backend_factory or (
+            lambda: create_backend(self.backend, self.model_path, self.sample_rate, self.num_threads))
+        self.contexts = []
+        self.running = False
+        self._source_contexts = {}  # source_id -> InferenceContext
+        self._next_context = 0
+        self._assign_lock = threading.Lock()
+
+        # Statistiques
+        self._stats_lock = threading.Lock()
+        self.batches_processed = 0
+        self.windows_processed = 0
+        self.windows_dropped = 0
+        self.last_batch_size = 0
+        self._latencies = collections.deque(maxlen=2048)
+        self._completions = collections.deque()  # (temps, taille du lot) sur la fenêtre de débit
+        self._throughput_window = 10.0
+
+    def start(self):
+        """Crée les contextes d'inférence et démarre leurs threads"""
+        if self.running:
+            return True
+        if not self.contexts:
+            self.contexts = [
+                InferenceContext(self, index, self.backend_factory())
+                for index in range(self.num_contexts)
+            ]
+        self.running = True
+        for context in self.contexts:
+            context.start()
+        logging.info(f"Moteur d'inférence démarré ({self.num_contexts} contexte(s), "
+                     f"lots de {self.max_batch_size} fenêtres max)")
+        return True
+
+    def stop(self):
+        """Arrête les contextes et libère les backends"""
+        self.running = False
+        for context in self.contexts:
+            context.stop()
+        self.contexts = []
+        with self._assign_lock:
+            self._source_contexts.clear()
+            self._next_context = 0
+
+    def _context_for(self, source_id):
+        """Retourne le contexte attaché à une source, en l'attribuant au premier appel"""
+        context = self._source_contexts.get(source_id)
+        if context is not None:
+            return context
+        with self._assign_lock:
+            context = self._source_contexts.get(source_id)
+            if context is None:
+                context = self.contexts[self._next_context % len(self.contexts)]
+                self._next_context += 1
+                context.sources.add(source_id)
+                self._source_contexts[source_id] = context
+            return context
+
+    def release_source(self, source_id):
+        """Détache une source de son contexte d'inférence"""
+        with self._assign_lock:
+            context = self._source_contexts.pop(source_id, None)
+            if context is not None:
+                context.sources.discard(source_id)
+                backend = getattr(context, 'backend', None)
+                if getattr(backend, 'streaming', False):
+                    backend.release_source(source_id)
+
+    def create_ring(self, source_id, capacity=None):
+        """
+        Crée le buffer dans lequel l'acquisition d'une source écrit son PCM.
+
+        Returns:
+            AudioRing: Buffer à passer à submit_ring
+        """
+        return AudioRing(capacity or int(RING_DURATION * self.sample_rate))
+
+    def submit_ring(self, source_id, ring, start, timestamp, callback):
+        """
+        Soumet la fenêtre [start, start + YAMNET_WINDOW_SIZE) du buffer d'une source.
+
+        La fenêtre est copiée dans le lot au moment de l'inférence ; si elle a été
+        écrasée entre-temps, elle est abandonnée.
+
+        Args:
+            source_id (str): Identifiant de la source
+            ring (AudioRing): Buffer de la source
+            start (int): Position absolue du premier échantillon de la fenêtre
+            timestamp (float): Timestamp de la fenêtre
+            callback (callable): Appelé avec (source_id, scores, timestamp)
+
+        Returns:
+            bool: False si la file est pleine et la fenêtre abandonnée
+        """
+        return self._enqueue(InferenceRequest(source_id, None, timestamp, callback, ring, start))
+
+    def submit(self, source_id, window, timestamp, callback):
+        """
+        Soumet une fenêtre à classifier.
+
+        La fenêtre est copiée dans le lot au moment de l'inférence : elle ne doit
+        pas être modifiée avant l'appel du callback.
+
+        Args:
+            source_id (str): Identifiant de la source
+            window (numpy.ndarray): Fenêtre float32 de YAMNET_WINDOW_SIZE échantillons
+            timestamp (float): Timestamp de la fenêtre
+            callback (callable): Appelé avec (source_id, scores, timestamp)
+
+        Returns:
+            bool: False si la file est pleine et la fenêtre abandonnée
+        """
+        return self._enqueue(InferenceRequest(source_id, window, timestamp, callback))
+
+    def _enqueue(self, request):
+        if not self.contexts:
+            self._count_dropped()
+            return False
+        try:
+            self._context_for(request.source_id).queue.put_nowait(request)
+            return True
+        except queue.Full:
+            self._count_dropped()
+            return False
+
+    def _count_dropped(self):
+        with self._stats_lock:
+            self.windows_dropped += 1
+
+    def _record_batch(self, batch):
+        now = time.perf_counter()
+        size = len(batch)
+        with self._stats_lock:
+            self.batches_processed += 1
+            self.windows_processed += size
+            self.last_batch_size = size
+            self._latencies.extend(now - request.submitted_at for request in batch)
+            self._completions.append((now, size))
+            while self._completions and now - self._completions[0][0] > self._throughput_window:
+                self._completions.popleft()
+
+    def get_stats(self):
+        """
+        Retourne les statistiques du moteur.
+
+        Returns:
+            dict: Taille des lots, débit en fenêtres/s et latences (ms)
+        """
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000.0 if self._latencies else None
+            if len(self._completions) > 1:
+                elapsed = self._completions[-1][0] - self._completions[0][0]
+                windows = sum(size for _, size in list(self._completions)[1:])
+                windows_per_second = windows / elapsed if elapsed > 0 else 0.0
+            else:
+                windows_per_second = 0.0
+            stats = {
+                'backend': self.backend,
+                'contexts': len(self.contexts),
+                'batches': self.batches_processed,
+                'windows': self.windows_processed,
+                'dropped': self.windows_dropped,
+                'queue_depth': sum(context.pending() for context in self.contexts),
+                'last_batch_size': self.last_batch_size,
+                'avg_batch_size': self.windows_processed / self.batches_processed if self.batches_processed else 0.0,
+                'windows_per_second': windows_per_second,
+                'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+                'latency_p99_ms': float(np.percentile(latencies, 99)) if latencies is not None else None,
+                'sources_per_context': [len(context.sources) for context in self.contexts]
+            }
+        # Frontal log-mel incrémental : trames calculées et réutilisées entre fenêtres
+        backends = [getattr(context, 'backend', None) for context in self.contexts]
+        frontends = [backend.get_frontend_stats() for backend in backends if getattr(backend, 'streaming', False)]
+        if frontends:
+            stats['mel_frames_computed'] = sum(frontend['frames_computed'] for frontend in frontends)
+            stats['mel_frames_reused'] = sum(frontend['frames_reused'] for frontend in frontends)
+        return stats
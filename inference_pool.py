@@ -0,0 +1,359 @@
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+import numpy as np
+from inference_engine import (InferenceEngine, InferenceRequest, create_backend, copy_window,
+                              YAMNET_WINDOW_SIZE, YAMNET_SAMPLE_RATE, RING_DURATION)
+from shared_audio_ring import SharedAudioRing
+
+
+def _worker_main(worker_index, model_path, sample_rate, max_batch_size, request_queue, result_queue,
+                 backend_name='mediapipe', num_threads=1):
+    """
+    Boucle d'un processus d'inférence.
+
+    Le worker possède son propre interpréteur YAMNet, lit les fenêtres directement
+    dans les buffers partagés des sources et renvoie des vecteurs de scores float16.
+    """
+    backend = create_backend(backend_name, model_path, sample_rate, num_threads)
+    rings = {}
+    batch_buffer = np.zeros((max_batch_size, YAMNET_WINDOW_SIZE), dtype=np.float32)
+    result_queue.put(('ready', worker_index, None, None))
+
+    try:
+        while True:
+            item = request_queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < max_batch_size:
+                try:
+                    item = request_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    request_queue.put(None)
+                    break
+                batch.append(item)
+
+            valid = []
+            released = []
+            for message in batch:
+                if message[0] == 'release':
+                    # Source retirée : fermer la copie attachée après les fenêtres de ce lot
+                    released.append(message[1])
+                    continue
+                request_id, ring_name, capacity, start = message
+                ring = rings.get(ring_name)
+                if ring is None:
+                    try:
+                        ring = rings[ring_name] = SharedAudioRing.attach(ring_name, capacity)
+                    except FileNotFoundError:
+                        result_queue.put(('result', worker_index, request_id, None))
+                        continue
+                if not ring.is_available(start, YAMNET_WINDOW_SIZE):
+                    result_queue.put(('result', worker_index, request_id, None))
+                    continue
+                valid.append((request_id, ring_name, ring, start))
+
+            if not valid:
+                pass
+            elif getattr(backend, 'streaming', False):
+                # Frontal log-mel incrémental : trames en cache par buffer partagé
+                for request_id, ring_name, ring, start in valid:
+                    scores = backend.classify_ring(ring_name, ring, start)
+                    result_queue.put(('result', worker_index, request_id,
+                                      scores.astype(np.float16) if scores is not None else None))
+            elif len(valid) == 1:
+                # Fenêtre lue directement dans le buffer partagé par le backend
+                request_id, _, ring, start = valid[0]
+                scores = backend.classify_batch(ring.view(start, YAMNET_WINDOW_SIZE)[np.newaxis])
+                # Recouverte par l'écrivain pendant la lecture : scores d'une fenêtre déchirée
+                torn = not ring.is_available(start, YAMNET_WINDOW_SIZE)
+                result_queue.put(('result', worker_index, request_id, None if torn else scores[0].astype(np.float16)))
+            else:
+                copied = []
+                for request_id, _, ring, start in valid:
+                    if copy_window(ring, start, batch_buffer[len(copied)]):
+                        copied.append(request_id)
+                    else:
+                        result_queue.put(('result', worker_index, request_id, None))
+                if copied:
+                    scores = backend.classify_batch(batch_buffer[:len(copied)])
+                    for row, request_id in enumerate(copied):
+                        result_queue.put(('result', worker_index, request_id, scores[row].astype(np.float16)))
+
+            for ring_name in released:
+                ring = rings.pop(ring_name, None)
+                if ring is not None:
+                    ring.close()
+                if getattr(backend, 'streaming', False):
+                    backend.release_source(ring_name)
+    finally:
+        backend.close()
+        for ring in rings.values():
+            ring.close()
+
+
+class WorkerHandle:
+    """Processus d'inférence vu depuis le processus principal"""
+
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.sources = set()
+        self.in_flight = {}  # request_id -> (InferenceRequest, ring, start)
+        self.process = None
+        self.queue = None
+        self.ready = False
+        self.restarts = 0
+
+    def start(self):
+        # Nouvelle file à chaque démarrage : celle d'un processus mort peut être corrompue
+        self.queue = self.pool.mp_context.Queue()
+        self.ready = False
+        self.process = self.pool.mp_context.Process(
+            target=_worker_main,
+            args=(self.index, self.pool.model_path, self.pool.sample_rate, self.pool.max_batch_size,
+                  self.queue, self.pool.result_queue, self.pool.backend, self.pool.num_threads),
+            name=f"inference-worker-{self.index}",
+            daemon=True
+        )
+        self.process.start()
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.queue.put(None)
+            except Exception:
+                pass
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+        self.process = None
+
+    def pending(self):
+        return len(self.in_flight)
+
+
+class ProcessInferencePool(InferenceEngine):
+    """
+    Moteur d'inférence multi-processus.
+
+    Les threads d'acquisition écrivent le PCM de chaque source dans un buffer
+    circulaire en mémoire partagée ; N processus workers possèdent chacun un
+    interpréteur YAMNet, lisent les fenêtres sans copie et renvoient des vecteurs
+    de scores compacts par une file. Un worker mort est redémarré et les fenêtres
+    encore disponibles qu'il traitait lui sont renvoyées.
+    """
+
+    def __init__(self, model_path, sample_rate=YAMNET_SAMPLE_RATE, max_batch_size=16,
+                 max_wait=0.01, max_queue_size=256, num_workers=2, backend='mediapipe', num_threads=1):
+        """
+        Initialise le pool de processus d'inférence.
+
+        Args:
+            model_path (str): Chemin du modèle yamnet.tflite
+            sample_rate (int): Taux d'échantillonnage des fenêtres
+            max_batch_size (int): Nombre maximum de fenêtres par appel au backend
+            max_wait (float): Conservé pour compatibilité avec InferenceEngine
+            max_queue_size (int): Nombre maximum de fenêtres en cours par worker
+            num_workers (int): Nombre de processus d'inférence
+            backend (str): Backend de chaque worker, 'mediapipe', 'tflite' ou 'tflite_mel'
+            num_threads (int): Threads de l'interpréteur par worker (backends TFLite)
+        """
+        super().__init__(model_path, sample_rate=sample_rate, max_batch_size=max_batch_size,
+                         max_wait=max_wait, max_queue_size=max_queue_size, num_contexts=num_workers,
+                         backend=backend, num_threads=num_threads)
+        # spawn : MediaPipe démarre des threads, un fork du processus principal n'est pas sûr
+        self.mp_context = multiprocessing.get_context('spawn')
+        self.result_queue = None
+        self.rings = {}  # source_id -> SharedAudioRing créé par le pool
+        self.restarts = 0
+        self._next_request_id = 0
+        self._request_lock = threading.Lock()
+        self._result_thread = None
+
+    def start(self):
+        """Démarre les processus workers et le thread de réception des résultats"""
+        if self.running:
+            return True
+        self.result_queue = self.mp_context.Queue()
+        self.contexts = [WorkerHandle(self, index) for index in range(self.num_contexts)]
+        for worker in self.contexts:
+            worker.start()
+        self.running = True
+        self._result_thread = threading.Thread(target=self._collect_results, name="inference-pool-results")
+        self._result_thread.daemon = True
+        self._result_thread.start()
+        logging.info(f"Pool d'inférence démarré ({self.num_contexts} processus)")
+        return True
+
+    def stop(self):
+        """Arrête les workers et libère la mémoire partagée"""
+        self.running = False
+        for worker in self.contexts:
+            worker.stop()
+        if self._result_thread and self._result_thread.is_alive():
+            self._result_thread.join(timeout=2.0)
+        self._result_thread = None
+        self.contexts = []
+        with self._assign_lock:
+            self._source_contexts.clear()
+            self._next_context = 0
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
+
+    def wait_until_ready(self, timeout=30.0):
+        """Attend que chaque worker ait chargé son modèle"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.contexts and all(worker.ready for worker in self.contexts):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def create_ring(self, source_id, capacity=None):
+        """
+        Crée le buffer partagé dans lequel l'acquisition d'une source écrit son PCM.
+        Le buffer est conservé par le pool pour être libéré avec la source.
+
+        Returns:
+            SharedAudioRing: Buffer à passer à submit_ring
+        """
+        ring = self.rings.get(source_id)
+        if ring is None:
+            ring = SharedAudioRing(capacity or int(RING_DURATION * self.sample_rate))
+            self.rings[source_id] = ring
+        return ring
+
+    def release_source(self, source_id):
+        """
+        Détache une source de son worker et libère son buffer partagé.
+
+        À appeler une fois l'acquisition de la source arrêtée (plus aucune
+        écriture). Chaque worker reçoit un message 'release' pour fermer sa
+        copie attachée du buffer et oublier son cache de trames.
+        """
+        super().release_source(source_id)
+        ring = self.rings.pop(source_id, None)
+        if ring is None:
+            return
+        for worker in self.contexts:
+            try:
+                worker.queue.put(('release', ring.name))
+            except Exception:
+                pass
+        ring.close()
+
+    def submit(self, source_id, window, timestamp, callback):
+        """Copie la fenêtre dans le buffer partagé de la source puis la soumet"""
+        ring = self.create_ring(source_id)
+        start = ring.write_count
+        ring.write(window[:YAMNET_WINDOW_SIZE])
+        return self.submit_ring(source_id, ring, start, timestamp, callback)
+
+    def submit_ring(self, source_id, ring, start, timestamp, callback):
+        """
+        Soumet la fenêtre [start, start + YAMNET_WINDOW_SIZE) d'un buffer partagé.
+
+        Args:
+            source_id (str): Identifiant de la source
+            ring (SharedAudioRing): Buffer partagé de la source
+            start (int): Position absolue du premier échantillon de la fenêtre
+            timestamp (float): Timestamp de la fenêtre
+            callback (callable): Appelé avec (source_id, scores, timestamp)
+
+        Returns:
+            bool: False si le worker a trop de fenêtres en cours
+        """
+        if not self.contexts:
+            self._count_dropped()
+            return False
+        worker = self._context_for(source_id)
+        if worker.pending() >= self.max_queue_size:
+            self._count_dropped()
+            return False
+        request = InferenceRequest(source_id, None, timestamp, callback)
+        with self._request_lock:
+            request_id = self._next_request_id
+            self._next_request_id += 1
+            worker.in_flight[request_id] = (request, ring, start)
+        try:
+            worker.queue.put((request_id, ring.name, ring.capacity, start))
+        except Exception:
+            with self._request_lock:
+                worker.in_flight.pop(request_id, None)
+            self._count_dropped()
+            return False
+        return True
+
+    def _collect_results(self):
+        last_check = time.time()
+        while self.running:
+            try:
+                kind, worker_index, request_id, scores = self.result_queue.get(timeout=0.1)
+            except queue.Empty:
+                kind = None
+            except (EOFError, OSError):
+                break
+
+            if kind == 'ready':
+                self.contexts[worker_index].ready = True
+            elif kind == 'result':
+                self._deliver(self.contexts[worker_index], request_id, scores)
+
+            if time.time() - last_check > 0.5:
+                last_check = time.time()
+                self._check_workers()
+
+    def _deliver(self, worker, request_id, scores):
+        with self._request_lock:
+            entry = worker.in_flight.pop(request_id, None)
+        if entry is None:
+            return
+        request = entry[0]
+        if scores is None:
+            # Fenêtre écrasée avant ou pendant sa lecture : le worker est trop en retard
+            self._count_dropped()
+            return
+        try:
+            request.callback(request.source_id, scores.astype(np.float32), request.timestamp)
+        except Exception as e:
+            logging.error(f"Erreur dans le callback d'inférence pour {request.source_id}: {e}")
+        self._record_batch([request])
+
+    def _check_workers(self):
+        """Redémarre les workers morts et leur renvoie les fenêtres en cours"""
+        for worker in self.contexts:
+            if not self.running or worker.process is None or worker.process.is_alive():
+                continue
+            logging.error(f"Worker d'inférence {worker.index} arrêté "
+                          f"(code {worker.process.exitcode}), redémarrage")
+            with self._request_lock:
+                pending = sorted(worker.in_flight.items(), key=lambda item: item[0])
+                worker.in_flight.clear()
+                worker.restarts += 1
+                self.restarts += 1
+                worker.start()
+                for request_id, (request, ring, start) in pending:
+                    if ring.storage is not None and ring.is_available(start, YAMNET_WINDOW_SIZE):
+                        worker.in_flight[request_id] = (request, ring, start)
+                        worker.queue.put((request_id, ring.name, ring.capacity, start))
+                    else:
+                        self._count_dropped()
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['mode'] = 'process'
+        stats['restarts'] = self.restarts
+        stats['workers_alive'] = sum(
+            1 for worker in self.contexts if worker.process is not None and worker.process.is_alive()
+        )
+        return stats
@@ -0,0 +1,474 @@
+import json
+import time
+import logging
+import subprocess
+import threading
+import numpy as np
+import sounddevice as sd
+from vban_manager import get_vban_detector
+from resampler import StreamingResampler, TARGET_SAMPLE_RATE
+from circular_buffer import AudioRing
+from rtsp_supervisor import get_rtsp_supervisor
+
+MIC_RING_DURATION = 2.0  # Secondes d'audio tamponnées entre le callback PortAudio et l'analyse
+MIC_POLL_INTERVAL = 0.02  # Période de vidage de la file par le thread d'analyse
+RTSP_PROBE_TIMEOUT = 5.0  # Délai maximal du sondage ffprobe d'un flux RTSP
+
+
+def probe_rtsp_sample_rate(rtsp_url, timeout=RTSP_PROBE_TIMEOUT):
+    """
+    Retourne le taux d'échantillonnage natif de la piste audio d'un flux RTSP.
+
+    ffprobe est borné par son propre timeout de lecture réseau et, en dernier
+    recours, tué au bout de timeout secondes : une caméra muette ne doit pas
+    bloquer le démarrage de la source.
+
+    Args:
+        rtsp_url (str): URL du flux
+        timeout (float): Délai maximal du sondage en secondes
+
+    Returns:
+        int: Taux d'échantillonnage, ou None si le flux n'a pas pu être sondé
+    """
+    command = ['ffprobe', '-v', 'error', '-rw_timeout', str(int(timeout * 1e6)),
+               '-select_streams', 'a:0', '-show_streams', '-of', 'json', rtsp_url]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout, check=True)
+        probe = json.loads(result.stdout)
+        return int(probe['streams'][0]['sample_rate'])
+    except Exception as e:
+        logging.warning(f"Impossible de sonder le flux RTSP {rtsp_url}: {e}")
+        return None
+
+
+class IngestWorker:
+    """
+    Worker d'acquisition pour une source audio.
+    Chaque source (microphone, RTSP, VBAN) possède son propre thread qui alimente
+    le AudioDetector partagé de la session de détection.
+    """
+
+    source_type = None
+    # Clés de configuration dont la modification impose de rouvrir le flux
+    restart_keys = ()
+
+    def __init__(self, source_id, detector, config):
+        """
+        Initialise le worker d'acquisition.
+
+        Args:
+            source_id (str): Identifiant de la source dans le détecteur
+            detector (AudioDetector): Détecteur partagé entre toutes les sources
+            config (dict): Configuration de la source (voir classify.collect_sources)
+        """
+        self.source_id = source_id
+        self.detector = detector
+        self.config = config
+        self.running = False
+        self.state = 'stopped'
+        self.error = None
+        self.started_at = None
+        self.last_audio_time = None
+        self.samples_received = 0
+        self.resampler = None  # Défini par _run si la source n'est pas à 16 kHz
+        self._thread = None
+        self._exit_lock = threading.Lock()
+        self._on_exit = []  # Appelés une fois le thread d'acquisition terminé
+
+    def start(self):
+        """Démarre le thread d'acquisition"""
+        if self.running:
+            return False
+        self.running = True
+        self.state = 'starting'
+        self.error = None
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run_wrapper, name=f"ingest-{self.source_id}")
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=2.0):
+        """Arrête le thread d'acquisition"""
+        self.running = False
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        if self._thread is not None and not self._thread.is_alive():
+            self._thread = None
+        if self.state != 'error':
+            self.state = 'stopped'
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def when_stopped(self, callback):
+        """
+        Appelle callback une fois le thread d'acquisition terminé.
+
+        Si stop() a expiré (thread bloqué dans une lecture), l'appel est
+        différé à la fin du thread : les ressources que celui-ci alimente
+        (buffer partagé de la source) ne sont pas libérées sous ses pieds.
+        """
+        with self._exit_lock:
+            if self.is_alive() and self._thread is not threading.current_thread():
+                self._on_exit.append(callback)
+                return
+        callback()
+
+    def update_config(self, config):
+        """
+        Applique une nouvelle configuration sans interrompre l'acquisition.
+
+        Args:
+            config (dict): Nouvelle configuration de la source
+
+        Returns:
+            bool: False si un paramètre d'acquisition a changé (la source doit être redémarrée)
+        """
+        if any(config.get(key) != self.config.get(key) for key in self.restart_keys):
+            return False
+        self.config = config
+        return True
+
+    def _run_wrapper(self):
+        try:
+            self.state = 'running'
+            self._run()
+        except Exception as e:
+            logging.error(f"Erreur dans l'acquisition de la source {self.source_id}: {e}")
+            self.error = str(e)
+            self.state = 'error'
+        finally:
+            self.running = False
+            if self.state != 'error':
+                self.state = 'stopped'
+            with self._exit_lock:
+                callbacks, self._on_exit = self._on_exit, []
+            for callback in callbacks:
+                callback()
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _feed(self, audio_data):
+        """Transmet un bloc audio au détecteur partagé, rééchantillonné à 16 kHz"""
+        self.last_audio_time = time.time()
+        self.samples_received += len(audio_data)
+        if self.resampler is not None:
+            audio_data = self.resampler.process(audio_data)
+        self.detector.process_audio(audio_data, self.source_id)
+
+    def get_status(self):
+        """Retourne l'état de la source pour l'API"""
+        return {
+            'id': self.source_id,
+            'type': self.source_type,
+            'name': self.config.get('name', self.source_id),
+            'state': self.state,
+            'error': self.error,
+            'started_at': self.started_at,
+            'last_audio': self.last_audio_time,
+            'samples_received': self.samples_received
+        }
+
+
+class MicrophoneCapture:
+    """
+    Flux PortAudio multicanal d'un périphérique, partagé par ses sources.
+
+    Les entrées 0 à max(canal demandé) sont capturées dans un seul flux (les
+    périphériques par défaut, PulseAudio ou PipeWire annoncent souvent 32
+    entrées ou plus). Le callback écrit le bloc entrelacé tel quel dans une
+    AudioRing à deux dimensions (une seule copie, sans verrou) ; chaque canal
+    est lu par sa propre AudioRing dont le stockage est la colonne
+    correspondante : les échantillons d'un canal sont des vues à pas, sans
+    copie par canal.
+    """
+
+    def __init__(self, device_index, sample_rate, channels, max_channels=None):
+        """
+        Args:
+            device_index (int): Index du périphérique PortAudio
+            sample_rate (int): Taux d'échantillonnage de capture
+            channels (int): Nombre d'entrées capturées
+            max_channels (int, optional): Nombre d'entrées du périphérique (par défaut, channels)
+        """
+        self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_channels = max_channels or channels
+        self.capacity = int(sample_rate * MIC_RING_DURATION)
+        self.storage = np.zeros((2 * self.capacity, channels), dtype=np.float32)
+        self.counter = np.zeros(1, dtype=np.int64)
+        self.ring = AudioRing(self.capacity, storage=self.storage, counter=self.counter)
+        self.callbacks = 0
+        self.input_overflows = 0
+        self.input_underflows = 0
+        self.readers = []  # (AudioRing, canal) des lecteurs ouverts
+        self.stream = None
+
+    def open_channel(self, channel):
+        """
+        Retourne une file de lecture pour un canal (démarre le flux au premier lecteur).
+
+        Si le canal n'est pas encore capturé, le flux est rouvert avec les
+        entrées 0 à channel (voir _widen).
+
+        Args:
+            channel (int): Index du canal (à partir de 0)
+
+        Returns:
+            AudioRing: File du canal, positionnée sur les prochains échantillons
+        """
+        if not 0 <= channel < self.max_channels:
+            raise ValueError(f"Canal {channel} inexistant sur le périphérique {self.device_index} "
+                             f"({self.max_channels} entrées)")
+        if channel >= self.channels:
+            self._widen(channel + 1)
+        reader = AudioRing(self.capacity, storage=self.storage[:, channel], counter=self.counter)
+        reader.clear()
+        if self.stream is None:
+            self._open_stream()
+        self.readers.append((reader, channel))
+        return reader
+
+    def close_channel(self, reader):
+        """Libère un lecteur ; le flux est fermé avec le dernier. Retourne True s'il a été fermé."""
+        self.readers = [(other, channel) for other, channel in self.readers if other is not reader]
+        if self.readers or self.stream is None:
+            return False
+        self._close_stream()
+        return True
+
+    def _open_stream(self):
+        self.stream = sd.InputStream(
+            device=self.device_index,
+            channels=self.channels,
+            samplerate=self.sample_rate,
+            blocksize=int(self.sample_rate * 0.1),  # Buffer de 100ms
+            callback=self._audio_callback
+        )
+        self.stream.start()
+        logging.info(f"Stream audio démarré pour le microphone {self.device_index} "
+                     f"({self.sample_rate} Hz, {self.channels} canaux)")
+
+    def _close_stream(self):
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+
+    def _widen(self, channels):
+        """
+        Élargit la capture à channels entrées.
+
+        Le flux est arrêté (plus aucun callback), l'historique est recopié dans
+        un stockage plus large et les lecteurs ouverts sont rattachés à leur
+        nouvelle colonne : leur position (compteur partagé) est conservée, seuls
+        les échantillons arrivés pendant la réouverture sont perdus.
+        """
+        running = self.stream is not None
+        if running:
+            self._close_stream()
+        storage = np.zeros((2 * self.capacity, channels), dtype=np.float32)
+        storage[:, :self.channels] = self.storage
+        self.storage = storage
+        self.channels = channels
+        self.ring.storage = storage
+        for reader, channel in self.readers:
+            reader.storage = storage[:, channel]
+        if running:
+            self._open_stream()
+
+    def _audio_callback(self, indata, frames, time_info, status):
+        # Thread temps réel de PortAudio : ni verrou, ni log, ni analyse
+        self.callbacks += 1
+        if status:
+            if status.input_overflow:
+                self.input_overflows += 1
+            if status.input_underflow:
+                self.input_underflows += 1
+        self.ring.write(indata)
+
+    def get_stats(self):
+        """Drapeaux de statut PortAudio du périphérique"""
+        return {
+            'device_index': self.device_index,
+            'channels': self.channels,
+            'callbacks': self.callbacks,
+            'input_overflows': self.input_overflows,
+            'input_underflows': self.input_underflows
+        }
+
+
+_captures = {}
+_captures_lock = threading.Lock()
+
+
+def open_microphone_channel(device_index, channel, sample_rate=None):
+    """
+    Ouvre un canal d'un périphérique, en partageant le flux PortAudio entre canaux.
+
+    Args:
+        device_index (int): Index du périphérique
+        channel (int): Canal à lire
+        sample_rate (int, optional): Taux demandé (par défaut, celui du périphérique)
+
+    Returns:
+        tuple: (MicrophoneCapture, AudioRing du canal)
+    """
+    with _captures_lock:
+        capture = _captures.get(device_index)
+        if capture is None:
+            info = sd.query_devices(device_index)
+            # Capturer au taux natif du périphérique plutôt que de forcer 16 kHz
+            rate = int(sample_rate or info['default_samplerate'])
+            # N'ouvrir que les entrées jusqu'au canal demandé ; élargi si un autre canal l'exige
+            capture = MicrophoneCapture(device_index, rate, channel + 1,
+                                        max_channels=int(info.get('max_input_channels') or 1))
+        elif sample_rate and int(sample_rate) != capture.sample_rate:
+            raise RuntimeError(f"Le microphone {device_index} est déjà ouvert à {capture.sample_rate} Hz")
+        reader = capture.open_channel(channel)
+        _captures[device_index] = capture
+        return capture, reader
+
+
+def close_microphone_channel(capture, reader):
+    """Libère un canal ouvert par open_microphone_channel"""
+    with _captures_lock:
+        if capture.close_channel(reader):
+            _captures.pop(capture.device_index, None)
+
+
+class MicrophoneIngest(IngestWorker):
+    """
+    Acquisition d'un canal de microphone, découplée du thread temps réel de PortAudio.
+
+    Le flux du périphérique est partagé (MicrophoneCapture) ; ce worker vide
+    la file de son canal et fait le rééchantillonnage et l'analyse.
+    """
+
+    source_type = 'microphone'
+    restart_keys = ('device_index', 'channel', 'sample_rate')
+
+    def __init__(self, source_id, detector, config):
+        super().__init__(source_id, detector, config)
+        self.capture = None
+        self.ring = None
+        self.samples_dropped = 0  # Échantillons écrasés avant d'avoir été analysés
+
+    def _run(self):
+        device_index = int(self.config.get('device_index', 0))
+        channel = int(self.config.get('channel', 0) or 0)
+        self.capture, self.ring = open_microphone_channel(device_index, channel, self.config.get('sample_rate'))
+        try:
+            self.resampler = StreamingResampler(self.capture.sample_rate, TARGET_SAMPLE_RATE)
+            while self.running:
+                self._drain()
+                time.sleep(MIC_POLL_INTERVAL)
+            self._drain()
+        finally:
+            close_microphone_channel(self.capture, self.ring)
+
+    def _drain(self):
+        """Transmet au détecteur les échantillons en attente dans la file du canal"""
+        ring = self.ring
+        lost = ring.write_count - ring.read_count - ring.capacity
+        if lost > 0:
+            self.samples_dropped += lost
+            logging.warning(f"Microphone {self.source_id}: {lost} échantillons perdus (analyse trop lente)")
+        pending = ring.available()
+        if pending:
+            # Vue à pas sur la colonne du canal : copiée par le détecteur avant d'être libérée
+            self._feed(ring.peek(pending))
+            ring.consume(pending)
+
+    def get_status(self):
+        status = super().get_status()
+        # Drapeaux de statut PortAudio du périphérique et pertes entre callback et analyse
+        capture = self.capture.get_stats() if self.capture is not None else {}
+        capture['channel'] = int(self.config.get('channel', 0) or 0)
+        capture['samples_dropped'] = self.samples_dropped
+        # Sans modifier read_count, réservé au thread d'analyse
+        capture['pending'] = min(self.ring.write_count - self.ring.read_count, self.ring.capacity) if self.ring is not None else 0
+        status['capture'] = capture
+        return status
+
+
+class RtspIngest(IngestWorker):
+    source_type = 'rtsp'
+    restart_keys = ('url', 'sample_rate', 'backend')
+
+    def _run(self):
+        rtsp_url = self.config['url']
+        backend = self.config.get('backend') or 'ffmpeg'
+        if backend == 'pyav':
+            # libswresample sort directement du 16 kHz mono : ni sonde ni rééchantillonnage ici
+            sample_rate = TARGET_SAMPLE_RATE
+        else:
+            # Décoder au taux natif du flux et rééchantillonner ici ; à défaut, ffmpeg sort du 16 kHz
+            sample_rate = self.config.get('sample_rate') or probe_rtsp_sample_rate(rtsp_url) or TARGET_SAMPLE_RATE
+        self.resampler = StreamingResampler(sample_rate, TARGET_SAMPLE_RATE)
+        # Le superviseur relance le décodeur (avec délai croissant) si le flux se termine ou se bloque
+        supervisor = get_rtsp_supervisor()
+        supervisor.add_stream(self.source_id, rtsp_url, sample_rate, self._feed, backend=backend)
+        try:
+            while self.running:
+                time.sleep(0.1)
+        finally:
+            supervisor.remove_stream(self.source_id)
+
+    def get_status(self):
+        status = super().get_status()
+        # Durée de connexion, relances et débit du décodeur
+        stream_stats = get_rtsp_supervisor().get_stream_stats(self.source_id)
+        if stream_stats:
+            status['stream'] = stream_stats
+        return status
+
+
+class VbanIngest(IngestWorker):
+    source_type = 'vban'
+    restart_keys = ('ip', 'port', 'stream_name')
+
+    def _run(self):
+        vban_detector = get_vban_detector()
+        if not vban_detector:
+            raise RuntimeError("Impossible d'initialiser le détecteur VBAN")
+
+        vban_ip = self.config['ip']
+        stream_name = self.config.get('stream_name', '')
+
+        def audio_callback(audio_data, timestamp):
+            if self.running:
+                self._feed(audio_data)
+
+        # Ne recevoir que le flux de cette source, déjà séparé des autres émetteurs
+        vban_detector.subscribe(vban_ip, stream_name, audio_callback)
+        try:
+            while self.running:
+                time.sleep(0.1)  # Éviter de surcharger le CPU
+        finally:
+            vban_detector.unsubscribe(vban_ip, stream_name, audio_callback)
+
+    def get_status(self):
+        status = super().get_status()
+        # Compteurs réseau du flux pour dimensionner le buffer de gigue
+        vban_detector = get_vban_detector() if self.running else None
+        if vban_detector:
+            status['network'] = vban_detector.get_stream_stats(self.config['ip'], self.config.get('stream_name', ''))
+        return status
+
+
+INGEST_WORKERS = {
+    'microphone': MicrophoneIngest,
+    'rtsp': RtspIngest,
+    'vban': VbanIngest
+}
+
+
+def create_ingest_worker(source_config, detector):
+    """Crée le worker d'acquisition correspondant au type de la source"""
+    worker_class = INGEST_WORKERS.get(source_config['type'])
+    if worker_class is None:
+        raise ValueError(f"Type de source inconnu: {source_config['type']}")
+    return worker_class(source_config['id'], detector, source_config)
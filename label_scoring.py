@@ -0,0 +1,109 @@
+import numpy as np
+from inference_engine import YAMNET_NUM_CLASSES, load_class_names
+
+CLAP_LABELS = ["Hands", "Clapping", "Cap gun"]
+NEGATIVE_LABELS = ["Finger snapping"]
+
+# Profils de détection : classes YAMNet qui s'ajoutent au score et classes qui s'en retranchent
+DEFAULT_PROFILES = {
+    'clap': {'labels': CLAP_LABELS, 'negative_labels': NEGATIVE_LABELS}
+}
+
+# Profils disponibles en plus du clap, activés dans la section 'detection_profiles' des paramètres
+BUILTIN_PROFILES = {
+    'clap': DEFAULT_PROFILES['clap'],
+    'glass_break': {'labels': ["Glass", "Shatter"]},
+    'smoke_alarm': {'labels': ["Smoke detector, smoke alarm", "Fire alarm"]},
+    'dog_bark': {'labels': ["Dog", "Bark", "Bow-wow"]},
+    'doorbell': {'labels': ["Doorbell", "Ding-dong"]}
+}
+
+
+def top_k(scores, k, threshold=None):
+    """
+    Indices des k meilleurs scores, du plus grand au plus petit.
+
+    Args:
+        scores (numpy.ndarray): Vecteur de scores
+        k (int): Nombre d'indices retournés
+        threshold (float, optional): Score minimal des indices retournés
+
+    Returns:
+        numpy.ndarray: Indices triés par score décroissant
+    """
+    if threshold is not None:
+        # Le seuil élimine d'abord presque toutes les classes
+        indices = np.flatnonzero(scores >= threshold)
+    else:
+        indices = np.arange(len(scores))
+    k = min(k, len(indices))
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if k < len(indices):
+        # Sélection partielle en O(n), seuls les k retenus sont triés
+        indices = indices[np.argpartition(scores.take(indices), -k)[-k:]]
+    return indices[np.argsort(scores.take(indices))[::-1]]
+
+
+class ScoringMatrix:
+    """
+    Profils de détection résolus une fois en une matrice de poids (profils x classes).
+
+    Chaque ligne vaut +1 sur les classes du profil et -1 sur ses classes
+    négatives : les scores de tous les profils d'une fenêtre sont obtenus par
+    un seul produit matrice-vecteur, sans comparaison de noms de classes.
+    """
+
+    def __init__(self, profiles=None, class_names=None):
+        """
+        Args:
+            profiles (dict, optional): Nom du profil -> {'labels': [...], 'negative_labels': [...]}
+            class_names (list, optional): Noms des classes YAMNet (lus dans yamnet_class_map.csv par défaut)
+
+        Raises:
+            ValueError: Classe inconnue dans un profil
+        """
+        profiles = DEFAULT_PROFILES if profiles is None else profiles
+        class_names = class_names if class_names is not None else load_class_names()
+        class_index = {name: index for index, name in enumerate(class_names)}
+        self.names = list(profiles)
+        self.weights = np.zeros((len(self.names), YAMNET_NUM_CLASSES), dtype=np.float32)
+        for row, name in enumerate(self.names):
+            profile = profiles[name]
+            for labels, weight in ((profile.get('labels') or [], 1.0), (profile.get('negative_labels') or [], -1.0)):
+                for label in labels:
+                    if label not in class_index:
+                        raise ValueError(f"Classe YAMNet inconnue dans le profil '{name}': {label}")
+                    self.weights[row, class_index[label]] = weight
+
+    def index(self, name):
+        """Ligne du profil dans la matrice"""
+        return self.names.index(name)
+
+    def score(self, scores, indices=None):
+        """
+        Scores de tous les profils pour une fenêtre.
+
+        Args:
+            scores (numpy.ndarray): Vecteur de YAMNET_NUM_CLASSES scores
+            indices (numpy.ndarray, optional): Ne compter que ces classes (par exemple top_k)
+
+        Returns:
+            numpy.ndarray: Un score par profil, dans l'ordre de self.names
+        """
+        if indices is None:
+            return np.dot(self.weights, scores)
+        return self.score_sparse(indices, scores.take(indices))
+
+    def score_sparse(self, indices, values):
+        """
+        Scores de tous les profils à partir de quelques classes (résultat MediaPipe par exemple).
+
+        Args:
+            indices (numpy.ndarray): Indices des classes
+            values (numpy.ndarray): Scores correspondants
+
+        Returns:
+            numpy.ndarray: Un score par profil
+        """
+        return np.dot(self.weights.take(indices, axis=1), np.asarray(values, dtype=np.float32))
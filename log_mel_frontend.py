@@ -0,0 +1,166 @@
+import numpy as np
+import flatbuffers
+from mediapipe.tasks.metadata import schema_py_generated as tflite_schema
+from circular_buffer import AudioRing
+
+YAMNET_FRAME_LENGTH = 400  # Trames STFT de 25 ms à 16 kHz
+YAMNET_FRAME_HOP = 160  # Une trame toutes les 10 ms
+YAMNET_FFT_SIZE = 512
+YAMNET_PATCH_FRAMES = 96  # Trames d'une fenêtre de 0.975 s
+YAMNET_MEL_BANDS = 64
+FEATURE_PATCH_TENSOR = 'feature_patch'  # Entrée du réseau convolutif dans yamnet.tflite
+MEL_RING_FRAMES = 400  # Trames conservées par source (4 s, comme RING_DURATION)
+
+
+def _constant(model, tensor_index):
+    """Valeurs float32 d'un tenseur constant du modèle"""
+    tensor = model.subgraphs[0].tensors[tensor_index]
+    data = model.buffers[tensor.buffer].data
+    return np.frombuffer(bytes(data), dtype=np.float32).reshape(tensor.shape).copy()
+
+
+def split_yamnet_model(model_content):
+    """
+    Sépare yamnet.tflite en frontal log-mel et réseau convolutif.
+
+    Le frontal du modèle (trames, fenêtre de Hann, RFFT, module, matrice mel,
+    log) précède le tenseur 'feature_patch' (96 x 64). Ses opérations sont
+    retirées du graphe, dont l'entrée devient 'feature_patch' ; la fenêtre de
+    Hann, la matrice mel et le décalage du log sont lus dans le modèle pour que
+    LogMelFrontend calcule exactement les mêmes trames.
+
+    Args:
+        model_content (bytes): Contenu de yamnet.tflite
+
+    Returns:
+        tuple: (modèle convolutif (bytes), {'window', 'mel_matrix', 'mel_offset'})
+
+    Raises:
+        ValueError: Le modèle n'a pas le frontal attendu
+    """
+    model = tflite_schema.ModelT.InitFromObj(tflite_schema.Model.GetRootAs(model_content, 0))
+    subgraph = model.subgraphs[0]
+    names = [tensor.name.decode() for tensor in subgraph.tensors]
+    if FEATURE_PATCH_TENSOR not in names:
+        raise ValueError(f"Tenseur '{FEATURE_PATCH_TENSOR}' absent du modèle")
+    patch = names.index(FEATURE_PATCH_TENSOR)
+    cut = next(index for index, operator in enumerate(subgraph.operators) if patch in operator.outputs) + 1
+
+    constants = {}
+    for operator in subgraph.operators[:cut]:
+        code = model.operatorCodes[operator.opcodeIndex]
+        builtin = max(code.builtinCode, code.deprecatedBuiltinCode)
+        if builtin == tflite_schema.BuiltinOperator.MUL:
+            # Trames x fenêtre de Hann : la constante est l'entrée qui a des données
+            constants['window'] = next(_constant(model, index) for index in operator.inputs
+                                       if model.buffers[subgraph.tensors[index].buffer].data is not None)
+        elif builtin == tflite_schema.BuiltinOperator.FULLY_CONNECTED:
+            constants['mel_matrix'] = _constant(model, operator.inputs[1]).T
+            constants['mel_offset'] = _constant(model, operator.inputs[2])
+    if set(constants) != {'window', 'mel_matrix', 'mel_offset'}:
+        raise ValueError("Frontal log-mel de yamnet.tflite non reconnu")
+
+    subgraph.inputs = [patch]
+    subgraph.operators = subgraph.operators[cut:]
+    builder = flatbuffers.Builder(len(model_content))
+    builder.Finish(model.Pack(builder), file_identifier=b"TFL3")
+    return bytes(builder.Output()), constants
+
+
+class LogMelFrontend:
+    """Calcule les trames log-mel de YAMNet (25 ms, pas de 10 ms, 64 bandes) en numpy"""
+
+    def __init__(self, window, mel_matrix, mel_offset):
+        """
+        Args:
+            window (numpy.ndarray): Fenêtre de Hann (YAMNET_FRAME_LENGTH,)
+            mel_matrix (numpy.ndarray): Matrice (YAMNET_FFT_SIZE // 2 + 1, YAMNET_MEL_BANDS)
+            mel_offset (numpy.ndarray): Décalage ajouté avant le log (YAMNET_MEL_BANDS,)
+        """
+        self.window = window.astype(np.float32)
+        self.mel_matrix = mel_matrix.astype(np.float32)
+        self.mel_offset = mel_offset.astype(np.float32)
+
+    def compute(self, samples, count, out=None):
+        """
+        Calcule count trames à partir de samples.
+
+        Args:
+            samples (numpy.ndarray): Au moins (count - 1) * YAMNET_FRAME_HOP + YAMNET_FRAME_LENGTH échantillons
+            count (int): Nombre de trames
+            out (numpy.ndarray, optional): Destination (count, YAMNET_MEL_BANDS)
+
+        Returns:
+            numpy.ndarray: Trames log-mel (count, YAMNET_MEL_BANDS)
+        """
+        frames = np.lib.stride_tricks.sliding_window_view(samples, YAMNET_FRAME_LENGTH)[::YAMNET_FRAME_HOP][:count]
+        magnitude = np.abs(np.fft.rfft(frames * self.window, YAMNET_FFT_SIZE)).astype(np.float32)
+        mel = np.dot(magnitude, self.mel_matrix, out=out)
+        mel += self.mel_offset
+        return np.log(mel, out=mel)
+
+
+class LogMelStream:
+    """
+    Trames log-mel d'une source, calculées une seule fois et gardées dans un AudioRing.
+
+    La trame k couvre les échantillons [k * YAMNET_FRAME_HOP, k * YAMNET_FRAME_HOP
+    + YAMNET_FRAME_LENGTH) du flux. Les fenêtres successives d'une source se
+    recouvrent : seules les trames qui n'ont pas encore été calculées le sont,
+    puis le patch de 96 trames est une vue sur l'anneau.
+    """
+
+    def __init__(self, frontend, capacity=MEL_RING_FRAMES):
+        """
+        Args:
+            frontend (LogMelFrontend): Calcul des trames
+            capacity (int): Trames conservées (au moins YAMNET_PATCH_FRAMES)
+        """
+        self.frontend = frontend
+        self._counter = np.zeros(1, dtype=np.int64)
+        self.frames = AudioRing(max(capacity, YAMNET_PATCH_FRAMES),
+                                storage=np.zeros((2 * max(capacity, YAMNET_PATCH_FRAMES), YAMNET_MEL_BANDS),
+                                                 dtype=np.float32),
+                                counter=self._counter)
+        self._block = np.zeros((YAMNET_PATCH_FRAMES, YAMNET_MEL_BANDS), dtype=np.float32)
+
+        # Statistiques
+        self.frames_computed = 0
+        self.frames_reused = 0
+
+    def update(self, ring, start_frame, end_frame):
+        """
+        Calcule les trames manquantes de [start_frame, end_frame) à partir de l'AudioRing de la source.
+
+        Returns:
+            bool: False si l'audio nécessaire n'est plus (ou pas encore) dans l'AudioRing
+        """
+        next_frame = self.frames.write_count
+        if next_frame < start_frame or next_frame - start_frame > self.frames.capacity:
+            # Trames jamais demandées (fenêtres ignorées) ou trop anciennes : repartir du patch
+            self._counter[0] = next_frame = start_frame
+        count = end_frame - next_frame
+        self.frames_reused += (end_frame - start_frame) - max(count, 0)
+        if count <= 0:
+            return True
+        first = next_frame * YAMNET_FRAME_HOP
+        length = (count - 1) * YAMNET_FRAME_HOP + YAMNET_FRAME_LENGTH
+        if not ring.is_available(first, length):
+            return False
+        offset = first
+        while count > 0:
+            block = min(count, YAMNET_PATCH_FRAMES)
+            samples = ring.view(offset, (block - 1) * YAMNET_FRAME_HOP + YAMNET_FRAME_LENGTH)
+            self.frames.write(self.frontend.compute(samples, block, out=self._block[:block]))
+            offset += block * YAMNET_FRAME_HOP
+            count -= block
+            self.frames_computed += block
+        if not ring.is_available(first, length):
+            # Audio recouvert par l'écrivain pendant le calcul : oublier ces trames déchirées
+            self._counter[0] = next_frame
+            return False
+        return True
+
+    def patch(self, start_frame):
+        """Vue (YAMNET_PATCH_FRAMES, YAMNET_MEL_BANDS) sur les trames de la fenêtre commençant à start_frame"""
+        return self.frames.view(start_frame, YAMNET_PATCH_FRAMES)
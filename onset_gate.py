@@ -0,0 +1,153 @@
+import collections
+import numpy as np
+
+GATE_FRAME_SIZE = 160  # Trames de 10 ms à 16 kHz
+GATE_RATIO_DB = 10.0  # Écart minimal au bruit de fond pour une attaque
+GATE_MIN_LEVEL_DB = -70.0  # En dessous, aucune attaque (dBFS de l'énergie haute fréquence)
+GATE_PRE_ROLL = 0.25  # Secondes gardées avant l'attaque dans la fenêtre classifiée
+GATE_HOLD = 2.0  # Secondes pendant lesquelles les fenêtres suivantes sont classifiées
+GATE_FLOOR_ADAPTATION = 0.05  # Vitesse de suivi du bruit de fond, par bloc
+
+
+class OnsetGate:
+    """
+    Porte d'énergie placée devant le classificateur pour une source.
+
+    L'énergie haute fréquence (différence première du signal, qui accentue les
+    transitoires comme un clap) est calculée par trames de 10 ms et comparée à
+    un bruit de fond adaptatif. Une trame qui dépasse le bruit de fond de
+    ratio_db après une trame calme est une attaque. Les fenêtres sans attaque
+    récente ne sont pas classifiées ; après une attaque, la fenêtre suivante est
+    recalée pour commencer pre_roll secondes avant elle, puis les fenêtres
+    restent classifiées pendant hold secondes.
+    """
+
+    def __init__(self, sample_rate=16000, ratio_db=GATE_RATIO_DB, min_level_db=GATE_MIN_LEVEL_DB,
+                 pre_roll=GATE_PRE_ROLL, hold=GATE_HOLD, frame_size=GATE_FRAME_SIZE):
+        """
+        Args:
+            sample_rate (int): Taux d'échantillonnage du flux
+            ratio_db (float): Écart minimal au bruit de fond (dB)
+            min_level_db (float): Niveau minimal d'une attaque (dBFS)
+            pre_roll (float): Audio conservé avant l'attaque dans la fenêtre (s)
+            hold (float): Durée de classification après une attaque (s)
+            frame_size (int): Taille des trames d'analyse (échantillons)
+        """
+        self.frame_size = frame_size
+        self.ratio = 10 ** (ratio_db / 10)
+        self.min_energy = 10 ** (min_level_db / 10)
+        self.pre_roll = int(pre_roll * sample_rate)
+        self.hold = int(hold * sample_rate)
+        self.noise_floor = None
+        self.onsets = collections.deque(maxlen=64)  # Positions absolues des attaques récentes
+        self._carry = np.zeros(0, dtype=np.float32)  # Fin de bloc incomplète (moins d'une trame)
+        self._last_sample = 0.0
+        self._was_active = False
+        self._position = 0  # Position absolue du prochain échantillon analysé
+        self._open_until = -1  # Fin (exclue) de la dernière fenêtre classifiée plus la tenue
+
+        # Statistiques
+        self.windows_classified = 0
+        self.windows_gated = 0
+        self.onset_count = 0
+
+    def process(self, block, position):
+        """
+        Analyse un bloc écrit dans l'AudioRing de la source.
+
+        Args:
+            block (numpy.ndarray): Échantillons float32 mono
+            position (int): Position absolue du premier échantillon du bloc
+        """
+        if position != self._position + len(self._carry):
+            # Échantillons perdus : repartir de ce bloc
+            self._carry = self._carry[:0]
+            self._position = position
+            self._was_active = False
+        samples = np.concatenate((self._carry, block)) if len(self._carry) else block
+        count = len(samples) // self.frame_size
+        if count == 0:
+            self._carry = np.array(samples, dtype=np.float32)
+            return
+        used = count * self.frame_size
+
+        # Énergie haute fréquence par trame : moyenne du carré de la différence première
+        frames = np.diff(samples[:used], prepend=self._last_sample).reshape(count, self.frame_size)
+        energies = np.einsum('ij,ij->i', frames, frames) / self.frame_size
+        self._last_sample = float(samples[used - 1])
+        self._carry = np.array(samples[used:], dtype=np.float32)
+
+        if self.noise_floor is None:
+            self.noise_floor = max(float(np.median(energies)), self.min_energy / self.ratio)
+        threshold = max(self.noise_floor * self.ratio, self.min_energy)
+        active = energies > threshold
+
+        # Attaques : trames actives précédées d'une trame calme
+        previous = np.empty_like(active)
+        previous[0] = self._was_active
+        previous[1:] = active[:-1]
+        for frame in np.flatnonzero(active & ~previous):
+            self.onsets.append(self._position + int(frame) * self.frame_size)
+            self.onset_count += 1
+        self._was_active = bool(active[-1])
+        self._position += used
+
+        # Le bruit de fond suit les trames calmes : lentement vers le haut, immédiatement vers le bas
+        quiet = energies[~active]
+        if len(quiet):
+            level = float(np.median(quiet))
+            if level < self.noise_floor:
+                self.noise_floor = max(level, self.min_energy / self.ratio)
+            else:
+                self.noise_floor += GATE_FLOOR_ADAPTATION * (level - self.noise_floor)
+
+    def schedule(self, start, window_size, oldest, end):
+        """
+        Décide du sort de la prochaine fenêtre à classifier.
+
+        Args:
+            start (int): Début prévu de la fenêtre (position absolue)
+            window_size (int): Taille de la fenêtre
+            oldest (int): Plus ancien échantillon encore dans l'AudioRing
+            end (int): Fin des échantillons écrits
+
+        Returns:
+            tuple: ('classify', début), ('skip', None) ou ('wait', None) si la
+            fenêtre recalée sur une attaque n'est pas encore complète
+        """
+        onsets = [onset for onset in self.onsets if start - self.pre_roll <= onset < start + window_size]
+        if start < self._open_until:
+            # Dans la tenue d'une attaque déjà classifiée : fenêtres consécutives, sauf
+            # si une nouvelle attaque (second clap) tombe dans leur pre-roll
+            early = [onset for onset in onsets if start <= onset < start + self.pre_roll]
+            aligned = max(early[0] - self.pre_roll, oldest) if early else start
+        elif onsets:
+            # Recaler la fenêtre pour qu'elle contienne l'attaque et son pre-roll
+            aligned = max(onsets[0] - self.pre_roll, oldest)
+        else:
+            self._count(False)
+            return 'skip', None
+        if aligned + window_size > end:
+            return 'wait', None
+        covered = [onset for onset in onsets if onset < aligned + window_size]
+        if covered:
+            self._open_until = max(self._open_until, covered[-1] + self.hold)
+        self._count(True)
+        return 'classify', aligned
+
+    def _count(self, classified):
+        if classified:
+            self.windows_classified += 1
+        else:
+            self.windows_gated += 1
+
+    def get_stats(self):
+        """Compteurs de fenêtres classifiées et ignorées, et bruit de fond (dBFS)"""
+        total = self.windows_classified + self.windows_gated
+        return {
+            'windows_classified': self.windows_classified,
+            'windows_gated': self.windows_gated,
+            'gated_ratio': self.windows_gated / total if total else 0.0,
+            'onsets': self.onset_count,
+            'noise_floor_db': round(10 * np.log10(self.noise_floor), 1) if self.noise_floor else None
+        }
@@ -0,0 +1,108 @@
+import math
+import functools
+import numpy as np
+import scipy.signal
+
+TARGET_SAMPLE_RATE = 16000
+HALF_LENGTH = 10  # Demi-longueur du filtre en périodes de la fréquence la plus basse
+KAISER_BETA = 5.0  # Même fenêtre que scipy.signal.resample_poly
+
+
+@functools.lru_cache(maxsize=None)
+def polyphase_filter(up, down):
+    """
+    Calcule le banc de filtres polyphase pour un rapport up/down.
+
+    Le filtre passe-bas (coupure à la plus basse des deux fréquences de Nyquist)
+    est découpé en `up` phases ; les coefficients de chaque phase sont inversés
+    pour s'appliquer directement à une fenêtre d'entrée chronologique.
+
+    Args:
+        up (int): Facteur de suréchantillonnage
+        down (int): Facteur de décimation
+
+    Returns:
+        numpy.ndarray: Banc float32 de forme (up, taps_par_phase)
+    """
+    max_rate = max(up, down)
+    num_taps = 2 * HALF_LENGTH * max_rate + 1
+    h = scipy.signal.firwin(num_taps, 1.0 / max_rate, window=('kaiser', KAISER_BETA)) * up
+    taps = -(-num_taps // up)
+    h = np.pad(h, (0, taps * up - num_taps))
+    # bank[p, j] = h[p + j * up], appliqué à x[n - j]
+    bank = h.reshape(taps, up).T[:, ::-1]
+    return np.ascontiguousarray(bank, dtype=np.float32)
+
+
+class StreamingResampler:
+    """
+    Rééchantillonneur polyphase à état pour un flux mono découpé en blocs.
+
+    L'historique d'entrée et la phase de sortie sont conservés d'un appel à
+    l'autre : le résultat est identique à celui du flux traité d'un seul tenant,
+    sans artefact aux frontières de paquets. Les filtres sont partagés entre
+    tous les flux de même rapport de fréquences.
+    """
+
+    def __init__(self, src_rate, dst_rate=TARGET_SAMPLE_RATE):
+        """
+        Initialise le rééchantillonneur.
+
+        Args:
+            src_rate (int): Taux d'échantillonnage du flux d'entrée
+            dst_rate (int): Taux d'échantillonnage de sortie
+        """
+        self.src_rate = int(src_rate)
+        self.dst_rate = int(dst_rate)
+        g = math.gcd(self.src_rate, self.dst_rate)
+        self.up = self.dst_rate // g
+        self.down = self.src_rate // g
+        self.passthrough = self.up == self.down
+        if not self.passthrough:
+            self.bank = polyphase_filter(self.up, self.down)
+            self.taps = self.bank.shape[1]
+            self._steps = np.zeros(0, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        """Oublie l'historique du flux"""
+        if self.passthrough:
+            return
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Position (en échantillons suréchantillonnés) de la prochaine sortie,
+        # relative au début de l'historique
+        self._position = (self.taps - 1) * self.up
+
+    def process(self, data):
+        """
+        Rééchantillonne un bloc du flux.
+
+        Args:
+            data (numpy.ndarray): Échantillons mono au taux src_rate
+
+        Returns:
+            numpy.ndarray: Échantillons float32 au taux dst_rate
+        """
+        data = np.asarray(data, dtype=np.float32)
+        if self.passthrough:
+            return data
+        signal = np.concatenate((self._history, data))
+        length = len(signal)
+
+        # Sorties dont le dernier échantillon d'entrée nécessaire est disponible
+        count = max(0, (length * self.up - 1 - self._position) // self.down + 1)
+        if count > len(self._steps):
+            self._steps = np.arange(2 * count, dtype=np.int64) * self.down
+        positions = self._position + self._steps[:count]
+        last_inputs = positions // self.up
+
+        # Vue (fenêtre glissante) sans copie : ligne i = signal[i:i + taps]
+        itemsize = signal.itemsize
+        sliding = np.ndarray((length - self.taps + 1, self.taps), dtype=np.float32,
+                             buffer=signal, strides=(itemsize, itemsize))
+        windows = sliding[last_inputs - (self.taps - 1)]
+        output = np.einsum('ij,ij->i', self.bank[positions % self.up], windows)
+
+        self._position += count * self.down - (length - (self.taps - 1)) * self.up
+        self._history = signal[length - (self.taps - 1):].copy()
+        return output.astype(np.float32, copy=False)
@@ -0,0 +1,446 @@
+import time
+import logging
+import threading
+import subprocess
+import numpy as np
+import ffmpeg
+
+try:
+    import av  # Backend optionnel : décodage dans le processus avec PyAV (libav)
+except ImportError:
+    av = None
+
+RTSP_BLOCK_DURATION = 0.1  # Durée d'un bloc lu sur la sortie de ffmpeg (secondes)
+RTSP_RING_BLOCKS = 8  # Blocs préalloués par flux : une vue livrée reste valide pendant 7 blocs
+RTSP_STALL_TIMEOUT = 5.0  # Délai sans audio au-delà duquel ffmpeg est considéré bloqué
+RTSP_BACKOFF_INITIAL = 0.5  # Premier délai avant relance
+RTSP_BACKOFF_MAX = 30.0  # Délai maximal entre deux relances
+RTSP_HEALTHY_DURATION = 10.0  # Durée de fonctionnement après laquelle le délai de relance repart du minimum
+
+
+def ffmpeg_pcm_command(url, sample_rate):
+    """
+    Ligne de commande ffmpeg décodant la piste audio d'un flux en PCM float32 mono sur stdout.
+
+    Args:
+        url (str): URL RTSP (ou tout autre entrée lisible par ffmpeg)
+        sample_rate (int): Taux d'échantillonnage de sortie
+
+    Returns:
+        list: Arguments du processus
+    """
+    return (
+        ffmpeg
+        .input(url)
+        .output('pipe:',
+                format='f32le',  # Format PCM 32-bit float
+                acodec='pcm_f32le',
+                ac=1,  # Mono
+                ar=str(sample_rate),
+                buffer_size='64k')
+        .compile()
+    )
+
+
+class RtspStream:
+    """
+    Flux RTSP supervisé : un processus ffmpeg relancé tant que le flux est actif.
+
+    Un thread lit la sortie PCM avec readinto dans un anneau de blocs float32
+    préalloué et transmet au callback une vue sur chaque bloc : la lecture ne
+    fait aucune allocation par bloc. La vue n'est valide que jusqu'à ce que
+    l'anneau revienne sur ce bloc (RTSP_RING_BLOCKS - 1 blocs plus tard) ; le
+    callback doit copier ce qu'il conserve. À la fin
+    du processus (caméra redémarrée, réseau coupé, blocage détecté par le
+    superviseur), ffmpeg est relancé après un délai qui double à chaque échec
+    consécutif, jusqu'à backoff_max.
+    """
+
+    backend = 'ffmpeg'
+
+    def __init__(self, stream_id, url, sample_rate, callback, command=ffmpeg_pcm_command,
+                 stall_timeout=RTSP_STALL_TIMEOUT, backoff_initial=RTSP_BACKOFF_INITIAL,
+                 backoff_max=RTSP_BACKOFF_MAX):
+        """
+        Initialise le flux supervisé.
+
+        Args:
+            stream_id (str): Identifiant du flux
+            url (str): URL du flux
+            sample_rate (int): Taux d'échantillonnage demandé à ffmpeg
+            callback (callable): Appelé avec une vue float32 mono sur chaque bloc lu
+            command (callable): Construit la ligne de commande à partir de (url, sample_rate)
+            stall_timeout (float): Délai sans audio avant de tuer le processus
+            backoff_initial (float): Premier délai avant relance
+            backoff_max (float): Délai maximal avant relance
+        """
+        self.stream_id = stream_id
+        self.url = url
+        self.sample_rate = int(sample_rate)
+        self.callback = callback
+        self.command = command
+        self.stall_timeout = stall_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        block_samples = int(self.sample_rate * RTSP_BLOCK_DURATION)
+        self.block_bytes = block_samples * 4
+        # Anneau de blocs : vues numpy et vues octets créées une fois pour toutes
+        self.blocks = np.zeros((RTSP_RING_BLOCKS, block_samples), dtype=np.float32)
+        self._block_views = list(self.blocks)
+        self._byte_views = [memoryview(block).cast('B') for block in self.blocks]
+        self._next_block = 0
+
+        self.running = False
+        self.state = 'stopped'
+        self.process = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # Statistiques
+        self.started_at = None
+        self.connected_at = None  # Premier audio du processus courant
+        self.last_data_time = None
+        self.spawned_at = None
+        self.restarts = 0
+        self.stalls = 0
+        self.failures = 0  # Échecs consécutifs, pour le délai de relance
+        self.bytes_total = 0
+        self.bytes_per_second = 0.0
+        self.last_error = None
+        self._stalled = False
+        self._rate_bytes = 0
+        self._rate_time = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._stop_event.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._supervise, name=f"rtsp-{self.stream_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        self._stop_event.set()
+        self._interrupt()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self.state = 'stopped'
+
+    def check(self, now):
+        """
+        Vérifie l'absence de blocage et met à jour le débit (appelé par le superviseur).
+
+        Returns:
+            bool: True si le processus a été tué pour blocage
+        """
+        if self._rate_time is not None:
+            elapsed = now - self._rate_time
+            if elapsed > 0:
+                rate = (self.bytes_total - self._rate_bytes) / elapsed
+                self.bytes_per_second = 0.7 * self.bytes_per_second + 0.3 * rate
+        self._rate_bytes = self.bytes_total
+        self._rate_time = now
+
+        if self.state not in ('connecting', 'running'):
+            return False
+        last_activity = self.last_data_time or self.spawned_at
+        if last_activity is not None and now - last_activity > self.stall_timeout:
+            logging.warning(f"Flux RTSP {self.stream_id} bloqué depuis {now - last_activity:.1f} s, relance")
+            self.stalls += 1
+            self._stalled = True
+            self.last_error = f"aucun audio depuis {self.stall_timeout:.1f} s"
+            self._interrupt()
+            return True
+        return False
+
+    def get_stats(self):
+        now = time.time()
+        return {
+            'id': self.stream_id,
+            'url': self.url,
+            'backend': self.backend,
+            'state': self.state,
+            'uptime': now - self.connected_at if self.connected_at and self.state == 'running' else 0.0,
+            'restarts': self.restarts,
+            'stalls': self.stalls,
+            'bytes_total': self.bytes_total,
+            'bytes_per_second': self.bytes_per_second,
+            'last_audio': self.last_data_time,
+            'last_error': self.last_error
+        }
+
+    def _supervise(self):
+        while self.running:
+            self._begin_session()
+            self._run_session()
+            if not self.running:
+                break
+            # Repartir du délai minimal si le processus a fonctionné assez longtemps
+            if self.connected_at and time.time() - self.connected_at >= RTSP_HEALTHY_DURATION:
+                self.failures = 0
+            delay = min(self.backoff_max, self.backoff_initial * (2 ** self.failures))
+            self.failures += 1
+            self.state = 'backoff'
+            logging.info(f"Relance du flux RTSP {self.stream_id} dans {delay:.1f} s")
+            if self._stop_event.wait(delay):
+                break
+            self.restarts += 1
+        self.state = 'stopped'
+
+    def _begin_session(self):
+        self.state = 'connecting'
+        self.connected_at = None
+        self.last_data_time = None
+        self._stalled = False
+        self.spawned_at = time.time()
+
+    def _deliver(self, samples, size):
+        """Met à jour l'état et les statistiques puis transmet un bloc au callback"""
+        now = time.time()
+        if self.connected_at is None:
+            self.connected_at = now
+            self.state = 'running'
+            logging.info(f"Flux RTSP {self.stream_id} connecté ({self.backend})")
+        self.last_data_time = now
+        self.bytes_total += size
+        if len(samples):
+            try:
+                self.callback(samples)
+            except Exception as e:
+                logging.error(f"Erreur dans le traitement du flux RTSP {self.stream_id}: {e}")
+
+    def _run_session(self):
+        """Lance ffmpeg et lit sa sortie jusqu'à la fin du processus"""
+        try:
+            self.process = subprocess.Popen(self.command(self.url, self.sample_rate),
+                                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL, bufsize=0)
+        except OSError as e:
+            logging.error(f"Impossible de lancer ffmpeg pour {self.stream_id}: {e}")
+            self.last_error = str(e)
+            self.process = None
+            return
+
+        stdout = self.process.stdout
+        try:
+            while self.running:
+                index = self._next_block
+                size = self._read_block(stdout, self._byte_views[index])
+                if size == 0:
+                    break
+                self._next_block = (index + 1) % RTSP_RING_BLOCKS
+                samples = self._block_views[index]
+                if size < self.block_bytes:
+                    # Bloc incomplet : uniquement en fin de processus
+                    samples = samples[:size // 4]
+                self._deliver(samples, size)
+        except (OSError, ValueError) as e:
+            if self.running:
+                self.last_error = str(e)
+        finally:
+            self._interrupt()
+            returncode = self.process.returncode if self.process else None
+            if self.running and not self._stalled:
+                self.last_error = f"ffmpeg terminé (code {returncode})"
+            self.process = None
+
+    def _read_block(self, stdout, view):
+        """
+        Remplit un bloc de l'anneau (ou lit le reste avant la fin du processus).
+
+        Returns:
+            int: Nombre d'octets lus
+        """
+        size = stdout.readinto(view)
+        if not size:
+            return 0
+        total = len(view)
+        while size < total:
+            read = stdout.readinto(view[size:])
+            if not read:
+                break
+            size += read
+        return size
+
+    def _interrupt(self):
+        """Interrompt la session en cours (processus ffmpeg tué)"""
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.kill()
+            process.wait(timeout=2.0)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logging.error(f"Impossible d'arrêter ffmpeg pour {self.stream_id}: {e}")
+
+
+class PyAVRtspStream(RtspStream):
+    """
+    Flux RTSP décodé dans le processus avec PyAV (libav), sans processus ffmpeg.
+
+    Seule la piste audio est demandée au serveur RTSP et démultiplexée ; la
+    conversion en float32 mono au taux demandé est faite par libswresample. Le
+    callback reçoit une vue sur le tampon de chaque trame convertie, valide
+    pendant l'appel uniquement. Supervision, relances et statistiques sont
+    celles de RtspStream ; un blocage réseau est borné par le timeout de lecture
+    de libav.
+    """
+
+    backend = 'pyav'
+
+    def __init__(self, stream_id, url, sample_rate, callback, **options):
+        if av is None:
+            raise RuntimeError("Le backend RTSP 'pyav' nécessite PyAV (pip install av)")
+        options.pop('command', None)
+        super().__init__(stream_id, url, sample_rate, callback, **options)
+        self._interrupted = False
+
+    def _run_session(self):
+        """Ouvre le flux et décode la piste audio jusqu'à sa fin"""
+        self._interrupted = False
+        open_options = {}
+        if self.url.startswith('rtsp'):
+            open_options = {'rtsp_transport': 'tcp', 'allowed_media_types': 'audio'}
+        try:
+            container = av.open(self.url, options=open_options, timeout=(self.stall_timeout, self.stall_timeout))
+        except Exception as e:
+            logging.error(f"Impossible d'ouvrir le flux RTSP {self.stream_id} avec PyAV: {e}")
+            self.last_error = str(e)
+            return
+
+        try:
+            audio_stream = container.streams.audio[0]
+            resampler = av.AudioResampler(format='flt', layout='mono', rate=self.sample_rate)
+            for packet in container.demux(audio_stream):
+                if not self.running or self._interrupted:
+                    break
+                for frame in packet.decode():
+                    for converted in resampler.resample(frame):
+                        # Vue sur le tampon de la trame convertie, sans copie
+                        samples = np.frombuffer(converted.planes[0], dtype=np.float32, count=converted.samples)
+                        self._deliver(samples, converted.samples * 4)
+            if self.running and not self._stalled:
+                self.last_error = "fin du flux"
+        except Exception as e:
+            if self.running and not self._stalled:
+                self.last_error = str(e)
+        finally:
+            container.close()
+
+    def _interrupt(self):
+        """Demande l'arrêt du décodage (pris en compte au paquet suivant)"""
+        self._interrupted = True
+
+
+RTSP_BACKENDS = {
+    'ffmpeg': RtspStream,
+    'pyav': PyAVRtspStream
+}
+
+
+class RtspSupervisor:
+    """
+    Superviseur des flux RTSP : un processus ffmpeg (ou un décodeur PyAV) par
+    flux, relancé en cas de fin ou de blocage, et statistiques par flux (durée de connexion, relances,
+    débit). Un seul thread de surveillance contrôle tous les flux.
+    """
+
+    def __init__(self, check_interval=0.5):
+        self.check_interval = check_interval
+        self.streams = {}
+        self._lock = threading.Lock()
+        self._watchdog = None
+        self._stop_event = threading.Event()
+
+    def add_stream(self, stream_id, url, sample_rate, callback, backend='ffmpeg', **options):
+        """
+        Démarre un flux supervisé (remplace un flux existant de même identifiant).
+
+        Args:
+            stream_id (str): Identifiant du flux
+            url (str): URL du flux
+            sample_rate (int): Taux d'échantillonnage de sortie
+            callback (callable): Appelé avec chaque bloc float32 mono
+            backend (str): 'ffmpeg' (processus ffmpeg) ou 'pyav' (décodage dans le processus)
+            **options: Options de RtspStream (command, stall_timeout, backoff_initial, backoff_max)
+
+        Returns:
+            RtspStream: Flux démarré
+
+        Raises:
+            ValueError: Backend inconnu
+            RuntimeError: Backend 'pyav' demandé sans PyAV installé
+        """
+        stream_class = RTSP_BACKENDS.get(backend)
+        if stream_class is None:
+            raise ValueError(f"Backend RTSP inconnu: {backend}")
+        self.remove_stream(stream_id)
+        stream = stream_class(stream_id, url, sample_rate, callback, **options)
+        with self._lock:
+            self.streams[stream_id] = stream
+            self._ensure_watchdog()
+        stream.start()
+        return stream
+
+    def remove_stream(self, stream_id):
+        """Arrête un flux et son processus ffmpeg"""
+        with self._lock:
+            stream = self.streams.pop(stream_id, None)
+        if stream is not None:
+            stream.stop()
+        return stream is not None
+
+    def get_stream_stats(self, stream_id):
+        stream = self.streams.get(stream_id)
+        return stream.get_stats() if stream else None
+
+    def get_stats(self):
+        with self._lock:
+            streams = list(self.streams.values())
+        return [stream.get_stats() for stream in streams]
+
+    def stop(self):
+        """Arrête tous les flux et le thread de surveillance"""
+        self._stop_event.set()
+        with self._lock:
+            streams = list(self.streams.values())
+            self.streams.clear()
+        for stream in streams:
+            stream.stop()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.check_interval + 1.0)
+            self._watchdog = None
+
+    def _ensure_watchdog(self):
+        if self._watchdog is not None and self._watchdog.is_alive():
+            return
+        self._stop_event.clear()
+        self._watchdog = threading.Thread(target=self._watch_loop, name="rtsp-supervisor", daemon=True)
+        self._watchdog.start()
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.check_interval):
+            with self._lock:
+                streams = list(self.streams.values())
+            now = time.time()
+            for stream in streams:
+                try:
+                    stream.check(now)
+                except Exception as e:
+                    logging.error(f"Erreur lors de la surveillance du flux RTSP {stream.stream_id}: {e}")
+
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+
+def get_rtsp_supervisor():
+    """Superviseur RTSP partagé de l'application"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = RtspSupervisor()
+        return _supervisor
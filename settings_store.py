@@ -0,0 +1,255 @@
+import os
+import copy
+import json
+import shutil
+import logging
+import threading
+
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'settings.json')
+POLL_INTERVAL = 1.0  # Période de vérification des modifications externes (secondes)
+
+
+class SettingsChange:
+    """
+    Événement publié à chaque modification des paramètres.
+
+    Attributes:
+        sections (frozenset): Sections de premier niveau modifiées ('global', 'saved_vban_sources', ...)
+        settings (dict): Nouveaux paramètres (partagés, à ne pas modifier)
+        previous (dict): Paramètres précédents
+        origin (str): 'api' pour une écriture via le store, 'file' pour une modification externe
+    """
+    __slots__ = ('sections', 'settings', 'previous', 'origin')
+
+    def __init__(self, sections, settings, previous, origin):
+        self.sections = sections
+        self.settings = settings
+        self.previous = previous
+        self.origin = origin
+
+    def affects(self, *sections):
+        """True si l'une des sections données a changé"""
+        return any(section in self.sections for section in sections)
+
+
+class SettingsStore:
+    """
+    Paramètres de l'application gardés en mémoire.
+
+    Le fichier JSON n'est lu qu'au démarrage et lorsqu'il est modifié de
+    l'extérieur (détecté par surveillance de sa date de modification). Les
+    écritures sont atomiques (fichier temporaire puis os.replace, avec copie de
+    sauvegarde) et publient un SettingsChange aux abonnés concernés.
+
+    get() retourne le dictionnaire partagé sans copie : les chemins chauds le
+    lisent sans verrou ni accès disque. Un appelant qui veut le modifier doit
+    passer par snapshot() puis save() ou update().
+    """
+
+    def __init__(self, path=SETTINGS_FILE, poll_interval=POLL_INTERVAL):
+        """
+        Initialise le store et charge le fichier.
+
+        Args:
+            path (str): Chemin du fichier de paramètres
+            poll_interval (float): Période de vérification des modifications externes
+        """
+        self.path = os.fspath(path)
+        self.backup_path = self.path + '.backup'
+        self.temp_path = self.path + '.tmp'
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._subscribers = []  # (callback, sections ou None pour toutes)
+        self._settings = {}
+        self._mtime = None
+        self._watcher = None
+        self._stop_event = threading.Event()
+
+        # Statistiques
+        self.reads = 0
+        self.writes = 0
+
+        self._reload()
+
+    def get(self):
+        """Paramètres courants (dictionnaire partagé, en lecture seule)"""
+        return self._settings
+
+    def snapshot(self):
+        """Copie profonde modifiable des paramètres courants"""
+        with self._lock:
+            return copy.deepcopy(self._settings)
+
+    def section(self, name, default=None):
+        """Section de premier niveau des paramètres (partagée, en lecture seule)"""
+        value = self._settings.get(name)
+        return default if value is None else value
+
+    def exists(self):
+        """True si le fichier de paramètres existe sur le disque"""
+        return self._mtime is not None
+
+    def save(self, settings, origin='api'):
+        """
+        Remplace les paramètres et les écrit de manière atomique.
+
+        Args:
+            settings (dict): Nouveaux paramètres complets
+            origin (str): Origine de la modification transmise aux abonnés
+        """
+        with self._lock:
+            previous, current = self._commit(settings)
+        # Abonnés appelés hors verrou : ils peuvent relire ou réécrire les paramètres
+        self._publish(previous, current, origin)
+
+    def update(self, changes, origin='api'):
+        """
+        Remplace des sections de premier niveau et écrit le résultat.
+
+        Args:
+            changes (dict): Sections à remplacer
+            origin (str): Origine de la modification transmise aux abonnés
+        """
+        with self._lock:
+            settings = dict(self._settings)
+            settings.update(changes)
+            previous, current = self._commit(settings)
+        self._publish(previous, current, origin)
+
+    def subscribe(self, callback, sections=None):
+        """
+        Abonne un callback aux modifications.
+
+        Args:
+            callback (callable): Appelé avec un SettingsChange
+            sections (iterable): Sections suivies ; None pour toutes
+        """
+        entry = (callback, frozenset(sections) if sections is not None else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+    def unsubscribe(self, callback):
+        """Désabonne un callback"""
+        with self._lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[0] != callback]
+
+    def check_for_changes(self):
+        """
+        Recharge le fichier s'il a été modifié de l'extérieur.
+
+        Returns:
+            bool: True si les paramètres ont été rechargés
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            previous = self._settings
+            if not self._reload():
+                return False
+            current = self._settings
+        self._publish(previous, current, 'file')
+        return True
+
+    def start_watching(self):
+        """Démarre le thread de surveillance des modifications externes"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, name="settings-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Arrête le thread de surveillance"""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval + 1.0)
+            self._watcher = None
+
+    def get_stats(self):
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'subscribers': len(self._subscribers),
+            'watching': self._watcher is not None and self._watcher.is_alive()
+        }
+
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logging.error(f"Erreur lors de la surveillance de {self.path}: {e}")
+
+    def _reload(self):
+        """Relit le fichier ; conserve les paramètres actuels s'il est illisible"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime = None
+            self._settings = {}
+            return True
+        try:
+            with open(self.path, 'r') as f:
+                settings = json.load(f)
+        except (ValueError, OSError) as e:
+            logging.error(f"Le fichier {self.path} est illisible, paramètres précédents conservés: {e}")
+            # Ne pas relire le même contenu invalide à chaque vérification
+            self._mtime = mtime
+            return False
+        self._mtime = mtime
+        self._settings = settings if isinstance(settings, dict) else {}
+        self.reads += 1
+        return True
+
+    def _commit(self, settings):
+        previous = self._settings
+        current = copy.deepcopy(settings)
+        self._write(current)
+        self._settings = current
+        self.writes += 1
+        return previous, current
+
+    def _write(self, settings):
+        with open(self.temp_path, 'w') as f:
+            json.dump(settings, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        # Copie de sauvegarde : le fichier principal reste en place jusqu'au remplacement atomique
+        if os.path.exists(self.path):
+            shutil.copyfile(self.path, self.backup_path)
+        os.replace(self.temp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def _publish(self, previous, current, origin):
+        sections = frozenset(
+            key for key in set(previous) | set(current)
+            if previous.get(key) != current.get(key)
+        )
+        if not sections:
+            return
+        change = SettingsChange(sections, current, previous, origin)
+        for callback, watched in list(self._subscribers):
+            if watched is not None and not (watched & sections):
+                continue
+            try:
+                callback(change)
+            except Exception as e:
+                logging.error(f"Erreur dans un abonné aux paramètres: {e}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_settings_store():
+    """Store partagé de l'application, créé et surveillé au premier appel"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SettingsStore()
+            _store.start_watching()
+        return _store
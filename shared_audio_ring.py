@@ -0,0 +1,64 @@
+import logging
+import numpy as np
+from multiprocessing import shared_memory
+from circular_buffer import AudioRing
+
+HEADER_SIZE = 64  # Compteur d'écriture int64, aligné sur une ligne de cache
+
+
+class SharedAudioRing(AudioRing):
+    """
+    AudioRing dont le stockage et le compteur d'écriture sont en mémoire partagée.
+
+    Un seul processus écrit (le thread d'acquisition de la source) ; les workers
+    d'inférence s'y attachent par nom et lisent les fenêtres par leur position
+    absolue dans le flux, sous forme de vues contiguës.
+    """
+
+    def __init__(self, capacity, name=None, create=True):
+        """
+        Crée ou ouvre un buffer partagé.
+
+        Args:
+            capacity (int): Nombre d'échantillons conservés
+            name (str, optional): Nom du segment partagé à ouvrir
+            create (bool): True pour créer le segment, False pour s'y attacher
+        """
+        capacity = int(capacity)
+        size = HEADER_SIZE + 2 * capacity * np.dtype(np.float32).itemsize
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Les workers lancés par multiprocessing partagent le resource_tracker du
+            # créateur : le segment y est déjà suivi et sera supprimé par close()
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+        self.name = self.shm.name
+        counter = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        storage = np.ndarray((2 * capacity,), dtype=np.float32, buffer=self.shm.buf, offset=HEADER_SIZE)
+        if create:
+            counter[0] = 0
+            storage.fill(0)
+        super().__init__(capacity, storage=storage, counter=counter)
+
+    @classmethod
+    def attach(cls, name, capacity):
+        """Ouvre depuis un autre processus un buffer créé par l'écrivain"""
+        return cls(capacity, name=name, create=False)
+
+    def close(self):
+        """Détache le segment (et le supprime si ce processus l'a créé)"""
+        # Lâcher les vues numpy sur shm.buf avant de fermer le mapping : elles ne le
+        # retiennent pas, une vue utilisée après close() lirait une zone démappée
+        self._counter = None
+        self.storage = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Une vue sur le segment est encore tenue ailleurs : le mapping sera libéré avec elle
+            logging.warning(f"Buffer partagé {self.name} encore référencé, fermeture différée")
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
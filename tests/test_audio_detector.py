@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+from audio_detector import AudioDetector
+from inference_engine import YAMNET_NUM_CLASSES
+
+def clap_scores(detector, score):
+    scores = np.zeros(YAMNET_NUM_CLASSES, dtype=np.float32)
+    scores[detector.class_names.index("Clapping")] = score
+    return scores
+
+def test_update_source_live():
+    """Seuil, délai et callback d'une source changent sans la retirer du détecteur."""
+    detector = AudioDetector('yamnet.tflite')
+    first, second = [], []
+    detector.add_source('mic_0', detection_callback=first.append)
+    ring = detector.sources['mic_0']['ring']
+    ring.write(np.ones(1000, dtype=np.float32))
+
+    # Au-dessus du seuil par défaut (0.3) : détection ; puis seuil global relevé à 0.5
+    detector._handle_scores('mic_0', clap_scores(detector, 0.35), 0)
+    assert len(first) == 1
+    detector.configure(threshold=0.5, delay=0.0)
+    detector._handle_scores('mic_0', clap_scores(detector, 0.45), 0)
+    assert len(first) == 1
+
+    # Seuil propre à la source et nouveau callback (webhook remplacé)
+    assert detector.update_source('mic_0', threshold=0.4, detection_callback=second.append)
+    detector._handle_scores('mic_0', clap_scores(detector, 0.45), 0)
+    assert len(first) == 1 and len(second) == 1
+    assert detector.sources['mic_0']['ring'] is ring and ring.write_count == 1000
+
+    # Délai propre à la source : la détection suivante est ignorée
+    detector.update_source('mic_0', delay=60.0)
+    detector._handle_scores('mic_0', clap_scores(detector, 0.9), 0)
+    assert len(second) == 1
+    assert not detector.update_source('unknown', threshold=0.1)
+
+def test_profiles_share_one_inference():
+    """Chaque profil a son seuil, son délai et son callback, évalués sur le même vecteur de scores."""
+    detector = AudioDetector('yamnet.tflite')
+    claps, glass = [], []
+    detector.add_source('cam', detection_callback=claps.append)
+    detector.set_profiles({
+        'glass_break': {'labels': ["Glass", "Shatter"], 'threshold': 0.5, 'delay': 60.0, 'callback': glass.append}
+    })
+    scores = clap_scores(detector, 0.4)
+    scores[detector.class_names.index("Shatter")] = 0.6
+
+    detector._handle_scores('cam', scores, 0)
+    assert len(claps) == 1 and claps[0]['profile'] == 'clap'
+    assert len(glass) == 1 and glass[0]['profile'] == 'glass_break' and glass[0]['source_id'] == 'cam'
+    assert glass[0]['score'] == pytest.approx(0.6)
+
+    # Délais indépendants : le clap (délai 0) redéclenche, le bris de verre attend
+    detector.configure(delay=0.0)
+    detector._handle_scores('cam', scores, 0)
+    assert len(claps) == 2 and len(glass) == 1
+
+    # Profils retirés à chaud : seul le clap reste
+    detector.set_profiles({})
+    detector.last_detection_time['cam'].clear()
+    detector._handle_scores('cam', scores, 0)
+    assert len(claps) == 3 and len(glass) == 1
@@ -1,6 +1,7 @@
 import numpy as np
 import pytest
-from circular_buffer import CircularAudioBuffer
+import threading
+from circular_buffer import CircularAudioBuffer, AudioRing
 
 @pytest.fixture
 def buffer():
@@ -97,3 +98,70 @@ def test_buffer_level(buffer):
     data = np.ones((1000, 1), dtype=np.float32)
     buffer.write(data)
     assert buffer.get_buffer_level() == 1.0
+
+def test_read_dtype_and_get_buffer(buffer):
+    """read() conserve le float32 du stockage et get_buffer() retourne le contenu rempli."""
+    data = np.arange(300, dtype=np.float32).reshape(-1, 1)
+    buffer.write(data)
+    assert buffer.read(100).dtype == np.float32
+    np.testing.assert_array_equal(buffer.get_buffer(), data)
+
+def test_audio_ring_read_into_and_views():
+    """read_into remplit le tableau fourni ; view_latest retourne une vue contiguë sans copie."""
+    ring = AudioRing(10)
+    ring.write(np.arange(7, dtype=np.float32))
+    out = np.full(10, -1.0, dtype=np.float32)
+    assert ring.read_into(out) == 7
+    np.testing.assert_array_equal(out[:3], np.zeros(3))
+    np.testing.assert_array_equal(out[3:], np.arange(7))
+    assert ring.available() == 0
+
+    ring.write(np.arange(7, 13, dtype=np.float32))
+    assert ring.available() == 6
+    latest = ring.view_latest(8)
+    assert np.shares_memory(latest, ring.storage)
+    np.testing.assert_array_equal(latest, np.arange(5, 13))
+    np.testing.assert_array_equal(ring.get_buffer(), np.arange(3, 13))
+
+def test_audio_ring_concurrent_reads_are_consistent():
+    """Un lecteur concurrent ne voit jamais de fenêtre déchirée par l'écrivain."""
+    ring = AudioRing(256)
+    done = threading.Event()
+
+    def producer():
+        value = 0
+        for _ in range(2000):
+            ring.write(np.arange(value, value + 37, dtype=np.float32))
+            value += 37
+        done.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    out = np.zeros(128, dtype=np.float32)
+    while not done.is_set():
+        if ring.read_into(out) == len(out):
+            # Les échantillons lus doivent être consécutifs
+            np.testing.assert_array_equal(np.diff(out), np.ones(127))
+    thread.join()
+
+def test_audio_ring_peek_consume():
+    """Les blocs sont extraits dans l'ordre, sous forme de vues contiguës."""
+    ring = AudioRing(10)
+    ring.write(np.arange(7, dtype=np.float32))
+    ring.write(np.arange(7, 14, dtype=np.float32))
+    assert ring.available() == 10  # Les 4 plus anciens ont été écrasés
+    block = ring.peek(6)
+    np.testing.assert_array_equal(block, np.arange(4, 10, dtype=np.float32))
+    assert np.shares_memory(block, ring.storage)
+    ring.consume(6)
+    assert ring.available() == 4
+    np.testing.assert_array_equal(ring.peek(4), np.arange(10, 14, dtype=np.float32))
+
+def test_audio_ring_window_availability():
+    """Une fenêtre n'est disponible qu'une fois écrite et tant qu'elle n'est pas écrasée."""
+    ring = AudioRing(8)
+    ring.write(np.zeros(5, dtype=np.float32))
+    assert not ring.is_available(0, 6)
+    ring.write(np.zeros(5, dtype=np.float32))
+    assert ring.is_available(2, 6)
+    assert not ring.is_available(1, 6)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from audio_detector import AudioDetector
+from circular_buffer import AudioRing
+from hop_scheduler import HopScheduler, hop_from_overlap
+from inference_engine import YAMNET_WINDOW_SIZE
+
+class RecordingEngine:
+    """Moteur d'inférence qui enregistre le début des fenêtres soumises"""
+    running = True
+
+    def __init__(self, accept=True):
+        self.starts = []
+        self.accept = accept
+
+    def start(self):
+        pass
+
+    def create_ring(self, source_id):
+        return AudioRing(64000)
+
+    def submit_ring(self, source_id, ring, start, timestamp_ms, callback):
+        self.starts.append(start)
+        return self.accept
+
+def feed(detector, seconds, source_id='mic_0', block=1600):
+    for _ in range(int(seconds * 16000) // block):
+        detector.process_audio(np.zeros(block, dtype=np.float32), source_id)
+
+def test_hop_from_overlap():
+    """Un recouvrement de 0.8 donne un pas de 3120 échantillons (195 ms)."""
+    assert hop_from_overlap(0.8) == 3120
+    assert hop_from_overlap(0.0) == YAMNET_WINDOW_SIZE
+    with pytest.raises(ValueError):
+        hop_from_overlap(1.0)
+
+def test_windows_at_exact_hop():
+    """Les fenêtres commencent exactement tous les hop échantillons, quelle que soit la taille des blocs."""
+    engine = RecordingEngine()
+    detector = AudioDetector('yamnet.tflite', engine=engine)
+    detector.configure(hop=0.2)
+    detector.add_source('mic_0')
+    detector.start()
+    feed(detector, 3.0, block=1000)
+    assert engine.starts == [i * 3200 for i in range(len(engine.starts))]
+    # Dernière fenêtre complète : 48000 - 15600 = 32400 -> 11 fenêtres (0 à 32000)
+    assert len(engine.starts) == 11
+    stats = detector.get_inference_stats('mic_0')
+    assert stats['hop_ms'] == 200.0 and stats['target_rate'] == 5.0
+    assert stats['windows_submitted'] == 11 and stats['inference_rate'] > 0
+
+def test_source_hop_overrides_default():
+    """Un pas propre à la source remplace celui du détecteur, même à chaud."""
+    engine = RecordingEngine()
+    detector = AudioDetector('yamnet.tflite', engine=engine)
+    detector.add_source('mic_0', hop=0.5)
+    detector.start()
+    feed(detector, 2.0)
+    assert engine.starts == [0, 8000, 16000]
+
+    detector.update_source('mic_0', hop=None)
+    detector.configure(hop=0.1)
+    engine.starts.clear()
+    feed(detector, 0.5)
+    assert np.all(np.diff(engine.starts) == 1600)
+
+def test_dropped_and_lost_windows():
+    """Les fenêtres refusées par le moteur et celles écrasées dans l'anneau sont comptées."""
+    scheduler = HopScheduler(3200, start=0)
+    scheduler.catch_up(10000)
+    assert scheduler.next_start == 10000 and scheduler.windows_lost == 4
+    scheduler.record(submitted=False)
+    scheduler.skip()
+    stats = scheduler.get_stats()
+    assert stats['windows_dropped'] == 1 and stats['windows_skipped'] == 1
+    assert stats['windows_submitted'] == 0 and scheduler.next_start == 13200
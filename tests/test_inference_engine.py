@@ -0,0 +1,186 @@
+import time
+import threading
+import numpy as np
+import pytest
+from circular_buffer import AudioRing
+import inference_engine
+from inference_engine import (InferenceEngine, InferenceContext, YAMNET_WINDOW_SIZE, YAMNET_NUM_CLASSES,
+                              copy_window, load_class_names)
+
+class FakeBackend:
+    """Backend de test : le score de la classe 0 vaut la première valeur de la fenêtre."""
+    def __init__(self):
+        self.batch_sizes = []
+
+    def classify_batch(self, batch):
+        self.batch_sizes.append(len(batch))
+        scores = np.zeros((len(batch), YAMNET_NUM_CLASSES), dtype=np.float32)
+        scores[:, 0] = batch[:, 0]
+        return scores
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def engine():
+    """Crée un moteur d'inférence avec un backend factice."""
+    engine = InferenceEngine("yamnet.tflite", max_batch_size=8, max_wait=0.05, backend_factory=FakeBackend)
+    # Créer le contexte sans démarrer son thread pour pouvoir remplir la file d'abord
+    engine.contexts = [InferenceContext(engine, 0, FakeBackend())]
+    yield engine
+    engine.stop()
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_batching_and_fan_out(engine):
+    """Les fenêtres soumises ensemble sont scorées en un seul lot et renvoyées à leur source."""
+    results = {}
+    done = threading.Event()
+
+    def callback(source_id, scores, timestamp):
+        results[source_id] = (float(scores[0]), timestamp)
+        if len(results) == 6:
+            done.set()
+
+    for i in range(6):
+        window = np.full(YAMNET_WINDOW_SIZE, i / 10, dtype=np.float32)
+        assert engine.submit(f"source_{i}", window, i, callback)
+    engine.start()
+
+    assert done.wait(2.0)
+    assert engine.contexts[0].backend.batch_sizes == [6]
+    for i in range(6):
+        assert results[f"source_{i}"][0] == pytest.approx(i / 10)
+        assert results[f"source_{i}"][1] == i
+
+def test_batch_size_limit(engine):
+    """Un lot ne dépasse jamais max_batch_size."""
+    received = []
+    for i in range(20):
+        engine.submit("source", np.zeros(YAMNET_WINDOW_SIZE, dtype=np.float32), i,
+                      lambda source_id, scores, timestamp: received.append(timestamp))
+    engine.start()
+
+    assert wait_for(lambda: len(received) == 20)
+    assert max(engine.contexts[0].backend.batch_sizes) <= 8
+    assert received == list(range(20))
+
+def test_stats(engine):
+    """Les statistiques rapportent la taille des lots et la latence."""
+    received = []
+    engine.start()
+    for i in range(4):
+        engine.submit("source", np.zeros(YAMNET_WINDOW_SIZE, dtype=np.float32), i,
+                      lambda source_id, scores, timestamp: received.append(timestamp))
+    assert wait_for(lambda: len(received) == 4)
+
+    stats = engine.get_stats()
+    assert stats['windows'] == 4
+    assert stats['avg_batch_size'] >= 1
+    assert stats['latency_p99_ms'] is not None
+    assert stats['dropped'] == 0
+
+def test_queue_full():
+    """Les fenêtres sont abandonnées quand la file est pleine."""
+    engine = InferenceEngine("yamnet.tflite", max_queue_size=2)
+    engine.contexts = [InferenceContext(engine, 0, FakeBackend())]
+    window = np.zeros(YAMNET_WINDOW_SIZE, dtype=np.float32)
+    assert engine.submit("source", window, 0, None)
+    assert engine.submit("source", window, 1, None)
+    assert not engine.submit("source", window, 2, None)
+    assert engine.get_stats()['dropped'] == 1
+
+def test_submit_ring(engine):
+    """Les fenêtres soumises par position sont lues dans le buffer de la source au moment du lot."""
+    ring = AudioRing(2 * YAMNET_WINDOW_SIZE)
+    received = []
+    ring.write(np.full(YAMNET_WINDOW_SIZE, 0.5, dtype=np.float32))
+    assert engine.submit_ring("source", ring, 0, 0, lambda source_id, scores, timestamp: received.append(float(scores[0])))
+    # Cette fenêtre sera écrasée avant l'inférence
+    assert engine.submit_ring("source", ring, YAMNET_WINDOW_SIZE, 1, lambda *args: received.append(None))
+    ring.write(np.zeros(3 * YAMNET_WINDOW_SIZE, dtype=np.float32))
+    engine.start()
+
+    assert wait_for(lambda: engine.get_stats()['dropped'] == 2)
+    assert received == []
+
+    start = ring.write_count
+    ring.write(np.full(YAMNET_WINDOW_SIZE, 0.25, dtype=np.float32))
+    engine.submit_ring("source", ring, start, 2, lambda source_id, scores, timestamp: received.append(float(scores[0])))
+    assert wait_for(lambda: received == [0.25])
+
+class TearingRing(AudioRing):
+    """AudioRing dont l'écrivain fait le tour de l'anneau pendant chaque lecture."""
+    def view(self, start, length):
+        data = super().view(start, length)
+        self.write(np.zeros(self.capacity, dtype=np.float32))
+        return data
+
+def test_torn_window_is_dropped(engine):
+    """Une fenêtre recouverte pendant sa copie dans le lot est abandonnée, pas classifiée."""
+    ring = TearingRing(2 * YAMNET_WINDOW_SIZE)
+    ring.write(np.full(YAMNET_WINDOW_SIZE, 0.5, dtype=np.float32))
+    assert not copy_window(ring, 0, np.empty(YAMNET_WINDOW_SIZE, dtype=np.float32))
+
+    start = ring.write_count
+    ring.write(np.full(YAMNET_WINDOW_SIZE, 0.5, dtype=np.float32))
+    received = []
+    engine.submit_ring("source", ring, start, 0, lambda *args: received.append(args))
+    engine.start()
+    assert wait_for(lambda: engine.get_stats()['dropped'] == 1)
+    assert received == []
+
+def test_load_class_names():
+    """Les noms de classes suivent les indices du modèle."""
+    class_names = load_class_names()
+    assert len(class_names) == YAMNET_NUM_CLASSES
+    assert class_names[58] == "Clapping"
+
+def test_source_affinity():
+    """Chaque source reste attachée à un seul contexte et reçoit ses propres résultats."""
+    engine = InferenceEngine("yamnet.tflite", max_batch_size=4, num_contexts=3, backend_factory=FakeBackend)
+    engine.start()
+    try:
+        results = {f"source_{i}": [] for i in range(6)}
+        for n in range(5):
+            for i in range(6):
+                window = np.full(YAMNET_WINDOW_SIZE, i + n / 10, dtype=np.float32)
+                engine.submit(f"source_{i}", window, n,
+                              lambda source_id, scores, timestamp: results[source_id].append(float(scores[0])))
+
+        assert wait_for(lambda: sum(len(r) for r in results.values()) == 30)
+        for i in range(6):
+            assert results[f"source_{i}"] == pytest.approx([i + n / 10 for n in range(5)])
+        assert engine.get_stats()['sources_per_context'] == [2, 2, 2]
+
+        engine.release_source("source_0")
+        assert engine.get_stats()['sources_per_context'] == [1, 2, 2]
+    finally:
+        engine.stop()
+
+def test_unknown_backend():
+    """Un nom de backend inconnu est refusé à la création du moteur."""
+    with pytest.raises(ValueError):
+        InferenceEngine("yamnet.tflite", backend='onnx')
+
+@pytest.mark.skipif(inference_engine.TFLiteInterpreter is None, reason="tflite_runtime et tensorflow absents")
+def test_tflite_backend_scores_and_embeddings():
+    """L'interpréteur direct retourne le vecteur de scores brut et les embeddings déquantifiés."""
+    backend = inference_engine.TFLiteBackend("yamnet.tflite", num_threads=1, embeddings=True)
+    t = np.arange(YAMNET_WINDOW_SIZE) / 16000
+    batch = np.stack([np.zeros(YAMNET_WINDOW_SIZE), 0.3 * np.sin(2 * np.pi * 440 * t)]).astype(np.float32)
+
+    scores = backend.classify_batch(batch)
+    assert scores.shape == (2, YAMNET_NUM_CLASSES) and scores.dtype == np.float32
+    class_names = load_class_names()
+    assert class_names[int(scores[0].argmax())] == 'Silence'
+    assert backend.embeddings.shape[1] == 1024 and backend.embeddings[:2].min() >= 0
+
+    single, embeddings = backend.classify(batch[1])
+    np.testing.assert_array_equal(single, scores[1])
+    np.testing.assert_allclose(embeddings, backend.embeddings[0])
+    backend.close()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from inference_engine import YAMNET_NUM_CLASSES, load_class_names
+from label_scoring import ScoringMatrix, top_k, CLAP_LABELS, NEGATIVE_LABELS
+
+def test_top_k_matches_full_sort():
+    """top_k retourne les mêmes indices qu'un tri complet, dans le même ordre."""
+    scores = np.random.default_rng(0).random(YAMNET_NUM_CLASSES).astype(np.float32)
+    np.testing.assert_array_equal(top_k(scores, 5), np.argsort(scores)[::-1][:5])
+    above = top_k(scores, 10, threshold=0.99)
+    assert all(scores[above] >= 0.99) and len(above) <= 10
+    assert len(top_k(scores, 0)) == 0
+
+def test_clap_profile_matches_label_sums():
+    """Le profil clap vaut la somme des classes de clap moins celle des faux positifs, parmi les meilleures."""
+    class_names = load_class_names()
+    scoring = ScoringMatrix(class_names=class_names)
+    scores = np.zeros(YAMNET_NUM_CLASSES, dtype=np.float32)
+    for label, score in (("Clapping", 0.6), ("Hands", 0.3), ("Finger snapping", 0.2), ("Speech", 0.9), ("Cap gun", 0.05)):
+        scores[class_names.index(label)] = score
+
+    expected = 0.6 + 0.3 - 0.2 + 0.05
+    assert scoring.score(scores)[scoring.index('clap')] == pytest.approx(expected)
+    top = top_k(scores, 5, threshold=0.1)  # "Cap gun" sous le seuil
+    assert scoring.score(scores, top)[0] == pytest.approx(expected - 0.05)
+    assert scoring.score_sparse(top, scores[top])[0] == pytest.approx(expected - 0.05)
+
+def test_several_profiles_in_one_product():
+    """Plusieurs profils sont scorés ensemble ; une classe inconnue est refusée."""
+    scoring = ScoringMatrix({
+        'clap': {'labels': CLAP_LABELS, 'negative_labels': NEGATIVE_LABELS},
+        'dog': {'labels': ["Dog", "Bark"]}
+    })
+    class_names = load_class_names()
+    scores = np.zeros(YAMNET_NUM_CLASSES, dtype=np.float32)
+    scores[class_names.index("Bark")] = 0.7
+    scores[class_names.index("Clapping")] = 0.4
+    np.testing.assert_allclose(scoring.score(scores), [0.4, 0.7])
+    with pytest.raises(ValueError):
+        ScoringMatrix({'glass': {'labels': ["Verre brisé"]}})
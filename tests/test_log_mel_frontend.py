@@ -0,0 +1,93 @@
+import time
+import numpy as np
+import pytest
+import inference_engine
+from circular_buffer import AudioRing
+from inference_engine import InferenceEngine, YAMNET_WINDOW_SIZE
+from log_mel_frontend import LogMelFrontend, LogMelStream, split_yamnet_model, YAMNET_PATCH_FRAMES
+
+pytestmark = pytest.mark.skipif(inference_engine.TFLiteInterpreter is None, reason="tflite_runtime et tensorflow absents")
+
+def noise(seconds, seed=0):
+    t = np.arange(int(seconds * 16000)) / 16000
+    audio = 0.05 * np.random.default_rng(seed).standard_normal(len(t)) + 0.3 * np.sin(2 * np.pi * 440 * t)
+    return audio.astype(np.float32)
+
+@pytest.fixture(scope='module')
+def backends():
+    return inference_engine.LogMelTFLiteBackend('yamnet.tflite'), inference_engine.TFLiteBackend('yamnet.tflite')
+
+def test_split_model_matches_full_model(backends):
+    """Frontal numpy et réseau convolutif seul donnent les scores du modèle complet."""
+    backend, reference = backends
+    windows = np.stack([noise(0.975, seed) for seed in range(3)])
+    np.testing.assert_allclose(backend.classify_batch(windows), reference.classify_batch(windows), atol=1e-6)
+
+def test_overlapping_windows_reuse_frames(backends):
+    """Des fenêtres au pas de 200 ms ne calculent que 20 nouvelles trames chacune."""
+    backend, reference = backends
+    ring = AudioRing(64000)
+    ring.write(noise(3.0))
+    starts = [3200 * i for i in range(5)]
+    for start in starts:
+        scores = backend.classify_ring('mic_0', ring, start)
+        expected = reference.classify_batch(ring.view(start, YAMNET_WINDOW_SIZE)[np.newaxis])[0]
+        np.testing.assert_allclose(scores, expected, atol=1e-6)
+    stream = backend.streams['mic_0']
+    assert stream.frames_computed == YAMNET_PATCH_FRAMES + 4 * 20
+    assert stream.frames_reused == 4 * (YAMNET_PATCH_FRAMES - 20)
+
+    # Trames manquantes dont l'audio a été écrasé : la fenêtre est refusée ; source oubliée : le cache est libéré
+    ring.write(noise(4.0, seed=1))
+    assert backend.classify_ring('mic_0', ring, 16000) is None
+    backend.release_source('mic_0')
+    assert 'mic_0' not in backend.streams
+
+def test_stream_restarts_after_skipped_windows():
+    """Après des fenêtres ignorées (porte d'énergie), seules les trames du patch demandé sont calculées."""
+    with open('yamnet.tflite', 'rb') as f:
+        _, constants = split_yamnet_model(f.read())
+    stream = LogMelStream(LogMelFrontend(**constants))
+    ring = AudioRing(64000)
+    ring.write(noise(3.5))
+    assert stream.update(ring, 0, YAMNET_PATCH_FRAMES)
+    assert stream.update(ring, 200, 200 + YAMNET_PATCH_FRAMES)
+    assert stream.frames_computed == 2 * YAMNET_PATCH_FRAMES and stream.frames_reused == 0
+    # Fenêtre pas encore complète
+    assert not stream.update(ring, 300, 300 + YAMNET_PATCH_FRAMES)
+
+def test_stream_rejects_audio_overwritten_during_update():
+    """Des trames calculées sur un audio recouvert pendant le calcul sont oubliées."""
+    class TearingRing(AudioRing):
+        def view(self, start, length):
+            data = super().view(start, length)
+            self.write(np.zeros(self.capacity, dtype=np.float32))
+            return data
+
+    with open('yamnet.tflite', 'rb') as f:
+        _, constants = split_yamnet_model(f.read())
+    stream = LogMelStream(LogMelFrontend(**constants))
+    ring = TearingRing(64000)
+    ring.write(noise(1.0))
+    assert not stream.update(ring, 0, YAMNET_PATCH_FRAMES)
+    assert stream.frames.write_count == 0
+
+def test_engine_with_streaming_backend():
+    """Le moteur classifie les fenêtres d'un AudioRing avec le frontal incrémental et compte les trames."""
+    results = []
+    engine = InferenceEngine('yamnet.tflite', backend='tflite_mel')
+    engine.start()
+    try:
+        ring = engine.create_ring('mic_0')
+        ring.write(noise(1.5))
+        for start in (0, 3200):
+            assert engine.submit_ring('mic_0', ring, start, start, lambda *args: results.append(args))
+        deadline = time.time() + 10
+        while len(results) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        stats = engine.get_stats()
+    finally:
+        engine.stop()
+    assert [result[2] for result in results] == [0, 3200]
+    assert stats['backend'] == 'tflite_mel'
+    assert stats['mel_frames_computed'] == YAMNET_PATCH_FRAMES + 20
@@ -0,0 +1,208 @@
+import sys
+import types
+import importlib
+import time
+import wave
+import threading
+import numpy as np
+import pytest
+
+try:
+    importlib.import_module('sounddevice')
+except OSError:
+    # PortAudio absent : un module vide suffit, sd est remplacé dans chaque test
+    sys.modules['sounddevice'] = types.ModuleType('sounddevice')
+
+import ingest_workers
+from ingest_workers import MicrophoneIngest, open_microphone_channel, close_microphone_channel
+
+
+class FakeInputStream:
+    """Remplace sd.InputStream : garde le callback pour l'appeler depuis le test"""
+    instances = []
+
+    def __init__(self, device, channels, samplerate, blocksize, callback):
+        self.device = device
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.active = False
+        FakeInputStream.instances.append(self)
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        pass
+
+
+class Flags:
+    def __init__(self, input_overflow=False, input_underflow=False):
+        self.input_overflow = input_overflow
+        self.input_underflow = input_underflow
+
+    def __bool__(self):
+        return self.input_overflow or self.input_underflow
+
+
+class RecordingDetector:
+    def __init__(self):
+        self.blocks = {}
+        self.threads = set()
+
+    def process_audio(self, audio_data, source_id):
+        self.threads.add(threading.current_thread())
+        self.blocks.setdefault(source_id, []).append(np.array(audio_data))
+
+    def received(self, source_id):
+        blocks = self.blocks.get(source_id)
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+@pytest.fixture
+def fake_sd(monkeypatch):
+    FakeInputStream.instances = []
+    fake = types.SimpleNamespace(InputStream=FakeInputStream,
+                                 query_devices=lambda index: {'default_samplerate': 16000.0, 'max_input_channels': 4})
+    monkeypatch.setattr(ingest_workers, 'sd', fake)
+    monkeypatch.setattr(ingest_workers, '_captures', {})
+    return fake
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def multichannel_wav(path, channels=4, frames=8000, rate=16000):
+    """Écrit un WAV int16 dont le canal c contient une sinusoïde de (c + 1) x 200 Hz"""
+    t = np.arange(frames) / rate
+    audio = np.stack([0.5 * np.sin(2 * np.pi * 200 * (c + 1) * t) for c in range(channels)], axis=1)
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes((audio * 32767).astype(np.int16).tobytes())
+
+
+def play_wav(stream, path, flags=lambda index: Flags()):
+    """Envoie le WAV au callback par blocs entrelacés, comme PortAudio"""
+    with wave.open(str(path), 'rb') as f:
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        audio = (data.astype(np.float32) / 32767).reshape(-1, f.getnchannels())
+    for index, start in enumerate(range(0, len(audio), stream.blocksize)):
+        block = audio[start:start + stream.blocksize]
+        stream.callback(block, len(block), None, flags(index))
+    return audio
+
+
+def test_channels_of_one_device_share_a_stream(fake_sd, tmp_path):
+    """Chaque canal est une source indépendante, alimentée par un seul flux multicanal."""
+    detector = RecordingDetector()
+    workers = [MicrophoneIngest(f"mic_3_{channel}", detector, {'device_index': 3, 'channel': channel})
+               for channel in (0, 2, 3)]
+    for worker in workers:
+        worker.start()
+    try:
+        assert wait_for(lambda: all(worker.ring is not None for worker in workers))
+        # Le flux est rouvert plus large selon l'ordre d'ouverture des canaux : un seul reste actif
+        active = [stream for stream in FakeInputStream.instances if stream.active]
+        assert len(active) == 1
+        stream = active[0]
+        assert stream.device == 3 and stream.channels == 4
+
+        source = tmp_path / 'rooms.wav'
+        multichannel_wav(source)
+        audio = play_wav(stream, source, flags=lambda index: Flags(input_overflow=index == 2))
+        assert wait_for(lambda: all(len(detector.received(w.source_id)) == len(audio) for w in workers))
+
+        for worker, channel in zip(workers, (0, 2, 3)):
+            np.testing.assert_array_equal(detector.received(worker.source_id), audio[:, channel])
+        assert detector.threads == {worker._thread for worker in workers}
+        capture = workers[1].get_status()['capture']
+        assert capture['channel'] == 2 and capture['callbacks'] == 5 and capture['input_overflows'] == 1
+        assert capture['pending'] == 0 and capture['samples_dropped'] == 0
+    finally:
+        for worker in workers:
+            worker.stop()
+    assert not stream.active and ingest_workers._captures == {}
+
+
+def test_channel_views_are_strided(fake_sd):
+    """La file d'un canal est une colonne du stockage entrelacé, sans copie."""
+    capture, reader = open_microphone_channel(1, 2)
+    capture._audio_callback(np.arange(30, dtype=np.float32).reshape(10, 3), 10, None, Flags())
+    view = reader.peek(reader.available())
+    np.testing.assert_array_equal(view, np.arange(2, 30, 3))
+    assert np.shares_memory(view, capture.storage) and view.strides == (12,)
+    with pytest.raises(ValueError):
+        capture.open_channel(4)
+    close_microphone_channel(capture, reader)
+    assert ingest_workers._captures == {}
+
+
+def test_slow_analysis_counts_dropped_samples(fake_sd):
+    """Si l'analyse prend plus de retard que la file, les échantillons perdus sont comptés."""
+    detector = RecordingDetector()
+    worker = MicrophoneIngest('mic_0', detector, {'device_index': 0})
+    worker.capture, worker.ring = open_microphone_channel(0, 0)
+    capacity = worker.ring.capacity
+    for _ in range(5):
+        worker.capture._audio_callback(np.ones((capacity // 4, 1), dtype=np.float32), capacity // 4, None, Flags())
+    worker._drain()
+    assert worker.samples_dropped == capacity // 4
+    assert len(detector.received('mic_0')) == capacity
+    close_microphone_channel(worker.capture, worker.ring)
+
+
+def test_only_requested_channels_are_opened(fake_sd):
+    """Un périphérique à 64 entrées n'ouvre que les canaux demandés, puis s'élargit sans perdre l'historique."""
+    fake_sd.query_devices = lambda index: {'default_samplerate': 48000.0, 'max_input_channels': 64}
+    capture, first = open_microphone_channel(5, 0)
+    stream = FakeInputStream.instances[0]
+    assert stream.channels == 1 and capture.storage.shape[1] == 1
+    capture._audio_callback(np.full((10, 1), 0.5, dtype=np.float32), 10, None, Flags())
+
+    # Un second canal plus haut rouvre le flux avec les entrées 0 à 5
+    _, second = open_microphone_channel(5, 5)
+    assert not stream.active and len(FakeInputStream.instances) == 2
+    stream = FakeInputStream.instances[1]
+    assert stream.active and stream.channels == 6 and capture.storage.shape[1] == 6
+    np.testing.assert_array_equal(first.peek(first.available()), np.full(10, 0.5))
+    block = np.arange(12, dtype=np.float32).reshape(2, 6)
+    capture._audio_callback(block, 2, None, Flags())
+    first.consume(10)
+    np.testing.assert_array_equal(first.peek(first.available()), block[:, 0])
+    np.testing.assert_array_equal(second.peek(second.available()), block[:, 5])
+
+    close_microphone_channel(capture, first)
+    assert stream.active
+    close_microphone_channel(capture, second)
+    assert not stream.active and ingest_workers._captures == {}
+
+
+def test_release_waits_for_blocked_thread():
+    """Si stop() expire, la libération de la source est différée à la fin du thread d'acquisition."""
+    unblock = threading.Event()
+
+    class BlockedIngest(ingest_workers.IngestWorker):
+        def _run(self):
+            unblock.wait(5)  # Lecture bloquante qui ignore self.running
+
+    released = []
+    worker = BlockedIngest('blocked', RecordingDetector(), {})
+    worker.start()
+    worker.stop(timeout=0.05)
+    worker.when_stopped(lambda: released.append('exit'))
+    assert released == [] and worker.is_alive()
+    unblock.set()
+    assert wait_for(lambda: released == ['exit'])
+    worker.stop()
+    assert not worker.is_alive()
+    worker.when_stopped(lambda: released.append('now'))
+    assert released[-1] == 'now'
@@ -0,0 +1,92 @@
+import numpy as np
+from audio_detector import AudioDetector
+from circular_buffer import AudioRing
+from inference_engine import YAMNET_WINDOW_SIZE
+from onset_gate import OnsetGate
+
+SAMPLE_RATE = 16000
+
+class RecordingEngine:
+    """Moteur d'inférence qui enregistre le début des fenêtres soumises"""
+    running = True
+
+    def __init__(self):
+        self.starts = []
+
+    def start(self):
+        pass
+
+    def create_ring(self, source_id):
+        return AudioRing(4 * SAMPLE_RATE)
+
+    def submit_ring(self, source_id, ring, start, timestamp_ms, callback):
+        self.starts.append(start)
+        return True
+
+def background(seconds, level=0.002, seed=0):
+    return (level * np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+def add_clap(audio, at):
+    position = int(at * SAMPLE_RATE)
+    burst = np.random.default_rng(1).standard_normal(800) * np.exp(-np.arange(800) / 120)
+    audio[position:position + 800] += 0.5 * burst.astype(np.float32)
+    return position
+
+def feed(detector, audio, block=1600):
+    for offset in range(0, len(audio), block):
+        detector.process_audio(audio[offset:offset + block], 'mic_0')
+
+def gated_detector():
+    engine = RecordingEngine()
+    detector = AudioDetector('yamnet.tflite', engine=engine)
+    detector.set_gate(True)
+    detector.add_source('mic_0')
+    detector.start()
+    return detector, engine
+
+def test_quiet_audio_is_gated():
+    """Sur un bruit de fond stable, aucune fenêtre n'est classifiée."""
+    detector, engine = gated_detector()
+    feed(detector, background(10.0))
+    stats = detector.get_gate_stats('mic_0')
+    assert engine.starts == []
+    assert stats['windows_classified'] == 0 and stats['windows_gated'] >= 9
+    assert stats['onsets'] == 0
+
+def test_clap_window_includes_pre_roll():
+    """La fenêtre d'un clap est recalée pour contenir l'attaque et le pre-roll, puis tenue."""
+    detector, engine = gated_detector()
+    audio = background(10.0)
+    onset = add_clap(audio, 4.3)
+    feed(detector, audio)
+
+    first = engine.starts[0]
+    gate = detector.sources['mic_0']['gate']
+    assert first <= onset - gate.pre_roll + gate.frame_size
+    assert onset < first + YAMNET_WINDOW_SIZE
+    # Fenêtres consécutives pendant la tenue (2 s), puis la porte se referme
+    assert engine.starts == [first + i * YAMNET_WINDOW_SIZE for i in range(len(engine.starts))]
+    assert 2 <= len(engine.starts) <= 4
+    stats = detector.get_gate_stats('mic_0')
+    assert stats['onsets'] == 1 and stats['windows_classified'] == len(engine.starts)
+
+def test_disabled_gate_classifies_every_window():
+    """Sans porte, toutes les fenêtres sont soumises et aucun compteur n'est exposé."""
+    engine = RecordingEngine()
+    detector = AudioDetector('yamnet.tflite', engine=engine)
+    detector.add_source('mic_0')
+    detector.start()
+    feed(detector, background(3.0))
+    assert len(engine.starts) == 3
+    assert detector.get_gate_stats('mic_0') is None
+
+def test_blocks_smaller_than_a_frame():
+    """Les blocs plus courts qu'une trame sont accumulés avant l'analyse."""
+    gate = OnsetGate(SAMPLE_RATE)
+    audio = background(1.0)
+    onset = add_clap(audio, 0.6)
+    position = 0
+    for block in np.array_split(audio, 700):
+        gate.process(block, position)
+        position += len(block)
+    assert len(gate.onsets) == 1 and abs(gate.onsets[0] - onset) <= gate.frame_size
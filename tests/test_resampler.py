@@ -0,0 +1,33 @@
+import numpy as np
+import scipy.signal
+import pytest
+from resampler import StreamingResampler, polyphase_filter
+
+@pytest.mark.parametrize("src_rate", [44100, 48000, 8000])
+def test_chunked_matches_whole_stream(src_rate):
+    """Le découpage en paquets ne change pas le résultat (état conservé entre appels)."""
+    signal = np.random.default_rng(0).standard_normal(src_rate).astype(np.float32)
+    whole = StreamingResampler(src_rate).process(signal)
+
+    resampler = StreamingResampler(src_rate)
+    sizes = np.random.default_rng(1).integers(1, 600, size=len(signal))
+    bounds = np.cumsum(np.concatenate(([0], sizes)))
+    chunks = [resampler.process(signal[a:b]) for a, b in zip(bounds[:-1], bounds[1:]) if a < len(signal)]
+
+    assert len(whole) == 16000
+    np.testing.assert_array_equal(np.concatenate(chunks), whole)
+
+def test_matches_resample_poly():
+    """Hors latence du filtre, le résultat est celui de scipy.signal.resample_poly."""
+    signal = np.random.default_rng(2).standard_normal(48000).astype(np.float32)
+    streamed = StreamingResampler(48000).process(signal)
+    reference = scipy.signal.resample_poly(signal, 1, 3)
+    delay = 10  # Demi-longueur du filtre en échantillons de sortie
+    np.testing.assert_allclose(streamed[delay:], reference[:-delay], atol=1e-5)
+
+def test_passthrough_and_filter_cache():
+    """Aucun filtrage à 16 kHz ; les filtres sont partagés entre flux de même rapport."""
+    signal = np.arange(100, dtype=np.float32)
+    np.testing.assert_array_equal(StreamingResampler(16000).process(signal), signal)
+    assert StreamingResampler(44100).bank is StreamingResampler(44100).bank
+    assert polyphase_filter(160, 441).shape[0] == 160
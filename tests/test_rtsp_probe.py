@@ -0,0 +1,39 @@
+import sys
+import json
+import types
+import importlib
+import subprocess
+
+try:
+    importlib.import_module('sounddevice')
+except OSError:
+    # PortAudio absent : un module vide suffit, le micro n'est pas utilisé ici
+    sys.modules['sounddevice'] = types.ModuleType('sounddevice')
+
+import ingest_workers
+from ingest_workers import probe_rtsp_sample_rate
+
+
+def test_probe_reads_native_rate(monkeypatch):
+    """ffprobe est lancé avec un timeout réseau et un timeout de processus"""
+    calls = []
+
+    def fake_run(command, **kwargs):
+        calls.append((command, kwargs))
+        stdout = json.dumps({'streams': [{'sample_rate': '48000'}]}).encode()
+        return subprocess.CompletedProcess(command, 0, stdout=stdout, stderr=b'')
+
+    monkeypatch.setattr(ingest_workers.subprocess, 'run', fake_run)
+    assert probe_rtsp_sample_rate('rtsp://camera/stream', timeout=2.0) == 48000
+    command, kwargs = calls[0]
+    assert command[command.index('-rw_timeout') + 1] == '2000000'
+    assert kwargs['timeout'] == 2.0
+
+
+def test_probe_timeout_returns_none(monkeypatch):
+    """Un flux qui ne répond pas n'empêche pas de retomber sur le taux configuré"""
+    def fake_run(command, timeout, **kwargs):
+        raise subprocess.TimeoutExpired(command, timeout)
+
+    monkeypatch.setattr(ingest_workers.subprocess, 'run', fake_run)
+    assert probe_rtsp_sample_rate('rtsp://camera/stream', timeout=0.1) is None
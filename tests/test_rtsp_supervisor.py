@@ -0,0 +1,133 @@
+import sys
+import time
+import shutil
+import wave
+import subprocess
+import numpy as np
+import pytest
+import rtsp_supervisor
+from rtsp_supervisor import RtspSupervisor, ffmpeg_pcm_command
+
+# Remplaçant de ffmpeg : écrit `blocks` blocs de 100 ms de PCM float32 puis se termine,
+# ou reste bloqué si `hang` est vrai
+STAND_IN = """
+import sys, time
+blocks, hang = int(sys.argv[1]), sys.argv[2] == '1'
+block = b'\\x00\\x00\\x80\\x3f' * 1600
+for _ in range(blocks):
+    sys.stdout.buffer.write(block)
+    sys.stdout.buffer.flush()
+    time.sleep(0.01)
+while hang:
+    time.sleep(1)
+"""
+
+def stand_in(blocks, hang=False):
+    return lambda url, sample_rate: [sys.executable, '-c', STAND_IN, str(blocks), '1' if hang else '0']
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+@pytest.fixture
+def supervisor():
+    supervisor = RtspSupervisor(check_interval=0.05)
+    yield supervisor
+    supervisor.stop()
+
+def test_restart_after_end_of_stream(supervisor):
+    """Un flux terminé (caméra redémarrée) est relancé et l'audio reprend."""
+    blocks = []
+    stream = supervisor.add_stream('cam', 'rtsp://stand-in', 16000, lambda block: blocks.append(block.copy()),
+                                   command=stand_in(3), backoff_initial=0.05)
+    assert wait_for(lambda: stream.restarts >= 2 and len(blocks) >= 9)
+    assert all(len(block) == 1600 and block[0] == 1.0 for block in blocks)
+    stats = supervisor.get_stream_stats('cam')
+    assert stats['bytes_total'] >= 9 * 6400
+    assert stats['last_error'].startswith('ffmpeg terminé')
+
+def test_blocks_are_views_on_preallocated_ring(supervisor):
+    """Les blocs livrés sont des vues sur l'anneau du flux, réutilisées circulairement."""
+    addresses = []
+    stream = supervisor.add_stream('cam', 'rtsp://stand-in', 16000,
+                                   lambda block: addresses.append(block.__array_interface__['data'][0]),
+                                   command=stand_in(20), backoff_initial=10.0)
+    assert wait_for(lambda: len(addresses) >= 20)
+    ring_addresses = [block.__array_interface__['data'][0] for block in stream.blocks]
+    assert addresses[:len(ring_addresses)] == ring_addresses
+    assert set(addresses) == set(ring_addresses)
+
+def test_stall_detection(supervisor):
+    """Un processus qui ne produit plus d'audio est tué puis relancé."""
+    blocks = []
+    stream = supervisor.add_stream('cam', 'rtsp://stand-in', 16000, blocks.append,
+                                   command=stand_in(1, hang=True), stall_timeout=0.3, backoff_initial=0.05)
+    assert wait_for(lambda: stream.stalls >= 1 and stream.restarts >= 1)
+    assert len(blocks) >= 1
+    supervisor.remove_stream('cam')
+    assert stream.state == 'stopped' and stream.process is None
+    assert supervisor.get_stats() == []
+
+def test_backoff_grows(supervisor):
+    """Sans audio, le délai de relance double jusqu'au maximum."""
+    stream = supervisor.add_stream('cam', 'rtsp://stand-in', 16000, lambda block: None,
+                                   command=lambda url, rate: ['/nonexistent/ffmpeg'],
+                                   backoff_initial=0.02, backoff_max=0.08)
+    assert wait_for(lambda: stream.restarts >= 4)
+    assert stream.failures >= 4
+    assert stream.get_stats()['state'] in ('backoff', 'connecting')
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg absent")
+def test_ffmpeg_file_stand_in(supervisor, tmp_path):
+    """Avec un vrai ffmpeg lisant un fichier local, chaque fin de fichier entraîne une relance."""
+    source = tmp_path / 'tone.wav'
+    subprocess.run(['ffmpeg', '-loglevel', 'error', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=0.5',
+                    str(source)], check=True)
+    blocks = []
+    stream = supervisor.add_stream('file', str(source), 16000, lambda block: blocks.append(block.copy()),
+                                   backoff_initial=0.05)
+    assert wait_for(lambda: stream.restarts >= 1)
+    audio = np.concatenate(blocks)
+    assert len(audio) >= 8000 and np.abs(audio).max() > 0.05
+
+def test_ffmpeg_command():
+    """ffmpeg décode en PCM float32 mono au taux demandé, sur stdout."""
+    command = ffmpeg_pcm_command('rtsp://camera/stream', 48000)
+    assert command[0] == 'ffmpeg' and command[-1] == 'pipe:'
+    assert ['-f', 'f32le'] == command[command.index('-f'):command.index('-f') + 2]
+    assert '48000' in command and 'rtsp://camera/stream' in command
+
+def test_unknown_backend(supervisor):
+    """Un backend inconnu est refusé avant de démarrer quoi que ce soit."""
+    with pytest.raises(ValueError):
+        supervisor.add_stream('cam', 'rtsp://camera', 16000, lambda block: None, backend='gstreamer')
+    assert supervisor.get_stats() == []
+
+@pytest.mark.skipif(rtsp_supervisor.av is not None, reason="PyAV installé")
+def test_pyav_backend_requires_pyav(supervisor):
+    """Sans PyAV, le backend 'pyav' échoue avec un message explicite."""
+    with pytest.raises(RuntimeError, match='PyAV'):
+        supervisor.add_stream('cam', 'rtsp://camera', 16000, lambda block: None, backend='pyav')
+
+@pytest.mark.skipif(rtsp_supervisor.av is None, reason="PyAV absent")
+def test_pyav_decodes_to_mono_16k(supervisor, tmp_path):
+    """PyAV décode une source stéréo 48 kHz en float32 mono 16 kHz, relancée en fin de fichier."""
+    source = tmp_path / 'tone.wav'
+    t = np.arange(24000) / 48000
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+    with wave.open(str(source), 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(48000)
+        f.writeframes(np.repeat(tone, 2).tobytes())
+
+    blocks = []
+    stream = supervisor.add_stream('file', str(source), 16000, lambda block: blocks.append(block.copy()),
+                                   backend='pyav', backoff_initial=0.05)
+    assert wait_for(lambda: stream.restarts >= 1)
+    audio = np.concatenate(blocks)
+    assert audio.dtype == np.float32 and len(audio) >= 7000
+    assert 0.4 < np.abs(audio).max() < 0.6
+    assert supervisor.get_stream_stats('file')['backend'] == 'pyav'
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+from settings_store import SettingsStore
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+def test_save_is_atomic_and_kept_in_memory(tmp_path):
+    """Une écriture remplace le fichier, garde une sauvegarde et n'entraîne pas de relecture."""
+    path = tmp_path / 'settings.json'
+    write_json(path, {'global': {'threshold': '0.5'}})
+    store = SettingsStore(path)
+    assert store.get() == {'global': {'threshold': '0.5'}}
+
+    store.update({'global': {'threshold': '0.8'}})
+    with open(path) as f:
+        assert json.load(f) == {'global': {'threshold': '0.8'}}
+    with open(str(path) + '.backup') as f:
+        assert json.load(f) == {'global': {'threshold': '0.5'}}
+    assert not os.path.exists(str(path) + '.tmp')
+    assert store.check_for_changes() is False
+    assert store.get_stats()['reads'] == 1
+
+def test_change_events_by_section(tmp_path):
+    """Les abonnés ne reçoivent que les modifications des sections suivies."""
+    store = SettingsStore(tmp_path / 'settings.json')
+    all_changes, vban_changes = [], []
+    store.subscribe(all_changes.append)
+    store.subscribe(vban_changes.append, sections=('saved_vban_sources',))
+
+    store.update({'global': {'threshold': '0.6'}})
+    store.update({'global': {'threshold': '0.6'}})  # Aucun changement : pas d'événement
+    store.update({'saved_vban_sources': [{'ip': '10.0.0.1'}]})
+
+    assert [change.sections for change in all_changes] == [{'global'}, {'saved_vban_sources'}]
+    assert len(vban_changes) == 1 and vban_changes[0].origin == 'api'
+    assert vban_changes[0].settings['global'] == {'threshold': '0.6'}
+
+def test_snapshot_is_independent(tmp_path):
+    """snapshot() peut être modifié sans altérer les paramètres partagés."""
+    store = SettingsStore(tmp_path / 'settings.json')
+    store.update({'rtsp_sources': []})
+    snapshot = store.snapshot()
+    snapshot['rtsp_sources'].append({'url': 'rtsp://camera'})
+    assert store.get()['rtsp_sources'] == []
+
+def test_external_edit_detected(tmp_path):
+    """Une modification externe du fichier est rechargée et publiée ; un JSON invalide est ignoré."""
+    path = tmp_path / 'settings.json'
+    write_json(path, {'global': {'delay': '1.0'}})
+    store = SettingsStore(path)
+    changes = []
+    store.subscribe(changes.append)
+
+    time.sleep(0.01)
+    write_json(path, {'global': {'delay': '2.0'}})
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert store.check_for_changes() is True
+    assert store.get()['global']['delay'] == '2.0'
+    assert changes[0].origin == 'file' and changes[0].previous['global']['delay'] == '1.0'
+
+    with open(path, 'w') as f:
+        f.write('{invalide')
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2 * 10 ** 9))
+    assert store.check_for_changes() is False
+    assert store.get()['global']['delay'] == '2.0'
@@ -0,0 +1,60 @@
+import time
+import queue
+import threading
+import numpy as np
+import pytest
+import inference_engine
+import inference_pool
+from shared_audio_ring import SharedAudioRing
+
+def test_attach_shares_samples():
+    """Un lecteur attaché par nom voit les échantillons de l'écrivain."""
+    ring = SharedAudioRing(16)
+    reader = SharedAudioRing.attach(ring.name, ring.capacity)
+    try:
+        ring.write(np.linspace(0, 1, 10, dtype=np.float32))
+        assert reader.write_count == 10
+        np.testing.assert_allclose(reader.view(2, 5), np.linspace(0, 1, 10, dtype=np.float32)[2:7])
+    finally:
+        reader.close()
+        ring.close()
+
+def test_close_with_exported_buffer():
+    """Un export encore tenu sur le segment n'empêche pas close() : le segment est supprimé, le mapping gardé pour l'export."""
+    ring = SharedAudioRing(16)
+    ring.write(np.ones(4, dtype=np.float32))
+    export = ring.shm.buf[:8]
+    ring.close()
+    assert ring.storage is None
+    with pytest.raises(FileNotFoundError):
+        SharedAudioRing.attach(ring.name, 16)
+    assert export.tobytes() == np.array([4], dtype=np.int64).tobytes()
+    export.release()
+    ring.shm.close()
+
+@pytest.mark.skipif(inference_engine.TFLiteInterpreter is None, reason="tflite_runtime et tensorflow absents")
+def test_worker_closes_released_ring(monkeypatch):
+    """Le message 'release' du pool fait fermer au worker sa copie attachée du buffer."""
+    closed = []
+    original = SharedAudioRing.close
+    monkeypatch.setattr(SharedAudioRing, 'close', lambda self: (closed.append(self.name), original(self)))
+    ring = SharedAudioRing(32000)
+    ring.write(np.zeros(16000, dtype=np.float32))
+    requests, results = queue.Queue(), queue.Queue()
+    worker = threading.Thread(target=inference_pool._worker_main,
+                              args=(0, 'yamnet.tflite', 16000, 4, requests, results, 'tflite'))
+    worker.start()
+    try:
+        assert results.get(timeout=30)[0] == 'ready'
+        requests.put((0, ring.name, ring.capacity, 0))
+        requests.put(('release', ring.name))
+        kind, _, request_id, scores = results.get(timeout=30)
+        assert kind == 'result' and request_id == 0 and scores is not None
+        deadline = time.time() + 5
+        while ring.name not in closed and time.time() < deadline:
+            time.sleep(0.01)
+        assert closed == [ring.name]
+    finally:
+        requests.put(None)
+        worker.join(timeout=10)
+        ring.close()
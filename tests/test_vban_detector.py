@@ -0,0 +1,127 @@
+import time
+import socket
+import numpy as np
+import pytest
+from vban_detector_new import VBANDetector, build_admission_index, vban_source_enabled
+from settings_store import SettingsStore
+from test_vban_receiver import make_packet
+
+@pytest.fixture
+def detector(tmp_path):
+    detector = VBANDetector(port=0, settings_store=SettingsStore(tmp_path / 'settings.json'))
+    detector.start_listening()
+    yield detector
+    detector.cleanup()
+
+def send_stream(sock, address, name, value, seconds=1.0, first_frame=0):
+    """Envoie un flux 16 kHz mono constant de la durée demandée."""
+    for frame in range(first_frame, first_frame + int(16000 * seconds) // 256):
+        sock.sendto(make_packet(name, np.full(256, value), sr_index=8, frame=frame), address)
+        time.sleep(0.0002)
+
+def test_streams_are_demultiplexed(detector):
+    """Deux flux sur le même port arrivent séparément à leurs abonnés."""
+    address = ('127.0.0.1', detector._socket.getsockname()[1])
+    received = {'A': [], 'B': []}
+    detector.subscribe('127.0.0.1', 'A', lambda chunk, timestamp: received['A'].append(chunk.copy()))
+    detector.subscribe('127.0.0.1', 'B', lambda chunk, timestamp: received['B'].append(chunk.copy()))
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for first_frame in (0, 37):
+        send_stream(sock, address, 'A', 8192, seconds=0.6, first_frame=first_frame)
+        send_stream(sock, address, 'B', -16384, seconds=0.6, first_frame=first_frame)
+    sock.close()
+
+    deadline = time.time() + 2.0
+    while (not received['A'] or not received['B']) and time.time() < deadline:
+        time.sleep(0.05)
+    assert len(received['A']) == 1 and len(received['B']) == 1
+    np.testing.assert_allclose(received['A'][0], 0.25)
+    np.testing.assert_allclose(received['B'][0], -0.5)
+    assert sorted(source['name'] for source in detector.get_sources()) == ['A', 'B']
+
+def test_unsubscribed_stream_is_not_decoded(detector):
+    """Un flux sans abonné est suivi mais son audio n'est pas décodé."""
+    address = ('127.0.0.1', detector._socket.getsockname()[1])
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    send_stream(sock, address, 'Idle', 1000, seconds=0.1)
+    sock.close()
+
+    deadline = time.time() + 1.0
+    while not detector.get_sources() and time.time() < deadline:
+        time.sleep(0.05)
+    stream = next(iter(detector._streams.values()))
+    assert stream.name == 'Idle'
+    assert stream.buffer.write_count == 0
+
+def test_active_sources_updated_in_place(detector):
+    """L'entrée d'une source active est mise à jour une fois par lot, sans être recréée."""
+    address = ('127.0.0.1', detector._socket.getsockname()[1])
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    send_stream(sock, address, 'Desk', 1000, seconds=0.05)
+    deadline = time.time() + 1.0
+    while '127.0.0.1' not in detector.sources and time.time() < deadline:
+        time.sleep(0.02)
+    entry = detector.sources['127.0.0.1']
+    first_seen = entry['last_seen']
+    time.sleep(0.05)
+    send_stream(sock, address, 'Desk', 1000, seconds=0.05, first_frame=3)
+    sock.close()
+    deadline = time.time() + 1.0
+    while entry['last_seen'] == first_seen and time.time() < deadline:
+        time.sleep(0.02)
+    assert detector.sources['127.0.0.1'] is entry and entry['last_seen'] > first_seen
+    assert detector.get_active_sources() == {'127.0.0.1': {'last_seen': entry['last_seen'], 'name': 'Desk',
+                                                          'sample_rate': 16000, 'channels': 1}}
+
+def test_network_counters(detector):
+    """Les paquets perdus et dupliqués d'un flux sont comptés."""
+    address = ('127.0.0.1', detector._socket.getsockname()[1])
+    detector.subscribe('127.0.0.1', 'Lossy', lambda chunk, timestamp: None)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for frame in [0, 1, 3, 4, 4, 5, 6, 7, 8]:
+        sock.sendto(make_packet('Lossy', np.full(256, 100), sr_index=8, frame=frame), address)
+        time.sleep(0.001)
+    sock.close()
+
+    deadline = time.time() + 1.0
+    while not detector.get_stream_stats('127.0.0.1', 'Lossy') and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.1)
+    stats = detector.get_stream_stats('127.0.0.1', 'Lossy')
+    assert stats['lost'] == 1
+    assert stats['duplicates'] == 1
+
+def test_admission_index():
+    """Seules les sources activées (ou sans 'enabled') sont admises ; sans liste, tout est admis."""
+    settings = {'saved_vban_sources': [
+        {'ip': '10.0.0.1', 'stream_name': 'Mic', 'enabled': True},
+        {'ip': '10.0.0.2', 'stream_name': 'Mic', 'enabled': False},
+        {'ip': '10.0.0.3', 'stream_name': 'Line'},
+        {'ip': '10.0.0.4', 'name': 'Legacy', 'enabled': True},
+    ]}
+    assert build_admission_index(settings) == frozenset({('10.0.0.1', 'Mic'), ('10.0.0.3', 'Line'),
+                                                         ('10.0.0.4', 'Legacy')})
+    assert build_admission_index({}) is None
+    assert build_admission_index({'saved_vban_sources': []}) == frozenset()
+
+def test_entry_without_enabled_is_started_and_admitted():
+    """Une entrée sans 'enabled' est démarrée par collect_sources : ses paquets doivent être admis."""
+    source = {'ip': '10.0.0.5', 'stream_name': 'Desk'}
+    assert vban_source_enabled(source)
+    assert build_admission_index({'saved_vban_sources': [source]}) == frozenset({('10.0.0.5', 'Desk')})
+    assert not vban_source_enabled({'ip': '10.0.0.5', 'enabled': False})
+
+def test_admission_index_follows_settings(detector):
+    """L'index n'est recompilé que lorsque les sources VBAN sauvegardées changent."""
+    store = detector.settings_store
+    assert detector._admission is None
+    store.update({'saved_vban_sources': [{'ip': '10.0.0.1', 'stream_name': 'Mic', 'enabled': True}]})
+    index = detector._admission
+    assert index == frozenset({('10.0.0.1', 'Mic')})
+
+    store.update({'global': {'threshold': '0.7'}})
+    assert detector._admission is index
+
+    store.update({'saved_vban_sources': [{'ip': '10.0.0.1', 'stream_name': 'Mic', 'enabled': False}]})
+    assert detector._admission == frozenset()
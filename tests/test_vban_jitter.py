@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from vban_jitter import VBANJitterBuffer, FRAME_COUNTER_MODULO
+
+def packet(value, length=4):
+    return np.full(length, value, dtype=np.float32)
+
+def values(blocks):
+    return [float(v) for block in blocks for v in block[::4]]
+
+def test_in_order_passthrough():
+    """Les paquets dans l'ordre sont livrés immédiatement, sans copie."""
+    jitter = VBANJitterBuffer(depth=3)
+    samples = packet(1)
+    assert jitter.push(10, samples)[0] is samples
+    assert values(jitter.push(11, packet(2))) == [2]
+    assert jitter.get_stats()['lost'] == 0
+
+def test_reordering_within_depth():
+    """Un paquet en retard mais dans la profondeur est remis à sa place."""
+    jitter = VBANJitterBuffer(depth=3)
+    jitter.push(0, packet(0))
+    assert jitter.push(2, packet(2)) == []
+    assert values(jitter.push(1, packet(1))) == [1, 2]
+    stats = jitter.get_stats()
+    assert stats['reordered'] == 1 and stats['lost'] == 0
+
+def test_loss_is_concealed_then_late_packet_dropped():
+    """Un trou plus ancien que la profondeur est comblé ; le paquet arrivé ensuite est compté en retard."""
+    jitter = VBANJitterBuffer(depth=2, concealment='interpolate')
+    jitter.push(0, packet(0.0))
+    assert jitter.push(2, packet(1.0)) == []
+    blocks = jitter.push(3, packet(1.0))
+    assert len(blocks) == 3
+    # Rampe entre le dernier échantillon livré (0) et le premier du paquet suivant (1)
+    assert np.all(np.diff(blocks[0]) > 0) and 0 < blocks[0][0] < blocks[0][-1] < 1
+    assert jitter.push(1, packet(5.0)) == []
+    stats = jitter.get_stats()
+    assert stats['lost'] == 1 and stats['late'] == 1
+
+def test_duplicates_and_silence():
+    """Les doublons sont ignorés ; le masquage par silence produit des zéros."""
+    jitter = VBANJitterBuffer(depth=0, concealment='silence')
+    jitter.push(5, packet(1))
+    assert jitter.push(5, packet(1)) == []
+    blocks = jitter.push(8, packet(1))
+    np.testing.assert_array_equal(blocks[0], np.zeros(8))
+    assert jitter.get_stats()['duplicates'] == 1
+    assert jitter.get_stats()['lost'] == 2
+
+def test_counter_wraparound_and_reset():
+    """Le compteur 32 bits reboucle sans perte ; un saut important resynchronise le flux."""
+    jitter = VBANJitterBuffer(depth=2)
+    jitter.push(FRAME_COUNTER_MODULO - 1, packet(1))
+    assert values(jitter.push(0, packet(2))) == [2]
+    assert values(jitter.push(500000, packet(3))) == [3]
+    stats = jitter.get_stats()
+    assert stats['lost'] == 0 and stats['resets'] == 1
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        VBANJitterBuffer(concealment='repeat')
@@ -161,3 +161,23 @@ def test_classification_callback(processor, mock_socketio):
     processor.last_clap_time = 0
     processor._classification_callback(mock_result, 1234567890)
     assert mock_socketio.emit.call_count == 2
+
+def test_one_second_chunks_yield_every_hop():
+    """Un bloc VBAN d'une seconde produit toutes les fenêtres au pas du recouvrement, sans en perdre."""
+    with patch('vban_processor.WebhookManager'), patch.object(VBANAudioProcessor, 'initialize_classifier'):
+        processor = VBANAudioProcessor(ip='192.168.1.10', port=6980, stream_name='test_stream')
+    windows = []
+    with patch.object(processor, '_classify_window',
+                      side_effect=lambda timestamp: windows.append((processor._analysis_buffer[0, 0], timestamp))):
+        samples = np.arange(5 * 16000) % 32768
+        for index in range(5):
+            chunk = samples[index * 16000:(index + 1) * 16000].astype(np.int16)
+            processor.audio_callback(chunk.tobytes(), float(index + 1))
+
+    # Pas de 3120 échantillons : fenêtres de 0 à 64400 dans 80000 échantillons
+    assert len(windows) == 21
+    starts = [round(first * 32768) for first, _ in windows]
+    assert starts == [3120 * i % 32768 for i in range(21)]
+    np.testing.assert_allclose([timestamp for _, timestamp in windows], [(3120 * i + 15600) / 16000 for i in range(21)])
+    stats = processor.get_inference_stats()
+    assert stats['windows_submitted'] == 21 and stats['windows_lost'] == 0
@@ -0,0 +1,108 @@
+import socket
+import time
+import struct
+import numpy as np
+import pytest
+from vban_receiver import VBANReceiver, VBAN_HEADER_SIZE, decode_packet
+
+def make_packet(name, samples, sr_index=3, channels=1, frame=0, protocol=0):
+    """Construit un paquet audio VBAN int16."""
+    header = b'VBAN' + struct.pack('<BBBB16sI', sr_index | protocol, len(samples) // channels - 1,
+                                   channels - 1, 1, name.encode(), frame)
+    return header + np.asarray(samples, dtype='<i2').tobytes()
+
+@pytest.fixture
+def sockets():
+    receiver_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver_socket.bind(('127.0.0.1', 0))
+    receiver_socket.settimeout(0.5)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    yield sender, receiver_socket
+    sender.close()
+    receiver_socket.close()
+
+def test_batch_headers_and_payloads(sockets):
+    """Les paquets en attente sont lus en un lot ; en-têtes et charges utiles sont décodés sans copie."""
+    sender, receiver_socket = sockets
+    receiver = VBANReceiver(receiver_socket, batch_size=8)
+    address = receiver_socket.getsockname()
+    for frame in range(5):
+        sender.sendto(make_packet(f"Stream{frame % 2}", np.arange(frame, frame + 512), channels=2, frame=frame), address)
+    sender.sendto(b'not a vban packet' * 3, address)
+
+    assert receiver.receive() == 6
+
+    headers = receiver.headers()
+    assert list(headers['frame'][:5]) == [0, 1, 2, 3, 4]
+    assert headers['name'][1] == b'Stream1'
+    assert list(headers['nbc'][:5] + 1) == [2] * 5
+    assert list(receiver.valid_audio()) == [True] * 5 + [False]
+
+    payload = receiver.payload(3)
+    np.testing.assert_array_equal(payload, np.arange(3, 515))
+    assert np.shares_memory(payload, receiver.slots)
+    assert receiver.get_stats()['rejected'] == 1
+
+def encode_samples(signal, data_type):
+    """Encode un signal (trames, canaux) dans un format VBAN ; retourne le paquet uint8."""
+    if data_type == 0:
+        raw = np.clip(np.round(signal * 128 + 128), 0, 255).astype('u1').tobytes()
+    elif data_type == 1:
+        raw = np.round(signal * 32767).astype('<i2').tobytes()
+    elif data_type == 2:
+        wide = np.round(signal * (2 ** 23 - 1)).astype('<i4').reshape(-1)
+        raw = wide.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    elif data_type == 3:
+        raw = np.round(signal * (2 ** 31 - 1)).astype('<i4').tobytes()
+    else:
+        raw = signal.astype('<f4' if data_type == 4 else '<f8').tobytes()
+    return np.frombuffer(b'\xff' * VBAN_HEADER_SIZE + raw, dtype=np.uint8)
+
+@pytest.mark.parametrize('data_type, tolerance', [(0, 5e-3), (1, 1e-4), (2, 3e-7), (3, 1e-7), (4, 1e-7), (5, 1e-7)])
+@pytest.mark.parametrize('channels', [1, 8])
+def test_decode_formats(data_type, tolerance, channels):
+    """Chaque format est décodé, normalisé et mixé en mono."""
+    signal = np.random.default_rng(data_type).uniform(-0.99, 0.99, (40, channels))
+    packet = encode_samples(signal, data_type)
+    if data_type or channels > 1:
+        # Trame incomplète en fin de paquet : ignorée
+        packet = np.append(packet, np.uint8(7))
+    mono = decode_packet(packet, data_type, channels)
+    assert mono.dtype == np.float32
+    np.testing.assert_allclose(mono, signal.mean(axis=1), atol=tolerance)
+
+def test_unsupported_format_rejected(sockets):
+    """Les paquets 12/10 bits ou compressés sont rejetés."""
+    sender, receiver_socket = sockets
+    receiver = VBANReceiver(receiver_socket)
+    address = receiver_socket.getsockname()
+    for format_bit in (1, 2, 6, 7, 0x11):
+        packet = bytearray(make_packet("Stream", np.zeros(64)))
+        packet[7] = format_bit
+        sender.sendto(bytes(packet), address)
+    time.sleep(0.05)
+
+    assert receiver.receive() == 5
+    assert list(receiver.valid_audio()) == [True, True, False, False, False]
+    assert len(receiver.packet(0)) == VBAN_HEADER_SIZE + 128
+
+def test_timeout(sockets):
+    """Sans paquet, receive() lève socket.timeout après le timeout du socket."""
+    _, receiver_socket = sockets
+    receiver_socket.settimeout(0.05)
+    receiver = VBANReceiver(receiver_socket)
+    with pytest.raises(socket.timeout):
+        receiver.receive()
+
+def test_shutdown_socket_does_not_spin(sockets):
+    """Un socket arrêté (signalé lisible sans paquet) fait lever socket.timeout au lieu de boucler."""
+    _, receiver_socket = sockets
+    receiver = VBANReceiver(receiver_socket)
+    try:
+        receiver_socket.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # UDP non connecté : l'arrêt de la lecture est appliqué malgré l'erreur
+    start = time.time()
+    with pytest.raises(socket.timeout):
+        receiver.receive()
+    assert time.time() - start < 0.5
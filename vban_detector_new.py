@@ -1,35 +1,111 @@
 import socket
-import struct
 import time
 from collections import defaultdict
 import numpy as np
-import sounddevice as sd
-import scipy.signal
-import collections
 import threading
 import logging
-import json
+from circular_buffer import AudioRing
+from resampler import StreamingResampler
+from vban_receiver import VBANReceiver, VBAN_SAMPLE_RATES, VBAN_DATATYPE_MASK, decode_packet
+from vban_jitter import VBANJitterBuffer
+from settings_store import get_settings_store
+
+class VBANStream:
+    """
+    État d'un flux VBAN, identifié par (ip, nom du flux).
+    Chaque flux a son propre buffer et son propre rééchantillonneur : deux
+    émetteurs ne sont jamais mélangés.
+    """
+
+    def __init__(self, ip, name, port, sample_rate, channels, target_sample_rate, subscribers,
+                 jitter_depth=4, concealment='interpolate'):
+        self.ip = ip
+        self.name = name
+        self.port = port
+        self.target_sample_rate = target_sample_rate
+        self.subscribers = subscribers  # Liste partagée avec VBANDetector._subscriptions
+        self.last_seen = 0.0
+        self.packets = 0
+        # Buffer circulaire préalloué : les blocs d'une seconde en sont extraits sans copie
+        self.buffer = AudioRing(2 * target_sample_rate)
+        # Remet les paquets dans l'ordre du compteur de trames et comble les pertes
+        self.jitter = VBANJitterBuffer(jitter_depth, concealment)
+        self.sample_rate = None
+        self.channels = None
+        self.data_type = 1  # INT16 tant que l'émetteur n'a rien annoncé
+        self.resampler = None
+        self.key = (ip, name)  # Clé de l'index d'admission
+        self.configure(sample_rate, channels)
+
+    def configure(self, sample_rate, channels, data_type=1):
+        """Adapte le flux à un changement de format annoncé par l'émetteur"""
+        if sample_rate == self.sample_rate and channels == self.channels and data_type == self.data_type:
+            return
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.data_type = data_type
+        self.resampler = StreamingResampler(sample_rate, self.target_sample_rate)
+        self.buffer.clear()
+        self.jitter.reset()
+
+
+def vban_source_enabled(source):
+    """Indique si une source VBAN sauvegardée est activée (une entrée sans 'enabled' l'est)"""
+    return bool(source.get('enabled', True))
+
+
+def vban_stream_name(source):
+    """Nom du flux d'une source VBAN sauvegardée (les anciennes entrées n'ont que 'name')"""
+    return source.get('stream_name') or source.get('name', '')
+
+
+def build_admission_index(settings):
+    """
+    Compile la liste des sources VBAN sauvegardées en index d'admission.
+
+    Args:
+        settings (dict): Paramètres chargés depuis settings.json
+
+    Returns:
+        frozenset: Clés (ip, nom du flux) des sources activées, ou None si
+        aucune liste n'est configurée (tous les flux sont alors admis)
+    """
+    if not settings or 'saved_vban_sources' not in settings:
+        return None
+    # Mêmes règles que classify.collect_sources : un flux démarré n'est jamais refusé
+    return frozenset(
+        (source['ip'], vban_stream_name(source))
+        for source in settings['saved_vban_sources']
+        if vban_source_enabled(source)
+    )
+
 
 class VBANDetector:
-    def __init__(self, port=6980):
+    def __init__(self, port=6980, jitter_depth=4, concealment='interpolate', settings_store=None):
         self.port = port
+        # Paramètres en mémoire ; l'index d'admission suit leurs modifications
+        self.settings_store = settings_store if settings_store is not None else get_settings_store()
+        self.jitter_depth = jitter_depth  # Trames retenues pour réordonner les paquets
+        self.concealment = concealment  # Remplacement des paquets perdus : 'silence' ou 'interpolate'
         self.sources = defaultdict(lambda: {'last_seen': 0, 'name': '', 'sample_rate': 0, 'channels': 0})
         self.running = False
         self._socket = None
+        self._receiver = None
         self.audio_callback = None
+        self.audio_callbacks = []  # Callbacks audio additionnels (un par source de détection)
         self.source_callback = None
         self.target_sample_rate = 16000  # Taux d'échantillonnage cible
         
-        # Buffer circulaire avec une capacité de 1 seconde au taux d'échantillonnage cible
-        self.buffer = collections.deque(maxlen=self.target_sample_rate)
+        # Flux par (ip, champ nom brut de l'en-tête) pour un aiguillage sans décodage du nom
+        self._streams = {}
+        # Abonnés par (ip, nom du flux), y compris pour des flux pas encore reçus
+        self._subscriptions = {}
         
         self.last_timestamp = 0
         self.stream = None
         self._lock = threading.Lock()  # Verrou pour la thread-safety
-        self._settings_lock = threading.Lock()  # Verrou pour les paramètres
-        self._settings_cache = None
-        self._last_settings_load = 0
-        self._settings_cache_duration = 5  # Durée du cache en secondes
+        # Index d'admission (ip, nom) reconstruit seulement quand les paramètres changent
+        self._admission = None
         
     def start_listening(self):
         """Démarre l'écoute des flux VBAN"""
@@ -40,11 +116,17 @@ class VBANDetector:
                 pass
             
         self.running = True
+        self._admission = build_admission_index(self.settings_store.get())
+        self.settings_store.unsubscribe(self._on_settings_changed)
+        self.settings_store.subscribe(self._on_settings_changed, sections=('saved_vban_sources',))
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Buffer de réception large pour absorber les rafales de paquets (plafonné par le système)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
         self._socket.settimeout(0.5)
         logging.info(f"Démarrage de l'écoute VBAN sur le port {self.port}")
         self._socket.bind(('0.0.0.0', self.port))
+        self._receiver = VBANReceiver(self._socket)
         
         # Démarrer l'écoute dans un thread séparé
         self._listen_thread = threading.Thread(target=self._listen_loop)
@@ -55,173 +137,216 @@ class VBANDetector:
         """Boucle d'écoute des flux VBAN"""
         logging.info("Thread d'écoute VBAN démarré")
         logged_sources = set()
+        receiver = self._receiver
         
         while self.running:
             try:
-                data, addr = self._socket.recvfrom(2048)
+                count = receiver.receive()
+            except socket.timeout:
+                self._remove_inactive_sources()
+                continue
+            except (OSError, ValueError) as e:
+                if not self.running:
+                    break  # Socket fermé par stop_listening
+                logging.error(f"Erreur de réception VBAN: {e}")
+                time.sleep(0.1)
+                continue
+            if not count:
+                continue
+            
+            # En-têtes du lot lus en une fois
+            valid = receiver.valid_audio()
+            headers = receiver.headers()
+            sample_rates = VBAN_SAMPLE_RATES[headers['sr'] & 0x1F]
+            channel_counts = headers['nbc'] + 1
+            data_types = headers['bit'] & VBAN_DATATYPE_MASK
+            admission = self._admission
+            now = time.time()  # Un horodatage par lot
+            seen = set()
+            
+            for index in np.flatnonzero(valid):
+                addr = receiver.addrs[index]
+                stream = self._streams.get((addr[0], headers['name'][index]))
+                if stream is None:
+                    stream = self._create_stream(addr, headers['name'][index], logged_sources)
+                stream.configure(int(sample_rates[index]), int(channel_counts[index]), int(data_types[index]))
+                stream.last_seen = now
+                stream.packets += 1
+                seen.add(stream)
                 
-                # Vérifier que le paquet est assez grand pour contenir l'en-tête VBAN (28 bytes)
-                if len(data) < 28:
-                    logging.warning(f"Paquet trop petit ({len(data)} bytes), ignoré")
+                # Ne décoder que les flux écoutés
+                if not (stream.subscribers or self.audio_callbacks or self.audio_callback):
+                    continue
+                
+                # Ignorer les sources désactivées dans settings.json
+                if admission is not None and stream.key not in admission:
                     continue
-                    
-                source = self._parse_vban_packet(data, addr, logged_sources)
-                if source:
-                    # Vérifier si la source est activée dans settings.json
-                    settings = self._load_settings()
-                    if settings and 'saved_vban_sources' in settings:
-                        source_enabled = False
-                        for saved_source in settings['saved_vban_sources']:
-                            if (saved_source['ip'] == source.ip and 
-                                saved_source['stream_name'] == source.name and 
-                                saved_source.get('enabled', False)):
-                                source_enabled = True
-                                break
-                        
-                        if not source_enabled:
-                            continue  # Ignorer les sources désactivées
-                            
-                    try:
-                        # Calculer le nombre d'échantillons complets disponibles
-                        audio_bytes = data[28:]
-                        num_samples = len(audio_bytes) // 2  # 2 bytes par échantillon int16
-                        
-                        if num_samples == 0:
-                            logging.warning("Pas de données audio dans le paquet")
-                            continue
-                            
-                        # N'utiliser que les bytes correspondant à des échantillons complets
-                        audio_data = np.frombuffer(audio_bytes[:num_samples*2], dtype=np.int16)
-                        
-                        # Convertir en float32 et normaliser entre -1 et 1
-                        audio_data = audio_data.astype(np.float32) / 32768.0
-                        
-                        # Convertir en mono si nécessaire
-                        if source.channels > 1:
-                            # S'assurer que la taille des données est divisible par le nombre de canaux
-                            samples_per_channel = len(audio_data) // source.channels
-                            audio_data = audio_data[:samples_per_channel * source.channels]
-                            audio_data = audio_data.reshape(-1, source.channels)
-                            audio_data = np.mean(audio_data, axis=1)
-                        
-                        # Rééchantillonner uniquement si absolument nécessaire pour YAMNet
-                        if source.sample_rate != self.target_sample_rate:
-                            # Calculer le nombre d'échantillons après rééchantillonnage
-                            target_length = int(len(audio_data) * self.target_sample_rate / source.sample_rate)
-                            if target_length > 0:
-                                audio_data = scipy.signal.resample(audio_data, target_length)
-                        
-                        # Log pour debug
-                        if audio_data.max() > 0.3 or audio_data.min() < -0.3:  # Augmenté le seuil à 0.3
-                            logging.info(f"Son fort détecté sur {addr[0]}, amplitude: min={audio_data.min():.3f}, max={audio_data.max():.3f}")
-                        
-                        # Ajouter au buffer de manière thread-safe
-                        with self._lock:
-                            self.buffer.extend(audio_data)
-                            
-                            # Appeler le callback audio si nous avons assez d'échantillons
-                            if self.audio_callback and len(self.buffer) >= self.target_sample_rate:
-                                audio_chunk = np.array(list(self.buffer)[:self.target_sample_rate])
-                                self.buffer.clear()
-                                current_time = time.time()
-                                self.audio_callback(audio_chunk, current_time)
-                        
-                        # Mettre à jour les informations de la source
-                        self.sources[addr[0]].update({
-                            'last_seen': time.time(),
-                            'name': source.name,
-                            'sample_rate': source.sample_rate,
-                            'channels': source.channels
-                        })
                         
-                        # Appeler le callback source si défini
-                        if self.source_callback:
-                            self.source_callback(self.get_active_sources())
-                            
-                    except Exception as e:
-                        logging.error(f"Erreur lors du traitement des données audio: {str(e)}")
-                        continue
-            except socket.timeout:
-                # Nettoyer les sources inactives (plus de 5 secondes)
+                try:
+                    self._process_stream_packet(stream, receiver.packet(index), headers['frame'][index])
+                except Exception as e:
+                    logging.error(f"Erreur lors du traitement des données audio: {str(e)}")
+                    continue
+
+            # Sources actives : une mise à jour par flux du lot, dans l'entrée existante
+            for stream in seen:
+                info = self.sources[stream.ip]
+                info['last_seen'] = now
+                info['name'] = stream.name
+                info['sample_rate'] = stream.sample_rate
+                info['channels'] = stream.channels
+
+    def _process_stream_packet(self, stream, packet, frame):
+        """Décode un paquet, le remet dans l'ordre du flux et livre les blocs d'une seconde"""
+        # Décodage du format annoncé, normalisation et mixage mono en une passe
+        audio_data = decode_packet(packet, stream.data_type, stream.channels)
+        if len(audio_data) == 0:
+            logging.warning("Pas de données audio dans le paquet")
+            return
+        
+        # Le buffer de gigue retient les paquets en avance et comble les trous
+        for block in stream.jitter.push(frame, audio_data):
+            self._write_stream_block(stream, block)
+
+    def _write_stream_block(self, stream, audio_data):
+        """Rééchantillonne un bloc ordonné du flux et livre les blocs d'une seconde"""
+        # Rééchantillonner pour YAMNet, en conservant l'état du flux entre paquets
+        audio_data = stream.resampler.process(audio_data)
+        if len(audio_data) == 0:
+            return
+        
+        # Log pour debug
+        if audio_data.max() > 0.3 or audio_data.min() < -0.3:  # Augmenté le seuil à 0.3
+            logging.info(f"Son fort détecté sur {stream.ip} ({stream.name}), amplitude: min={audio_data.min():.3f}, max={audio_data.max():.3f}")
+        
+        with self._lock:
+            stream.buffer.write(audio_data)
+            
+            # Appeler les abonnés du flux si nous avons assez d'échantillons
+            if stream.buffer.available() >= self.target_sample_rate:
+                # Vue valide pendant l'appel des callbacks uniquement
+                audio_chunk = stream.buffer.peek(self.target_sample_rate)
+                stream.buffer.consume(self.target_sample_rate)
                 current_time = time.time()
-                inactive = [ip for ip, info in self.sources.items() 
-                          if current_time - info['last_seen'] > 5]
-                for ip in inactive:
-                    del self.sources[ip]
-                    if self.source_callback:
-                        self.source_callback(self.get_active_sources())
-                    
-    def _parse_vban_packet(self, data, addr, logged_sources=None):
-        """Parse un paquet VBAN et retourne les informations de la source"""
-        try:
-            if len(data) >= 28 and data[0:4] == b'VBAN':
-                # Extraire les informations du header VBAN
-                sr_index = data[4] & 0x1F
-                channels = ((data[4] & 0xE0) >> 5) + 1
-                name = self.clean_vban_name(data[8:28])
-                ip = addr[0]
-                port = addr[1]
-                
-                # Convertir l'index de sample rate en Hz
-                sample_rates = {
-                    0: 6000, 1: 12000, 2: 24000, 3: 48000, 4: 96000,
-                    5: 192000, 6: 384000, 7: 8000, 8: 16000, 9: 32000,
-                    10: 64000, 11: 128000, 12: 256000, 13: 512000,
-                    14: 11025, 15: 22050, 16: 44100, 17: 88200,
-                    18: 176400, 19: 352800
-                }
-                sample_rate = sample_rates.get(sr_index, 44100)
-                
-                # Mettre à jour le dictionnaire des sources
-                with self._lock:
-                    self.sources[ip] = {
-                        'last_seen': time.time(),
-                        'name': name,
-                        'sample_rate': sample_rate,
-                        'channels': channels
-                    }
-                
-                # Créer un objet source
-                source = type('VBANSource', (), {
-                    'name': name,
-                    'ip': ip,
-                    'port': port,
-                    'channels': channels,
-                    'sample_rate': sample_rate
-                })
-                
-                # Log si demandé
-                if logged_sources is not None and ip not in logged_sources:
-                    logging.info(f"Source VBAN détectée: {name} ({ip}), {channels} canaux @ {sample_rate}Hz")
-                    logged_sources.add(ip)
-                
-                # Notifier le callback des sources si défini
-                if self.source_callback:
+                for callback in stream.subscribers + self._get_audio_callbacks():
                     try:
-                        self.source_callback(ip, name)
+                        callback(audio_chunk, current_time)
                     except Exception as e:
-                        logging.error(f"Erreur dans le callback des sources: {e}")
-                
-                return source
-                
-        except Exception as e:
-            logging.error(f"Erreur lors du parsing du paquet VBAN: {e}")
-            return None
+                        logging.error(f"Erreur dans le callback audio: {e}")
+        
+        # Appeler le callback source si défini
+        if self.source_callback:
+            self.source_callback(self.get_active_sources())
+
+    def _create_stream(self, addr, raw_name, logged_sources=None):
+        """
+        Crée l'état d'un nouveau flux à partir de l'en-tête de son premier paquet.
+        
+        Args:
+            addr (tuple): Adresse (ip, port) de l'émetteur
+            raw_name (bytes): Champ nom du flux de l'en-tête
+            logged_sources (set, optional): Flux déjà journalisés
+            
+        Returns:
+            VBANStream: État du flux
+        """
+        ip = addr[0]
+        name = self.clean_vban_name(bytes(raw_name))
+        with self._lock:
+            subscribers = self._subscriptions.setdefault((ip, name), [])
+            stream = VBANStream(ip, name, addr[1], None, None, self.target_sample_rate, subscribers,
+                                self.jitter_depth, self.concealment)
+            self._streams[(ip, raw_name)] = stream
+        
+        if logged_sources is not None and (ip, name) not in logged_sources:
+            logging.info(f"Flux VBAN détecté: {name} ({ip})")
+            logged_sources.add((ip, name))
+        return stream
+
+    def subscribe(self, ip, stream_name, callback):
+        """
+        Abonne un callback aux blocs audio d'un seul flux.
+        
+        Args:
+            ip (str): Adresse IP de l'émetteur
+            stream_name (str): Nom du flux VBAN
+            callback (callable): Appelé avec (audio_chunk, timestamp) ; audio_chunk
+                n'est valide que pendant l'appel
+        """
+        with self._lock:
+            subscribers = self._subscriptions.setdefault((ip, stream_name), [])
+            if callback not in subscribers:
+                subscribers.append(callback)
+
+    def get_stream_stats(self, ip, stream_name):
+        """
+        Retourne les compteurs réseau d'un flux (pertes, retards, doublons, réordonnancements).
+
+        Returns:
+            dict: Statistiques du buffer de gigue, None si le flux n'est pas reçu
+        """
+        with self._lock:
+            for stream in self._streams.values():
+                if stream.ip == ip and stream.name == stream_name:
+                    return stream.jitter.get_stats()
+        return None
+
+    def unsubscribe(self, ip, stream_name, callback):
+        """Retire un callback ajouté avec subscribe"""
+        with self._lock:
+            subscribers = self._subscriptions.get((ip, stream_name))
+            if subscribers and callback in subscribers:
+                subscribers.remove(callback)
+
+    def _remove_inactive_sources(self):
+        """Oublie les sources muettes depuis plus de 5 secondes"""
+        current_time = time.time()
+        with self._lock:
+            inactive = [ip for ip, info in self.sources.items() 
+                      if current_time - info['last_seen'] > 5]
+            for ip in inactive:
+                del self.sources[ip]
+            # Les abonnements sont conservés pour le retour du flux
+            for key, stream in list(self._streams.items()):
+                if current_time - stream.last_seen > 5:
+                    del self._streams[key]
+        if inactive and self.source_callback:
+            self.source_callback(self.get_active_sources())
 
     def stop_listening(self):
         """Arrête l'écoute des flux VBAN"""
         self.running = False
+        self.settings_store.unsubscribe(self._on_settings_changed)
         if self._socket:
             self._socket.close()
-            
+
     def get_active_sources(self):
         """Retourne un dictionnaire des sources actives"""
-        return dict(self.sources)
+        # Copie des entrées : le thread d'écoute les modifie en place
+        return {ip: dict(info) for ip, info in list(self.sources.items())}
         
     def set_audio_callback(self, callback):
         """Définit le callback pour les données audio"""
         self.audio_callback = callback
         
+    def add_callback(self, callback):
+        """Ajoute un callback pour les données audio"""
+        with self._lock:
+            if callback not in self.audio_callbacks:
+                self.audio_callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        """Retire un callback ajouté avec add_callback"""
+        with self._lock:
+            if callback in self.audio_callbacks:
+                self.audio_callbacks.remove(callback)
+
+    def _get_audio_callbacks(self):
+        callbacks = list(self.audio_callbacks)
+        if self.audio_callback:
+            callbacks.append(self.audio_callback)
+        return callbacks
+
     def set_source_callback(self, callback):
         """Définit le callback pour les changements de sources"""
         self.source_callback = callback
@@ -252,12 +377,13 @@ class VBANDetector:
     def cleanup(self):
         """Arrête l'écoute et nettoie les ressources"""
         self.running = False
+        self.settings_store.unsubscribe(self._on_settings_changed)
         if self._socket:
             try:
                 self._socket.shutdown(socket.SHUT_RDWR)
-                self._socket.close()
-            except:
-                pass
+            except OSError:
+                pass  # Socket UDP non connecté
+            self._socket.close()
             self._socket = None
         
         # Attendre que le thread d'écoute se termine
@@ -287,41 +413,22 @@ class VBANDetector:
             for ip in inactive:
                 del self.sources[ip]
                 
-            # Retourner les sources actives
-            for ip, info in self.sources.items():
-                if current_time - info['last_seen'] <= timeout:
+            # Retourner les flux actifs (plusieurs flux possibles par IP)
+            for stream in self._streams.values():
+                if current_time - stream.last_seen <= timeout:
                     active_sources.append({
-                        'ip': ip,
-                        'name': info['name'],
-                        'sample_rate': info['sample_rate'],
-                        'channels': info['channels'],
-                        'last_seen': info['last_seen'],
+                        'ip': stream.ip,
+                        'name': stream.name,
+                        'sample_rate': stream.sample_rate,
+                        'channels': stream.channels,
+                        'last_seen': stream.last_seen,
+                        'packets': stream.packets,
+                        'network': stream.jitter.get_stats(),
                         'port': self.port  # Add the port number
                     })
                     
         return active_sources
 
-    def _load_settings(self):
-        """Charge les paramètres de manière thread-safe avec mise en cache"""
-        current_time = time.time()
-        
-        with self._settings_lock:
-            # Utiliser le cache s'il est valide
-            if (self._settings_cache is not None and 
-                current_time - self._last_settings_load < self._settings_cache_duration):
-                return self._settings_cache
-            
-            try:
-                with open('settings.json', 'r') as f:
-                    self._settings_cache = json.load(f)
-                    self._last_settings_load = current_time
-                    return self._settings_cache
-            except FileNotFoundError:
-                self._settings_cache = {}
-                self._last_settings_load = current_time
-                return {}
-            except json.JSONDecodeError:
-                logging.error("Erreur lors de la lecture du fichier settings.json")
-                self._settings_cache = {}
-                self._last_settings_load = current_time
-                return {}
+    def _on_settings_changed(self, change):
+        """Recompile l'index d'admission quand les sources VBAN sauvegardées changent"""
+        self._admission = build_admission_index(change.settings)
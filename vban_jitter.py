@@ -0,0 +1,157 @@
+import collections
+import numpy as np
+
+FRAME_COUNTER_MODULO = 2 ** 32
+RESET_THRESHOLD = 1000  # Écart (en trames) au-delà duquel l'émetteur est considéré redémarré
+CONCEALMENT_MODES = ('silence', 'interpolate')
+
+
+def frame_distance(frame, reference):
+    """Écart signé entre deux compteurs de trames VBAN 32 bits (gère le rebouclage)"""
+    return (frame - reference + FRAME_COUNTER_MODULO // 2) % FRAME_COUNTER_MODULO - FRAME_COUNTER_MODULO // 2
+
+
+class VBANJitterBuffer:
+    """
+    Buffer de gigue d'un flux VBAN, ordonné par compteur de trames.
+
+    Les paquets en avance sont retenus jusqu'à `depth` trames pour laisser aux
+    paquets manquants le temps d'arriver. Passé ce délai, le trou est comblé par
+    du silence ou par une interpolation linéaire entre les paquets voisins. Les
+    paquets perdus, en retard, dupliqués et réordonnés sont comptés.
+    """
+
+    def __init__(self, depth=4, concealment='interpolate'):
+        """
+        Initialise le buffer de gigue.
+
+        Args:
+            depth (int): Nombre de trames d'avance retenues avant de déclarer un trou perdu
+            concealment (str): 'silence' ou 'interpolate'
+        """
+        if concealment not in CONCEALMENT_MODES:
+            raise ValueError(f"Mode de masquage inconnu: {concealment}")
+        self.depth = max(0, int(depth))
+        self.concealment = concealment
+        self.pending = {}  # trame -> échantillons
+        self.next_frame = None
+        self._frame_length = 0
+        self._last_sample = 0.0
+        self._concealed = collections.deque(maxlen=256)  # Trames récemment remplacées
+
+        # Statistiques
+        self.received = 0
+        self.lost = 0
+        self.late = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.resets = 0
+        self.max_depth = 0
+
+    def push(self, frame, samples):
+        """
+        Ajoute un paquet et retourne les blocs désormais prêts, dans l'ordre.
+
+        Args:
+            frame (int): Compteur de trames de l'en-tête VBAN
+            samples (numpy.ndarray): Échantillons mono du paquet (conservés sans copie)
+
+        Returns:
+            list: Blocs numpy.ndarray à traiter dans l'ordre (vide si le paquet est retenu)
+        """
+        self.received += 1
+        frame = int(frame)
+        if self.next_frame is None:
+            self.next_frame = frame
+
+        distance = frame_distance(frame, self.next_frame)
+        if abs(distance) > RESET_THRESHOLD:
+            # Émetteur redémarré : repartir de ce paquet
+            self.resets += 1
+            self.pending.clear()
+            self.next_frame = frame
+            distance = 0
+
+        if distance < 0:
+            # Déjà remplacé par le masquage : en retard ; sinon déjà livré : dupliqué
+            if frame in self._concealed:
+                self.late += 1
+            else:
+                self.duplicates += 1
+            return []
+        if frame in self.pending:
+            self.duplicates += 1
+            return []
+
+        # Chemin courant : paquet attendu, rien en attente
+        if distance == 0 and not self.pending:
+            self.next_frame = (frame + 1) % FRAME_COUNTER_MODULO
+            return [self._deliver(samples)]
+
+        if distance == 0:
+            # Arrivé après des paquets suivants, mais à temps pour combler son trou
+            self.reordered += 1
+        self.pending[frame] = samples
+        self.max_depth = max(self.max_depth, len(self.pending))
+        return self._drain()
+
+    def reset(self):
+        """Abandonne les paquets retenus et resynchronise sur le prochain paquet"""
+        self.pending.clear()
+        self.next_frame = None
+
+    def flush(self):
+        """Libère tous les paquets retenus (fin de flux), en comblant les trous"""
+        blocks = []
+        while self.pending:
+            blocks.extend(self._drain(force=True))
+        return blocks
+
+    def _drain(self, force=False):
+        blocks = []
+        while self.pending:
+            samples = self.pending.pop(self.next_frame, None)
+            if samples is not None:
+                self.next_frame = (self.next_frame + 1) % FRAME_COUNTER_MODULO
+                blocks.append(self._deliver(samples))
+                continue
+
+            # Trou : attendre tant que l'avance retenue reste sous la profondeur
+            distances = [frame_distance(frame, self.next_frame) for frame in self.pending]
+            gap = min(distances)
+            if not force and max(distances) < self.depth:
+                break
+            following = self.pending[(self.next_frame + gap) % FRAME_COUNTER_MODULO]
+            blocks.append(self._conceal(gap, following))
+            self._concealed.extend((self.next_frame + offset) % FRAME_COUNTER_MODULO for offset in range(gap))
+            self.lost += gap
+            self.next_frame = (self.next_frame + gap) % FRAME_COUNTER_MODULO
+        return blocks
+
+    def _deliver(self, samples):
+        if len(samples):
+            self._frame_length = len(samples)
+            self._last_sample = float(samples[-1])
+        return samples
+
+    def _conceal(self, missing, following):
+        """Bloc de remplacement pour `missing` trames avant le paquet `following`"""
+        length = missing * (self._frame_length or len(following))
+        if self.concealment == 'silence' or len(following) == 0:
+            return np.zeros(length, dtype=np.float32)
+        # Rampe linéaire du dernier échantillon livré au premier du paquet suivant
+        ramp = np.linspace(self._last_sample, float(following[0]), length + 2, dtype=np.float32)
+        return ramp[1:-1]
+
+    def get_stats(self):
+        return {
+            'received': self.received,
+            'lost': self.lost,
+            'late': self.late,
+            'duplicates': self.duplicates,
+            'reordered': self.reordered,
+            'resets': self.resets,
+            'pending': len(self.pending),
+            'max_depth': self.max_depth,
+            'loss_rate': self.lost / (self.received + self.lost) if self.received + self.lost else 0.0
+        }
@@ -5,8 +5,14 @@ from mediapipe.tasks import python
 from mediapipe.tasks.python import audio
 from mediapipe.tasks.python.components import containers
 from vban_manager import get_vban_detector
-from circular_buffer import CircularAudioBuffer
+from circular_buffer import AudioRing
 from vban_signal_processor import VBANSignalProcessor
+from inference_engine import TFLiteBackend
+from label_scoring import ScoringMatrix, top_k
+from hop_scheduler import HopScheduler, hop_from_overlap
+
+DEFAULT_OVERLAP = 0.8  # Recouvrement par défaut des fenêtres classifiées (pas de 195 ms)
+RING_DURATION = 4.0  # Secondes conservées : un bloc VBAN (1 s) et toutes les fenêtres qu'il complète
 
 class WebhookManager:
     def __init__(self):
@@ -36,7 +42,8 @@ class VBANAudioProcessor:
     dans les flux audio VBAN.
     """
     
-    def __init__(self, ip, port, stream_name, webhook_url=None, score_threshold=0.2, delay=1.0):
+    def __init__(self, ip, port, stream_name, webhook_url=None, score_threshold=0.2, delay=1.0,
+                 inference_backend='mediapipe', num_threads=1, hop=None):
         """
         Initialise le processeur audio VBAN.
         
@@ -47,6 +54,9 @@ class VBANAudioProcessor:
             webhook_url (str, optional): URL du webhook à appeler lors de la détection d'un clap
             score_threshold (float, optional): Seuil de score pour la détection des claps
             delay (float, optional): Délai minimum entre deux détections de claps
+            inference_backend (str, optional): 'mediapipe' ou 'tflite' (interpréteur direct, scores bruts)
+            num_threads (int, optional): Threads de l'interpréteur TFLite
+            hop (float, optional): Pas en secondes entre deux classifications (recouvrement de 0.8 par défaut)
         """
         # Configuration VBAN
         self.ip = ip
@@ -82,13 +92,23 @@ class VBANAudioProcessor:
         # Processeur de signal
         self.signal_processor = VBANSignalProcessor(sample_rate=self.sample_rate)
         
-        # Buffer circulaire pour stocker les échantillons audio
-        self.circular_buffer = CircularAudioBuffer(self.buffer_size, channels=1)
+        # Buffer circulaire pour stocker les échantillons audio (écrit et lu par le
+        # thread de réception VBAN, sans verrou), repérés par leur position absolue
+        self.circular_buffer = AudioRing(int(RING_DURATION * self.sample_rate))
+        self._analysis_buffer = np.zeros((self.buffer_size, 1), dtype=np.float32)
+        # Fenêtres classifiées à chaque pas du flux, pas à chaque bloc VBAN
+        window_hop = int(round(hop * self.sample_rate)) if hop else hop_from_overlap(DEFAULT_OVERLAP, self.buffer_size)
+        self.scheduler = HopScheduler(window_hop, window_size=self.buffer_size, sample_rate=self.sample_rate)
         
         # État interne
         self.is_running = False
         self.last_clap_time = 0
         self.classifier = None
+        self.inference_backend = inference_backend
+        self.num_threads = num_threads
+        self.backend = None  # TFLiteBackend si inference_backend == 'tflite'
+        self.scoring = ScoringMatrix()  # Profil 'clap' résolu en indices de classes
+        self._clap_profile = self.scoring.index('clap')
         self.detector = None
         self._socketio = None  # Pour les notifications websocket
         
@@ -101,6 +121,10 @@ class VBANAudioProcessor:
     def initialize_classifier(self):
         """Configure et initialise le classificateur audio YAMNet."""
         try:
+            if self.inference_backend == 'tflite':
+                self.backend = TFLiteBackend("yamnet.tflite", num_threads=self.num_threads)
+                logging.info(f"Interpréteur TFLite initialisé avec succès ({self.num_threads} thread(s))")
+                return
             base_options = python.BaseOptions(model_asset_path="yamnet.tflite")
             options = audio.AudioClassifierOptions(
                 base_options=base_options,
@@ -165,8 +189,8 @@ class VBANAudioProcessor:
         Callback appelé par le classificateur pour chaque résultat.
         """
         try:
-            # Récupérer les données audio actuelles du buffer
-            current_audio = self.circular_buffer.get_buffer()
+            # Récupérer la dernière fenêtre classifiée
+            current_audio = self._analysis_buffer[:, 0]
             
             # Analyser le signal
             signal_features = self.signal_processor.analyze_signal(current_audio)
@@ -174,33 +198,46 @@ class VBANAudioProcessor:
             # Évaluer les caractéristiques pour la détection de claps
             feature_score = self.evaluate_clap_features(signal_features)
             
-            # Calcul du score pour les sons de claps (YAMNet)
-            yamnet_score = sum(
-                category.score
-                for category in result.classifications[0].categories
-                if category.category_name in ["Hands", "Clapping", "Cap gun"]
-            )
-            
-            # Soustraction du score des faux positifs
-            yamnet_score -= sum(
-                category.score
-                for category in result.classifications[0].categories
-                if category.category_name == "Finger snapping"
-            )
-            
-            # Combiner les scores (moyenne pondérée)
-            combined_score = (yamnet_score * 0.4 + feature_score * 0.6)
+            # Score YAMNet des claps, faux positifs soustraits
+            yamnet_score = self._clap_score(result)
             
-            # Détection et notification des claps
-            if combined_score > self.score_threshold:
-                current_time = time.time()
-                if current_time - self.last_clap_time > self.delay:
-                    self.notify_clap(combined_score, current_time)
-                    self.last_clap_time = current_time
+            self._handle_yamnet_score(yamnet_score, feature_score)
                     
         except Exception as e:
             logging.error(f"Erreur dans le callback de classification: {str(e)}")
-            
+
+    def _clap_score(self, result):
+        """Score de clap d'un résultat MediaPipe, à partir des indices de ses catégories"""
+        categories = result.classifications[0].categories
+        indices = np.fromiter((category.index for category in categories), dtype=np.intp, count=len(categories))
+        values = np.fromiter((category.score for category in categories), dtype=np.float32, count=len(categories))
+        return float(self.scoring.score_sparse(indices, values)[self._clap_profile])
+
+    def _handle_yamnet_score(self, yamnet_score, feature_score):
+        """Combine le score YAMNet et celui des caractéristiques du signal, puis notifie un clap"""
+        # Combiner les scores (moyenne pondérée)
+        combined_score = (yamnet_score * 0.4 + feature_score * 0.6)
+        
+        # Détection et notification des claps
+        if combined_score > self.score_threshold:
+            current_time = time.time()
+            if current_time - self.last_clap_time > self.delay:
+                self.notify_clap(combined_score, current_time)
+                self.last_clap_time = current_time
+
+    def _classify_scores(self):
+        """Classifie la fenêtre d'analyse avec l'interpréteur TFLite et traite le vecteur de scores"""
+        # Écriture en place dans le tenseur d'entrée, sans AudioData ni objets catégorie
+        scores = self.backend.classify_batch(self._analysis_buffer.T)[0]
+        # Mêmes catégories que le classificateur MediaPipe : les 5 meilleures au-dessus de 0.2
+        yamnet_score = float(self.scoring.score(scores, top_k(scores, 5, 0.2))[self._clap_profile])
+        feature_score = self.evaluate_clap_features(self.signal_processor.analyze_signal(self._analysis_buffer[:, 0]))
+        self._handle_yamnet_score(yamnet_score, feature_score)
+            
+    def get_inference_stats(self):
+        """Pas des fenêtres, classifications effectuées et débit d'inférence mesuré"""
+        return self.scheduler.get_stats()
+
     def set_socketio(self, socketio):
         """
         Configure l'instance SocketIO pour les notifications en temps réel.
@@ -243,7 +280,8 @@ class VBANAudioProcessor:
             if self.detector:
                 self.detector.remove_callback(self.audio_callback)
             self.is_running = False
-            self.circular_buffer.clear()  # Vide le buffer à l'arrêt
+            # Oublier l'audio reçu avant l'arrêt
+            self.scheduler.next_start = self.circular_buffer.write_count
             logging.info(f"Arrêt du traitement audio VBAN pour {self.stream_name}")
             return True
             
@@ -280,19 +318,8 @@ class VBANAudioProcessor:
             # Classification du signal audio
             result = self.classifier.classify(audio_data)
             
-            # Calcul du score pour les sons de claps
-            score_sum = sum(
-                category.score
-                for category in result.classifications[0].categories
-                if category.category_name in ["Hands", "Clapping", "Cap gun"]
-            )
-            
-            # Soustraction du score des faux positifs
-            score_sum -= sum(
-                category.score
-                for category in result.classifications[0].categories
-                if category.category_name == "Finger snapping"
-            )
+            # Calcul du score pour les sons de claps, faux positifs soustraits
+            score_sum = self._clap_score(result)
             
             # Détection et notification des claps
             if score_sum > self.score_threshold:
@@ -365,6 +392,22 @@ class VBANAudioProcessor:
             logging.error(f"Erreur lors du traitement du flux VBAN: {str(e)}")
             raise
             
+    def _classify_window(self, timestamp):
+        """Classifie la fenêtre copiée dans _analysis_buffer"""
+        if self.backend is not None:
+            self._classify_scores()
+            return
+
+        # Prétraitement et classification
+        processed_audio = self.preprocess_audio(self._analysis_buffer)
+        if self.classifier:
+            timestamp_ms = int(timestamp * 1000)
+            self.classifier.classify_async(processed_audio, timestamp_ms)
+
+        # Détection de claps si nécessaire
+        if self.detector:
+            self.detect_claps(processed_audio, timestamp)
+
     def audio_callback(self, data, timestamp):
         """
         Callback appelé lorsque des données audio sont reçues du flux VBAN.
@@ -378,22 +421,20 @@ class VBANAudioProcessor:
             audio_data = self._process_vban_stream(data)
             
             # Écriture dans le buffer circulaire
-            if not self.circular_buffer.write(audio_data):
-                logging.warning("Échec de l'écriture dans le buffer circulaire")
-                return
-                
-            # Lecture du buffer pour le traitement
-            processed_data = self.circular_buffer.read(self.buffer_size)
-            
-            # Prétraitement et classification
-            processed_audio = self.preprocess_audio(processed_data)
-            if self.classifier:
-                timestamp_ms = int(timestamp * 1000)
-                self.classifier.classify_async(processed_audio, timestamp_ms)
-            
-            # Détection de claps si nécessaire
-            if self.detector:
-                self.detect_claps(processed_audio, timestamp)
-            
+            ring = self.circular_buffer
+            ring.write(audio_data)
+            end = ring.write_count
+
+            # Toutes les fenêtres complétées par ce bloc, au pas du planificateur : un
+            # bloc VBAN d'une seconde en contient plusieurs
+            self.scheduler.catch_up(end - ring.capacity)
+            while self.scheduler.due(end):
+                start = self.scheduler.advance()
+                self.scheduler.record()
+                self._analysis_buffer[:, 0] = ring.view(start, self.buffer_size)
+                # Horodatage de la fin de la fenêtre, le bloc se terminant à timestamp
+                window_timestamp = timestamp - (end - start - self.buffer_size) / self.sample_rate
+                self._classify_window(window_timestamp)
+
         except Exception as e:
             logging.error(f"Erreur dans le callback audio: {str(e)}")
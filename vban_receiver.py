@@ -0,0 +1,210 @@
+import socket
+import select
+import numpy as np
+
+VBAN_HEADER_SIZE = 28
+VBAN_MAX_PACKET_SIZE = 2048  # Un paquet VBAN fait au plus 1436 octets
+
+# En-tête VBAN : 'VBAN', SR (5 bits) + sous-protocole (3 bits), échantillons - 1,
+# canaux - 1, format des données, nom du flux (16 octets), compteur de trames
+VBAN_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('sr', 'u1'),
+    ('nbs', 'u1'),
+    ('nbc', 'u1'),
+    ('bit', 'u1'),
+    ('name', 'S16'),
+    ('frame', '<u4'),
+])
+
+VBAN_PROTOCOL_AUDIO = 0x00
+VBAN_SAMPLE_RATES = np.array([
+    6000, 12000, 24000, 48000, 96000, 192000, 384000,
+    8000, 16000, 32000, 64000, 128000, 256000, 512000,
+    11025, 22050, 44100, 88200, 176400, 352800
+] + [0] * 12, dtype=np.int32)
+
+# Octet format_bit : type de données (bits 0-2) et codec (bits 4-7, 0 = PCM)
+VBAN_DATATYPE_MASK = 0x07
+VBAN_CODEC_MASK = 0xF0
+VBAN_CODEC_PCM = 0x00
+
+# Type de données -> (dtype lu, décalage du zéro, facteur de normalisation, octets par échantillon).
+# Le 24 bits compacté est lu comme un int32 commençant un octet plus tôt : l'octet de
+# poids faible appartient à l'échantillon précédent et pèse moins d'un pas 24 bits.
+VBAN_DATA_TYPES = {
+    0: (np.dtype('u1'), 128.0, 1.0 / 128.0, 1),          # BYTE8, non signé
+    1: (np.dtype('<i2'), 0.0, 1.0 / 32768.0, 2),         # INT16
+    2: (np.dtype('<i4'), 0.0, 1.0 / 2147483648.0, 3),    # INT24 compacté
+    3: (np.dtype('<i4'), 0.0, 1.0 / 2147483648.0, 4),    # INT32
+    4: (np.dtype('<f4'), 0.0, 1.0, 4),                   # FLOAT32
+    5: (np.dtype('<f8'), 0.0, 1.0, 8),                   # FLOAT64
+}
+VBAN_DATA_TYPE_NAMES = {0: 'u8', 1: 'int16', 2: 'int24', 3: 'int32', 4: 'float32', 5: 'float64'}
+# Les types 6 (12 bits) et 7 (10 bits) ne sont pas pris en charge
+VBAN_SUPPORTED_DATA_TYPES = np.array([data_type in VBAN_DATA_TYPES for data_type in range(8)])
+
+
+class VBANReceiver:
+    """
+    Réception VBAN par lots dans des buffers préalloués.
+
+    Chaque appel à receive() attend un premier datagramme puis vide ce qui est
+    déjà en attente sur le socket, jusqu'à batch_size paquets, avec recvfrom_into
+    dans des emplacements réutilisés. Les en-têtes du lot sont lus en une fois via
+    un dtype structuré et les charges utiles sont exposées sous forme de vues : elles
+    ne sont valides que jusqu'au prochain appel à receive().
+    """
+
+    def __init__(self, sock, batch_size=64):
+        """
+        Initialise le récepteur.
+
+        Args:
+            sock (socket.socket): Socket UDP déjà lié ; son timeout sert d'attente maximale
+            batch_size (int): Nombre maximum de paquets lus par appel
+        """
+        self.sock = sock
+        self.timeout = sock.gettimeout()
+        # Socket non bloquant : l'attente du premier paquet se fait avec select
+        sock.setblocking(False)
+        self.batch_size = batch_size
+        self.slots = np.zeros((batch_size, VBAN_MAX_PACKET_SIZE), dtype=np.uint8)
+        self._views = [memoryview(slot) for slot in self.slots]
+        self.sizes = np.zeros(batch_size, dtype=np.int32)
+        self.addrs = [None] * batch_size
+        self.count = 0
+
+        # Statistiques
+        self.packets_received = 0
+        self.packets_rejected = 0
+        self.batches = 0
+
+    def receive(self):
+        """
+        Lit un lot de paquets.
+
+        Returns:
+            int: Nombre de paquets lus
+
+        Raises:
+            socket.timeout: Si aucun paquet n'arrive avant le timeout du socket
+        """
+        sock = self.sock
+        count = 0
+        waited = False
+        while count < self.batch_size:
+            try:
+                size, addr = sock.recvfrom_into(self._views[count])
+            except (BlockingIOError, InterruptedError):
+                if count:
+                    break
+                # Un seul select par appel : un socket signalé lisible sans paquet
+                # (arrêté par shutdown) rend la main au lieu de boucler
+                ready = not waited and select.select([sock], [], [], self.timeout)[0]
+                if not ready:
+                    self.count = 0
+                    raise socket.timeout()
+                waited = True
+                continue
+            self.sizes[count] = size
+            self.addrs[count] = addr
+            count += 1
+        self.count = count
+        self.batches += 1
+        self.packets_received += count
+        return count
+
+    def headers(self):
+        """En-têtes du dernier lot, vue structurée (count,) sur les buffers"""
+        return self.slots[:self.count, :VBAN_HEADER_SIZE].view(VBAN_HEADER_DTYPE)[:, 0]
+
+    def valid_audio(self):
+        """
+        Masque des paquets audio VBAN exploitables du dernier lot.
+
+        Returns:
+            numpy.ndarray: Booléens (count,)
+        """
+        headers = self.headers()
+        valid = (
+            (self.sizes[:self.count] > VBAN_HEADER_SIZE)
+            & (headers['magic'] == b'VBAN')
+            & ((headers['sr'] & 0xE0) == VBAN_PROTOCOL_AUDIO)
+            & (VBAN_SAMPLE_RATES[headers['sr'] & 0x1F] > 0)
+            & ((headers['bit'] & VBAN_CODEC_MASK) == VBAN_CODEC_PCM)
+            & VBAN_SUPPORTED_DATA_TYPES[headers['bit'] & VBAN_DATATYPE_MASK]
+        )
+        self.packets_rejected += int(self.count - np.count_nonzero(valid))
+        return valid
+
+    def payload(self, index, dtype=np.int16):
+        """
+        Charge utile d'un paquet du dernier lot, sans copie.
+
+        Args:
+            index (int): Position du paquet dans le lot
+            dtype: Type des échantillons
+
+        Returns:
+            numpy.ndarray: Vue sur les échantillons complets du paquet
+        """
+        itemsize = np.dtype(dtype).itemsize
+        length = (int(self.sizes[index]) - VBAN_HEADER_SIZE) // itemsize * itemsize
+        return self.slots[index, VBAN_HEADER_SIZE:VBAN_HEADER_SIZE + length].view(dtype)
+
+    def packet(self, index):
+        """Paquet complet (en-tête compris) du dernier lot, vue uint8 sans copie"""
+        return self.slots[index, :int(self.sizes[index])]
+
+    def get_stats(self):
+        return {
+            'packets': self.packets_received,
+            'rejected': self.packets_rejected,
+            'batches': self.batches,
+            'avg_batch_size': self.packets_received / self.batches if self.batches else 0.0
+        }
+
+
+def decode_stream_name(raw_name):
+    """Nom du flux VBAN à partir du champ de 16 octets de l'en-tête"""
+    return raw_name.split(b'\0', 1)[0].decode('ascii', errors='ignore').strip()
+
+
+def decode_packet(packet, data_type, channels):
+    """
+    Décode la charge utile d'un paquet VBAN en un signal mono float32.
+
+    Lecture du format, normalisation entre -1 et 1 et mixage des canaux se font
+    en une réduction NumPy sur une vue du paquet : le seul tableau alloué est le
+    résultat.
+
+    Args:
+        packet (numpy.ndarray): Paquet complet (en-tête compris), uint8 contigu
+        data_type (int): Type de données VBAN (bits 0-2 de l'octet format_bit)
+        channels (int): Nombre de canaux entrelacés
+
+    Returns:
+        numpy.ndarray: Échantillons mono float32, un par trame complète
+    """
+    dtype, zero, scale, width = VBAN_DATA_TYPES[data_type]
+    frame_size = width * channels
+    frames = (len(packet) - VBAN_HEADER_SIZE) // frame_size
+    if frames <= 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # Vue (trames, canaux) sur la charge utile ; en 24 bits chaque int32 commence
+    # un octet avant son échantillon (le dernier octet de l'en-tête pour le premier)
+    offset = VBAN_HEADER_SIZE - (dtype.itemsize - width)
+    samples = np.ndarray((frames, channels), dtype=dtype, buffer=packet, offset=offset,
+                         strides=(frame_size, width))
+
+    mono = np.empty(frames, dtype=np.float32)
+    if channels == 1:
+        np.copyto(mono, samples[:, 0], casting='unsafe')
+    else:
+        np.add.reduce(samples, axis=1, dtype=np.float32, out=mono)
+    if zero:
+        mono -= zero * channels
+    mono *= scale / channels
+    return mono